@@ -13,10 +13,6 @@ import "../interfaces/aave/ILendingPool.sol";
 import "../interfaces/dai/IERC3156FlashLender.sol";
 import "../interfaces/dai/IERC3156FlashBorrower.sol";
 
-interface IOptionalERC20 {
-    function decimals() external view returns (uint8);
-}
-
 library FlashMintLib {
     using SafeMath for uint256;
     event Leverage(
@@ -31,7 +27,7 @@ library FlashMintLib {
     address public constant LENDER = 0x1EB4CF3A948E7D72A198fe073cCb8C7a948cD853;
     uint256 private constant DAI_DECIMALS = 1e18;
     uint256 private constant COLLAT_RATIO_PRECISION = 1 ether;
-    address private constant WETH = 0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2;
+    uint256 private constant MAX_BPS = 1e4;
     address private constant DAI = 0x6B175474E89094C44Da98b954EedeAC495271d0F;
     IAToken public constant ADAI =
         IAToken(0x028171bCA77440897B824Ca71D1c56caC55b68A3);
@@ -45,29 +41,147 @@ library FlashMintLib {
 
     uint16 private constant referral = 7; // Yearn's aave referral code
 
-    function doFlashMint(
+    // Prices and decimals needed to convert between a token and DAI,
+    // fetched once per flash mint
+    struct QuoteContext {
+        bool isDai;
+        uint256 tokenPrice;
+        uint256 daiPrice;
+        uint256 tokenUnit;
+    }
+
+    // Sources of flash liquidity: DssFlash mints DAI that is posted as
+    // collateral, the others lend want directly
+    enum Provider {DssFlash, AaveV2, WantLender}
+
+    // First word of every flash payload, tells the callbacks how to decode
+    // the rest: Leverage (deficit, amount, amountToFree, toDeposit) or
+    // Migration (newStrategy, borrows)
+    enum Operation {Leverage, Migration}
+
+    struct FlashRequest {
+        bool deficit;
+        uint256 amount; // want to repay (deficit) or to borrow
+        address token;
+        uint256 tokenUnit;
+        uint256 collatRatioDAI;
+        uint256 depositToCloseLTVGap; // only closed by the DAI route
+        uint256 amountToFree; // want withdrawn on top of a repayment
+        uint256 toDeposit; // loose want deposited on top of a lever up borrow
+        address wantLender; // optional ERC-3156 lender of want
+        bool wantRouteAllowed; // false when borrowing needs extra collateral
+    }
+
+    function doFlashMint(FlashRequest memory request)
+        public
+        returns (uint256 amount)
+    {
+        if (request.amount == 0) {
+            return 0;
+        }
+
+        Provider provider = selectProvider(request);
+        if (provider == Provider.DssFlash) {
+            return _flashMintDAI(request);
+        }
+        return _flashLoanWant(provider, request);
+    }
+
+    // DssFlash is fee-free (checked on every mint), so a want provider is
+    // only picked when it is free as well and can lend the whole amount,
+    // skipping the DAI collateral round trip
+    function selectProvider(FlashRequest memory request)
+        public
+        view
+        returns (Provider)
+    {
+        if (!request.wantRouteAllowed) {
+            return Provider.DssFlash;
+        }
+
+        Provider[2] memory candidates = [Provider.WantLender, Provider.AaveV2];
+        for (uint256 i = 0; i < candidates.length; i++) {
+            (uint256 fee, uint256 liquidity) =
+                quote(
+                    candidates[i],
+                    request.deficit,
+                    request.token,
+                    request.amount,
+                    request.wantLender
+                );
+            if (fee == 0 && liquidity >= request.amount) {
+                return candidates[i];
+            }
+        }
+        return Provider.DssFlash;
+    }
+
+    // fee and liquidity are denominated in the lent token: DAI for
+    // DssFlash, want for the others
+    function quote(
+        Provider provider,
         bool deficit,
-        uint256 amountDesired,
         address token,
-        uint256 collatRatioDAI,
-        uint256 depositToCloseLTVGap
-    ) public returns (uint256 amount) {
-        if (amountDesired == 0) {
-            return 0;
+        uint256 amount,
+        address wantLender
+    ) public view returns (uint256 fee, uint256 liquidity) {
+        if (provider == Provider.DssFlash) {
+            fee = IERC3156FlashLender(LENDER).flashFee(DAI, amount);
+            liquidity = maxLiquidity();
+        } else if (provider == Provider.AaveV2) {
+            // no premium is charged when the loan is kept as variable debt
+            if (deficit) {
+                fee = amount.mul(lendingPool.FLASHLOAN_PREMIUM_TOTAL()).div(
+                    MAX_BPS
+                );
+            }
+            (liquidity, , , , , , , , , ) = protocolDataProvider.getReserveData(
+                token
+            );
+        } else if (wantLender != address(0)) {
+            // a lender that reverts is unavailable, it must not block
+            // harvests and withdrawals that DssFlash can serve
+            try IERC3156FlashLender(wantLender).maxFlashLoan(token) returns (
+                uint256 _liquidity
+            ) {
+                liquidity = _liquidity;
+            } catch {}
+            // NOTE: flashFee reverts for unsupported tokens
+            if (liquidity > 0) {
+                try
+                    IERC3156FlashLender(wantLender).flashFee(token, amount)
+                returns (uint256 _fee) {
+                    fee = _fee;
+                } catch {
+                    liquidity = 0;
+                }
+            }
         }
-        amount = amountDesired;
-        address dai = DAI;
+    }
+
+    function _flashMintDAI(FlashRequest memory request)
+        internal
+        returns (uint256 amount)
+    {
+        amount = request.amount;
+        uint256 amountToFree = request.amountToFree;
+        uint256 collatRatioDAI = request.collatRatioDAI;
+        QuoteContext memory ctx =
+            _quoteContext(request.token, request.tokenUnit);
 
         // calculate amount of dai we need
         uint256 requiredDAI;
         {
-            requiredDAI = _toDAI(amount, token).mul(COLLAT_RATIO_PRECISION).div(
+            requiredDAI = _toDAI(ctx, amount).mul(COLLAT_RATIO_PRECISION).div(
                 collatRatioDAI
             );
 
             uint256 requiredDAIToCloseLTVGap = 0;
-            if (depositToCloseLTVGap > 0) {
-                requiredDAIToCloseLTVGap = _toDAI(depositToCloseLTVGap, token);
+            if (request.depositToCloseLTVGap > 0) {
+                requiredDAIToCloseLTVGap = _toDAI(
+                    ctx,
+                    request.depositToCloseLTVGap
+                );
                 requiredDAI = requiredDAI.add(requiredDAIToCloseLTVGap);
             }
 
@@ -76,15 +190,95 @@ library FlashMintLib {
                 requiredDAI = _maxLiquidity;
                 // NOTE: if we cap amountDAI, we reduce amountToken we are taking too
                 amount = _fromDAI(
-                    requiredDAI.sub(requiredDAIToCloseLTVGap),
-                    token
+                    ctx,
+                    requiredDAI.sub(requiredDAIToCloseLTVGap)
                 )
                     .mul(collatRatioDAI)
                     .div(COLLAT_RATIO_PRECISION);
+                // NOTE: a partial repayment can't free want on top of it
+                amountToFree = 0;
             }
         }
 
-        bytes memory data = abi.encode(deficit, amount);
+        _flashLoan(
+            requiredDAI,
+            abi.encode(
+                Operation.Leverage,
+                request.deficit,
+                amount,
+                amountToFree,
+                request.toDeposit
+            )
+        );
+
+        emit Leverage(
+            request.amount,
+            amount,
+            requiredDAI,
+            request.depositToCloseLTVGap,
+            request.deficit,
+            LENDER
+        );
+
+        return amount; // we need to return the amount of Token we have changed our position in
+    }
+
+    function _flashLoanWant(Provider provider, FlashRequest memory request)
+        internal
+        returns (uint256)
+    {
+        bytes memory data =
+            abi.encode(
+                Operation.Leverage,
+                request.deficit,
+                request.amount,
+                request.amountToFree,
+                request.toDeposit
+            );
+        address lender;
+        if (provider == Provider.AaveV2) {
+            lender = address(lendingPool);
+            address[] memory assets = new address[](1);
+            assets[0] = request.token;
+            uint256[] memory amounts = new uint256[](1);
+            amounts[0] = request.amount;
+            // levering up keeps the loan as variable debt (mode 2), a
+            // repayment returns it within the transaction (mode 0)
+            uint256[] memory modes = new uint256[](1);
+            modes[0] = request.deficit ? 0 : 2;
+            lendingPool.flashLoan(
+                address(this),
+                assets,
+                amounts,
+                modes,
+                address(this),
+                data,
+                referral
+            );
+        } else {
+            lender = request.wantLender;
+            IERC3156FlashLender(lender).flashLoan(
+                IERC3156FlashBorrower(address(this)),
+                request.token,
+                request.amount,
+                data
+            );
+        }
+
+        emit Leverage(
+            request.amount,
+            request.amount,
+            0,
+            0,
+            request.deficit,
+            lender
+        );
+
+        return request.amount;
+    }
+
+    function _flashLoan(uint256 requiredDAI, bytes memory data) internal {
+        address dai = DAI;
         uint256 _fee = IERC3156FlashLender(LENDER).flashFee(dai, requiredDAI);
         // Check that fees have not been increased without us knowing
         require(_fee == 0);
@@ -100,22 +294,13 @@ library FlashMintLib {
             requiredDAI,
             data
         );
-
-        emit Leverage(
-            amountDesired,
-            amount,
-            requiredDAI,
-            depositToCloseLTVGap,
-            deficit,
-            LENDER
-        );
-
-        return amount; // we need to return the amount of Token we have changed our position in
     }
 
     function loanLogic(
         bool deficit,
         uint256 amount,
+        uint256 amountToFree,
+        uint256 toDeposit,
         uint256 amountFlashmint,
         address want
     ) public returns (bytes32) {
@@ -126,23 +311,13 @@ library FlashMintLib {
 
         if (isDai) {
             if (deficit) {
-                lp.deposit(
-                    dai,
-                    amountFlashmint.sub(amount),
-                    address(this),
-                    referral
-                );
-                lp.repay(
-                    dai,
-                    IERC20(dai).balanceOf(address(this)),
-                    2,
-                    address(this)
-                );
-                lp.withdraw(dai, amountFlashmint, address(this));
+                // repay exactly with the flash minted DAI, no collateral needed
+                lp.repay(dai, amount, 2, address(this));
+                lp.withdraw(dai, amount.add(amountToFree), address(this));
             } else {
                 lp.deposit(
                     dai,
-                    IERC20(dai).balanceOf(address(this)),
+                    amountFlashmint.add(toDeposit),
                     address(this),
                     referral
                 );
@@ -154,20 +329,15 @@ library FlashMintLib {
             lp.deposit(dai, amountFlashmint, address(this), referral);
 
             if (deficit) {
-                // 2a. if in deficit withdraw amount and repay it
-                lp.withdraw(want, amount, address(this));
-                lp.repay(
-                    want,
-                    IERC20(want).balanceOf(address(this)),
-                    2,
-                    address(this)
-                );
+                // 2a. if in deficit withdraw amount plus the freed want and repay amount
+                lp.withdraw(want, amount.add(amountToFree), address(this));
+                lp.repay(want, amount, 2, address(this));
             } else {
                 // 2b. if levering up borrow and deposit
                 lp.borrow(want, amount, 2, referral, address(this));
                 lp.deposit(
                     want,
-                    IERC20(want).balanceOf(address(this)),
+                    amount.add(toDeposit),
                     address(this),
                     referral
                 );
@@ -179,6 +349,103 @@ library FlashMintLib {
         return CALLBACK_SUCCESS;
     }
 
+    // Callback logic for flash loans of want. `fee` is owed to the lender
+    // on top of `amount` unless the loan was kept as debt by the lender
+    function wantLoanLogic(
+        bool deficit,
+        uint256 amount,
+        uint256 amountToFree,
+        uint256 toDeposit,
+        uint256 fee,
+        bool keptAsDebt,
+        address want
+    ) public {
+        ILendingPool lp = lendingPool;
+
+        if (deficit) {
+            // repay with the lent want and withdraw it back with the freed want
+            lp.repay(want, amount, 2, address(this));
+            lp.withdraw(
+                want,
+                amount.add(amountToFree).add(fee),
+                address(this)
+            );
+        } else {
+            lp.deposit(want, amount.add(toDeposit), address(this), referral);
+            if (!keptAsDebt) {
+                lp.borrow(want, amount.add(fee), 2, referral, address(this));
+            }
+        }
+    }
+
+    // DAI newStrategy needs as extra collateral to take over our debt,
+    // past want's ltv our aTokens can't back it alone. When some is needed
+    // it is flash minted here and the caller's onFlashLoan hands the
+    // position over, otherwise the caller does it right away
+    function migratePosition(
+        address newStrategy,
+        uint256 deposits,
+        uint256 maxBorrowCollatRatio,
+        FlashRequest memory request
+    ) public returns (uint256 requiredDAI) {
+        uint256 borrowable =
+            deposits.mul(maxBorrowCollatRatio).div(COLLAT_RATIO_PRECISION);
+        if (request.amount <= borrowable) {
+            return 0;
+        }
+
+        QuoteContext memory ctx =
+            _quoteContext(request.token, request.tokenUnit);
+        requiredDAI = _toDAI(ctx, request.amount.sub(borrowable))
+            .mul(COLLAT_RATIO_PRECISION)
+            .div(request.collatRatioDAI);
+        require(requiredDAI <= maxLiquidity());
+        _flashLoan(
+            requiredDAI,
+            abi.encode(Operation.Migration, newStrategy, request.amount)
+        );
+    }
+
+    // Aave flash loan callback of a migration, the loan becomes
+    // newStrategy's debt (mode 2) when it returns
+    function migrationFlashLoanLogic(
+        address newStrategy,
+        uint256 borrows,
+        address want,
+        address aToken
+    ) public {
+        lendingPool.repay(want, borrows, 2, address(this));
+        IERC20(aToken).transfer(
+            newStrategy,
+            IERC20(aToken).balanceOf(address(this))
+        );
+    }
+
+    // Moves our aToken collateral and variable debt to newStrategy, which
+    // delegated us the credit: an Aave flash loan repays our debt and is
+    // kept as newStrategy's debt once it holds our aTokens
+    function migrationFlashLoan(
+        address newStrategy,
+        uint256 borrows,
+        address want
+    ) public {
+        address[] memory assets = new address[](1);
+        assets[0] = want;
+        uint256[] memory amounts = new uint256[](1);
+        amounts[0] = borrows;
+        uint256[] memory modes = new uint256[](1);
+        modes[0] = 2;
+        lendingPool.flashLoan(
+            address(this),
+            assets,
+            amounts,
+            modes,
+            newStrategy,
+            abi.encode(Operation.Migration, newStrategy, borrows),
+            referral
+        );
+    }
+
     function _priceOracle() internal view returns (IPriceOracle) {
         return
             IPriceOracle(
@@ -186,67 +453,51 @@ library FlashMintLib {
             );
     }
 
-    function _toDAI(uint256 _amount, address asset)
+    function _quoteContext(address token, uint256 tokenUnit)
         internal
         view
-        returns (uint256)
+        returns (QuoteContext memory ctx)
     {
-        address dai = DAI;
-        if (
-            _amount == 0 || _amount == type(uint256).max || asset == dai // 1:1 change
-        ) {
-            return _amount;
-        }
-
-        if (asset == WETH) {
-            return
-                _amount
-                    .mul(uint256(10)**uint256(IOptionalERC20(dai).decimals()))
-                    .div(_priceOracle().getAssetPrice(dai));
+        if (token == DAI) {
+            // 1:1 change
+            ctx.isDai = true;
+            return ctx;
         }
 
         address[] memory tokens = new address[](2);
-        tokens[0] = asset;
-        tokens[1] = dai;
+        tokens[0] = token;
+        tokens[1] = DAI;
         uint256[] memory prices = _priceOracle().getAssetsPrices(tokens);
 
-        uint256 ethPrice =
-            _amount.mul(prices[0]).div(
-                uint256(10)**uint256(IOptionalERC20(asset).decimals())
-            );
-        return ethPrice.mul(DAI_DECIMALS).div(prices[1]);
+        ctx.tokenPrice = prices[0];
+        ctx.daiPrice = prices[1];
+        ctx.tokenUnit = tokenUnit;
     }
 
-    function _fromDAI(uint256 _amount, address asset)
+    function _toDAI(QuoteContext memory ctx, uint256 _amount)
         internal
-        view
+        pure
         returns (uint256)
     {
-        address dai = DAI;
-        if (
-            _amount == 0 || _amount == type(uint256).max || asset == dai // 1:1 change
-        ) {
+        if (_amount == 0 || _amount == type(uint256).max || ctx.isDai) {
             return _amount;
         }
 
-        if (asset == WETH) {
-            return
-                _amount.mul(_priceOracle().getAssetPrice(dai)).div(
-                    uint256(10)**uint256(IOptionalERC20(dai).decimals())
-                );
-        }
-
-        address[] memory tokens = new address[](2);
-        tokens[0] = asset;
-        tokens[1] = dai;
-        uint256[] memory prices = _priceOracle().getAssetsPrices(tokens);
+        uint256 ethPrice = _amount.mul(ctx.tokenPrice).div(ctx.tokenUnit);
+        return ethPrice.mul(DAI_DECIMALS).div(ctx.daiPrice);
+    }
 
-        uint256 ethPrice = _amount.mul(prices[1]).div(DAI_DECIMALS);
+    function _fromDAI(QuoteContext memory ctx, uint256 _amount)
+        internal
+        pure
+        returns (uint256)
+    {
+        if (_amount == 0 || _amount == type(uint256).max || ctx.isDai) {
+            return _amount;
+        }
 
-        return
-            ethPrice
-                .mul(uint256(10)**uint256(IOptionalERC20(asset).decimals()))
-                .div(prices[0]);
+        uint256 ethPrice = _amount.mul(ctx.daiPrice).div(DAI_DECIMALS);
+        return ethPrice.mul(ctx.tokenUnit).div(ctx.tokenPrice);
     }
 
     function maxLiquidity() public view returns (uint256) {
@@ -0,0 +1,108 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+pragma experimental ABIEncoderV2;
+
+import {StrategyAPI} from "@yearn/yearn-vaults/contracts/BaseStrategy.sol";
+import "@openzeppelin/contracts/math/SafeMath.sol";
+
+// Harvests or tends a batch of strategies in a single transaction, only
+// acting on those whose trigger fires. It must be the keeper of each strategy.
+contract KeeperExecutor {
+    using SafeMath for uint256;
+
+    enum Action {None, Harvest, Tend}
+
+    address public governance;
+    mapping(address => bool) public keepers;
+
+    event Worked(
+        address indexed strategy,
+        Action action,
+        bool success,
+        uint256 gasUsed
+    );
+
+    modifier onlyKeepers() {
+        require(msg.sender == governance || keepers[msg.sender], "!keeper");
+        _;
+    }
+
+    constructor() public {
+        governance = msg.sender;
+    }
+
+    function setGovernance(address _governance) external {
+        require(msg.sender == governance, "!governance");
+        governance = _governance;
+    }
+
+    function setKeeper(address _keeper, bool _allowed) external {
+        require(msg.sender == governance, "!governance");
+        keepers[_keeper] = _allowed;
+    }
+
+    // Action every strategy would take right now, for off-chain batching
+    function workable(address[] calldata _strategies, uint256 _callCostInWei)
+        external
+        view
+        returns (Action[] memory actions)
+    {
+        actions = new Action[](_strategies.length);
+        for (uint256 i = 0; i < _strategies.length; i++) {
+            actions[i] = _action(StrategyAPI(_strategies[i]), _callCostInWei);
+        }
+    }
+
+    // A failing strategy is reported in its Worked event and doesn't revert the batch
+    function work(address[] calldata _strategies, uint256 _callCostInWei)
+        external
+        onlyKeepers
+    {
+        for (uint256 i = 0; i < _strategies.length; i++) {
+            uint256 gasStart = gasleft();
+            StrategyAPI strategy = StrategyAPI(_strategies[i]);
+            Action action = _action(strategy, _callCostInWei);
+            if (action == Action.None) {
+                continue;
+            }
+
+            bool success = true;
+            if (action == Action.Harvest) {
+                try strategy.harvest() {} catch {
+                    success = false;
+                }
+            } else {
+                try strategy.tend() {} catch {
+                    success = false;
+                }
+            }
+            emit Worked(
+                address(strategy),
+                action,
+                success,
+                gasStart.sub(gasleft())
+            );
+        }
+    }
+
+    // harvest takes priority over tend, a reverting trigger means no action
+    function _action(StrategyAPI strategy, uint256 _callCostInWei)
+        internal
+        view
+        returns (Action)
+    {
+        try strategy.harvestTrigger(_callCostInWei) returns (bool trigger) {
+            if (trigger) {
+                return Action.Harvest;
+            }
+        } catch {
+            return Action.None;
+        }
+        try strategy.tendTrigger(_callCostInWei) returns (bool trigger) {
+            if (trigger) {
+                return Action.Tend;
+            }
+        } catch {}
+        return Action.None;
+    }
+}
@@ -7,6 +7,9 @@ import "./Strategy.sol";
 contract LevAaveFactory {
     address public immutable original;
 
+    IProtocolDataProvider private constant protocolDataProvider =
+        IProtocolDataProvider(0x057835Ad21a177dbdd3090bB1CAE03EaCF78Fc6d);
+
     event Cloned(address indexed clone);
     event Deployed(address indexed original);
 
@@ -36,22 +39,64 @@ contract LevAaveFactory {
         external
         returns (address payable newStrategy)
     {
-        // Copied from https://github.com/optionality/clone-factory/blob/master/contracts/CloneFactory.sol
-        bytes20 addressBytes = bytes20(original);
+        bytes memory code = _cloneCode(_vault);
         assembly {
-            // EIP-1167 bytecode
-            let clone_code := mload(0x40)
-            mstore(
-                clone_code,
-                0x3d602d80600a3d3981f3363d3d373d3d3d363d73000000000000000000000000
-            )
-            mstore(add(clone_code, 0x14), addressBytes)
-            mstore(
-                add(clone_code, 0x28),
-                0x5af43d82803e903d91602b57fd5bf30000000000000000000000000000000000
-            )
-            newStrategy := create(0, clone_code, 0x37)
+            newStrategy := create(0, add(code, 0x20), mload(code))
         }
+        _initializeClone(newStrategy, _vault);
+    }
+
+    // Deploys the clone at an address that only depends on the sender,
+    // the vault and the salt, see predictCloneAddress
+    function cloneLevAaveDeterministic(address _vault, bytes32 _salt)
+        external
+        returns (address payable newStrategy)
+    {
+        bytes memory code = _cloneCode(_vault);
+        bytes32 salt = _cloneSalt(msg.sender, _vault, _salt);
+        assembly {
+            newStrategy := create2(0, add(code, 0x20), mload(code), salt)
+        }
+        _initializeClone(newStrategy, _vault);
+    }
+
+    function cloneMany(address[] calldata _vaults)
+        external
+        returns (address[] memory newStrategies)
+    {
+        newStrategies = new address[](_vaults.length);
+        for (uint256 i = 0; i < _vaults.length; i++) {
+            bytes memory code = _cloneCode(_vaults[i]);
+            address payable newStrategy;
+            assembly {
+                newStrategy := create(0, add(code, 0x20), mload(code))
+            }
+            _initializeClone(newStrategy, _vaults[i]);
+            newStrategies[i] = newStrategy;
+        }
+    }
+
+    function predictCloneAddress(
+        address _deployer,
+        address _vault,
+        bytes32 _salt
+    ) external view returns (address) {
+        bytes32 hash =
+            keccak256(
+                abi.encodePacked(
+                    bytes1(0xff),
+                    address(this),
+                    _cloneSalt(_deployer, _vault, _salt),
+                    keccak256(_cloneCode(_vault))
+                )
+            );
+        return address(uint256(hash));
+    }
+
+    function _initializeClone(address payable newStrategy, address _vault)
+        internal
+    {
+        require(newStrategy != address(0)); // dev: clone failed
 
         Strategy(newStrategy).initialize(
             _vault,
@@ -62,4 +107,47 @@ contract LevAaveFactory {
 
         emit Cloned(newStrategy);
     }
+
+    function _cloneSalt(
+        address _deployer,
+        address _vault,
+        bytes32 _salt
+    ) internal pure returns (bytes32) {
+        return keccak256(abi.encodePacked(_deployer, _vault, _salt));
+    }
+
+    // EIP-1167 style proxy that appends immutable args to the calldata it
+    // forwards, see https://github.com/wighawag/clones-with-immutable-args
+    function _cloneCode(address _vault) internal view returns (bytes memory) {
+        address want = VaultAPI(_vault).token();
+        (address aToken, , address debtToken) =
+            protocolDataProvider.getReserveTokensAddresses(want);
+        bytes memory args =
+            abi.encodePacked(
+                want,
+                aToken,
+                debtToken,
+                10**VaultAPI(_vault).decimals()
+            );
+
+        // args are followed by their length in 2 bytes
+        uint16 extraLength = uint16(args.length + 2);
+        return
+            abi.encodePacked(
+                // creation: copy the runtime code and return it
+                hex"61",
+                uint16(0x37 + extraLength),
+                hex"3d81600a3d39f3",
+                // runtime: copy calldata, append args and delegatecall
+                hex"3d3d3d3d363d3d3761",
+                extraLength,
+                hex"603736393661",
+                extraLength,
+                hex"013d73",
+                original,
+                hex"5af43d3d93803e603557fd5bf3",
+                args,
+                uint16(args.length)
+            );
+    }
 }
@@ -0,0 +1,74 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+pragma experimental ABIEncoderV2;
+
+import "@openzeppelin/contracts/math/SafeMath.sol";
+import "@openzeppelin/contracts/utils/Address.sol";
+
+import {Strategy} from "./Strategy.sol";
+
+// Health of a whole fleet of LevAave strategies in a single eth_call. It holds
+// no state, a strategy that fails to answer is flagged instead of reverting.
+contract LevAaveLens {
+    using SafeMath for uint256;
+    using Address for address;
+
+    struct Health {
+        address strategy;
+        bool ok; // false when getSnapshot reverted or there is no contract
+        Strategy.Snapshot snapshot;
+        // collateral ratio left before the liquidation threshold (WAD), 0 past it
+        uint256 distanceToLiquidation;
+        bool triggersOk; // false when a trigger reverted
+        bool harvestTrigger;
+        bool tendTrigger;
+    }
+
+    function getHealth(address[] calldata _strategies, uint256 _callCostInWei)
+        external
+        view
+        returns (Health[] memory health)
+    {
+        health = new Health[](_strategies.length);
+        for (uint256 i = 0; i < _strategies.length; i++) {
+            health[i] = _health(Strategy(_strategies[i]), _callCostInWei);
+        }
+    }
+
+    function _health(Strategy strategy, uint256 _callCostInWei)
+        internal
+        view
+        returns (Health memory health)
+    {
+        health.strategy = address(strategy);
+        // calling an account without code would revert outside of the try
+        if (!address(strategy).isContract()) {
+            return health;
+        }
+
+        // NOTE: a contract answering with malformed data still reverts the call
+        try strategy.getSnapshot() returns (Strategy.Snapshot memory snapshot) {
+            health.ok = true;
+            health.snapshot = snapshot;
+            if (snapshot.liquidationThreshold > snapshot.currentCollatRatio) {
+                health.distanceToLiquidation = snapshot
+                    .liquidationThreshold
+                    .sub(snapshot.currentCollatRatio);
+            }
+        } catch {
+            return health;
+        }
+
+        health.triggersOk = true;
+        try strategy.harvestTrigger(_callCostInWei) returns (bool trigger) {
+            health.harvestTrigger = trigger;
+        } catch {
+            health.triggersOk = false;
+        }
+        try strategy.tendTrigger(_callCostInWei) returns (bool trigger) {
+            health.tendTrigger = trigger;
+        } catch {
+            health.triggersOk = false;
+        }
+    }
+}
@@ -6,7 +6,10 @@ pragma solidity 0.6.12;
 pragma experimental ABIEncoderV2;
 
 // These are the core Yearn libraries
-import {BaseStrategy} from "@yearn/yearn-vaults/contracts/BaseStrategy.sol";
+import {
+    BaseStrategy,
+    StrategyParams
+} from "@yearn/yearn-vaults/contracts/BaseStrategy.sol";
 
 import {
     SafeERC20,
@@ -16,9 +19,11 @@ import {
 } from "@openzeppelin/contracts/token/ERC20/SafeERC20.sol";
 
 import "@openzeppelin/contracts/math/Math.sol";
+import "@openzeppelin/contracts/utils/SafeCast.sol";
 
 import "../interfaces/uniswap/IUni.sol";
 import {ISwapRouter} from "../interfaces/uniswap/ISwapRouter.sol";
+import {IQuoter} from "../interfaces/uniswap/IQuoter.sol";
 
 import "../interfaces/aave/IProtocolDataProvider.sol";
 import "../interfaces/aave/IAaveIncentivesController.sol";
@@ -26,13 +31,16 @@ import "../interfaces/aave/IStakedAave.sol";
 import "../interfaces/aave/IAToken.sol";
 import "../interfaces/aave/IVariableDebtToken.sol";
 import "../interfaces/aave/ILendingPool.sol";
+import "../interfaces/aave/IPriceOracle.sol";
 
 import "./FlashMintLib.sol";
+import {SupportStructs} from "../libraries/SupportStructs.sol";
 
 contract Strategy is BaseStrategy, IERC3156FlashBorrower {
     using SafeERC20 for IERC20;
     using Address for address;
     using SafeMath for uint256;
+    using SafeCast for uint256;
 
     // AAVE protocol address
     IProtocolDataProvider private constant protocolDataProvider =
@@ -41,6 +49,8 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
         IAaveIncentivesController(0xd784927Ff2f95ba542BfC824c8a8a98F3495f6b5);
     ILendingPool private constant lendingPool =
         ILendingPool(0x7d2768dE32b0b80b7a3454c06BdAc94A69DDc7A9);
+    IPriceOracle private constant priceOracle =
+        IPriceOracle(0xA50ba011c48153De246E5192C8f9258A2ba79Ca9);
 
     // Token addresses
     address private constant aave = 0x7Fc66500c84A76Ad7e9c93437bFc5Ac33E2DDaE9;
@@ -49,9 +59,13 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
     address private constant weth = 0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2;
     address private constant dai = 0x6B175474E89094C44Da98b954EedeAC495271d0F;
 
-    // Supply and borrow tokens
-    IAToken public aToken;
-    IVariableDebtToken public debtToken;
+    // Supply and borrow tokens, only stored by the original strategy.
+    // Clones read them from the immutable args appended to their bytecode
+    // by LevAaveFactory: abi.encodePacked(want, aToken, debtToken, 10**decimals)
+    IAToken private originalAToken;
+    IVariableDebtToken private originalDebtToken;
+    uint256 private originalDecimals;
+    address private immutable self;
 
     // represents stkAave cooldown status
     // 0 = no cooldown or past withdraw period
@@ -66,37 +80,118 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
         IUni(0xd9e1cE17f2641f24aE83637ab66a2cca9C378B9F);
     ISwapRouter private constant UNI_V3_ROUTER =
         ISwapRouter(0xE592427A0AEce92De3Edee1F18E0157C05861564);
+    IQuoter private constant UNI_V3_QUOTER =
+        IQuoter(0xb27308f9F90D607463bb33eA1BeBb41C27CE5AB6);
 
     // OPS State Variables
     uint256 private constant DEFAULT_COLLAT_TARGET_MARGIN = 0.02 ether;
     uint256 private constant DEFAULT_COLLAT_MAX_MARGIN = 0.005 ether;
     uint256 private constant LIQUIDATION_WARNING_THRESHOLD = 0.01 ether;
 
-    uint256 public maxBorrowCollatRatio; // The maximum the aave protocol will let us borrow
-    uint256 public targetCollatRatio; // The LTV we are levering up to
-    uint256 public maxCollatRatio; // Closest to liquidation we'll risk
-    uint256 public daiBorrowCollatRatio; // Used for flashmint
+    // NOTE: config is packed so each group below fits in a single storage slot,
+    // keep the declaration order when adding new fields
+
+    // slot: collateral ratios (WAD fractions)
+    uint64 public targetCollatRatio; // The LTV we are levering up to
+    uint64 public maxCollatRatio; // Closest to liquidation we'll risk
+    uint64 public maxBorrowCollatRatio; // The maximum the aave protocol will let us borrow
+    uint64 public daiBorrowCollatRatio; // Used for flashmint
 
+    // slot: operational params
+    uint128 public minWant;
+    uint64 public minRatio;
     uint8 public maxIterations;
     bool public isFlashMintActive;
     bool public withdrawCheck;
-
-    uint256 public minWant;
-    uint256 public minRatio;
-    uint256 public minRewardToSell;
-
-    enum SwapRouter {UniV2, SushiV2, UniV3}
-    SwapRouter public swapRouter = SwapRouter.UniV2; // only applied to aave => want, stkAave => aave always uses v3
-
+    bool private alreadyAdjusted; // Signal whether a position adjust was done in prepareReturn
+    uint32 public flashGasBudget; // Gas we are willing to spend chaining flash unwinds
+
+    // slot: reward params
+    // UniV3Route sells stkAave straight to want through its v3 pools, in a
+    // single swap, and AAVE through v3. Best sells AAVE on whichever router
+    // quotes the most want for it
+    enum SwapRouter {UniV2, SushiV2, UniV3, UniV3Route, Best}
+    uint128 public minRewardToSell;
+    SwapRouter public swapRouter; // only applied to aave => want, stkAave => aave always uses v3
     bool public sellStkAave;
     bool public cooldownStkAave;
-    uint256 public maxStkAavePriceImpactBps;
-
+    uint16 public maxStkAavePriceImpactBps;
     uint24 public stkAaveToAaveSwapFee;
     uint24 public aaveToWethSwapFee;
     uint24 public wethToWantSwapFee;
+    enum ValuationMode {Router, Oracle}
+    ValuationMode public valuationMode; // how rewards and gas costs are priced in want
+    // harvests claim and sell rewards once worth this many times their gas
+    uint8 public rewardClaimGasMultiple;
+
+    // A reward sale to want kept the rewards: without an oracle price to
+    // bound it (minOut is 0), with the best quote under minOut, or because
+    // the swap reverted
+    event RewardSaleSkipped(
+        address token,
+        SwapRouter swapRouter,
+        uint256 amountIn,
+        uint256 minOut
+    );
+
+    // slot: flash lender and protocol risk params cache
+    // Optional ERC-3156 lender of want, used instead of DssFlash when it is free
+    address public wantFlashLender;
+    // aave ltv and liquidation thresholds (bps), synced on every harvest
+    uint16 public wantLtvBps;
+    uint16 public wantLiquidationThresholdBps;
+    uint16 public daiLtvBps;
+    uint16 public daiLiquidationThresholdBps;
+    uint32 public protocolParamsSyncedAt;
+
+    // slot: loose want kept to serve withdrawals without deleveraging, the
+    // larger of an amount and a share (bps) of the strategy's assets. Also
+    // read by harvests: how far under the oracle price rewards sell to want
+    uint128 public idleWant;
+    uint16 public idleWantBps;
+    uint16 public rewardSaleSlippageBps;
+
+    // slot: strategy moving its position here and the DAI collateral it
+    // lent us for it, only set during a migration
+    address private migrationSource;
+    uint96 private migrationDAI;
+
+    // Hot config read by harvest, tend and withdrawals
+    struct Config {
+        uint64 targetCollatRatio;
+        uint64 maxCollatRatio;
+        uint64 maxBorrowCollatRatio;
+        uint64 daiBorrowCollatRatio;
+        uint128 minWant;
+        uint64 minRatio;
+        uint8 maxIterations;
+        bool isFlashMintActive;
+        bool withdrawCheck;
+        uint32 flashGasBudget;
+    }
 
-    bool private alreadyAdjusted; // Signal whether a position adjust was done in prepareReturn
+    // Everything monitoring needs, read in a single call
+    struct Snapshot {
+        StrategyParams params; // vault accounting of this strategy
+        uint256 looseWant;
+        uint256 deposits;
+        uint256 borrows;
+        uint256 estimatedTotalAssets;
+        uint256 currentCollatRatio;
+        uint256 targetCollatRatio;
+        uint256 maxCollatRatio;
+        uint256 maxBorrowCollatRatio;
+        uint256 ltv; // protocol ratios of want (WAD), as tendTrigger sees them
+        uint256 liquidationThreshold;
+        uint256 aaveBalance;
+        uint256 stkAaveBalance;
+        uint256 pendingRewards; // stkAave claimable from the incentives controller
+        uint256 estimatedRewardsInWant;
+        CooldownStatus cooldownStatus;
+        uint256 cooldownStartTimestamp;
+        uint256 protocolParamsSyncedAt;
+        uint256 flashLiquidity; // DAI DssFlash can mint right now
+    }
 
     uint16 private constant referral = 7; // Yearn's aave referral code
 
@@ -104,10 +199,24 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
     uint256 private constant BPS_WAD_RATIO = 1e14;
     uint256 private constant COLLATERAL_RATIO_PRECISION = 1 ether;
     uint256 private constant PESSIMISM_FACTOR = 1000;
-    uint256 private DECIMALS;
+    uint256 private constant PROTOCOL_PARAMS_MAX_AGE = 1 days;
+    // upper bound of manualClaimAndSellRewards' gas on every swap router,
+    // checked against the gas benchmark in tests/gas
+    uint256 public constant CLAIM_AND_SELL_GAS = 500_000;
+    // gas each router may use to quote, it is skipped when it runs out
+    uint256 private constant QUOTE_GAS_BUDGET = 300_000;
 
     constructor(address _vault) public BaseStrategy(_vault) {
-        _initializeThis();
+        self = address(this);
+
+        // Set aave tokens
+        (address _aToken, , address _debtToken) =
+            protocolDataProvider.getReserveTokensAddresses(address(want));
+        originalAToken = IAToken(_aToken);
+        originalDebtToken = IVariableDebtToken(_debtToken);
+        originalDecimals = 10**vault.decimals();
+
+        _initializeThis(_aToken);
     }
 
     function initialize(
@@ -117,16 +226,18 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
         address _keeper
     ) external {
         _initialize(_vault, _strategist, _rewards, _keeper);
-        _initializeThis();
+        // NOTE: clones must be created with the args of their vault's want
+        require(_getArgAddress(0) == address(want));
+        _initializeThis(_getArgAddress(20));
     }
 
-    function _initializeThis() internal {
-        require(address(aToken) == address(0));
-
+    // NOTE: runs from the constructor, it can't read immutables
+    function _initializeThis(address _aToken) internal {
         // initialize operational state
         maxIterations = 6;
         isFlashMintActive = true;
         withdrawCheck = false;
+        flashGasBudget = 6e6;
 
         // mins
         minWant = 100;
@@ -142,31 +253,28 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
         stkAaveToAaveSwapFee = 3000;
         aaveToWethSwapFee = 3000;
         wethToWantSwapFee = 3000;
+        rewardClaimGasMultiple = 2;
+        rewardSaleSlippageBps = 500;
 
         alreadyAdjusted = false;
 
-        // Set aave tokens
-        (address _aToken, , address _debtToken) =
-            protocolDataProvider.getReserveTokensAddresses(address(want));
-        aToken = IAToken(_aToken);
-        debtToken = IVariableDebtToken(_debtToken);
-
         // Let collateral targets
+        _syncProtocolParams();
         (uint256 ltv, uint256 liquidationThreshold) =
             getProtocolCollatRatios(address(want));
-        targetCollatRatio = liquidationThreshold.sub(
-            DEFAULT_COLLAT_TARGET_MARGIN
-        );
-        maxCollatRatio = liquidationThreshold.sub(DEFAULT_COLLAT_MAX_MARGIN);
-        maxBorrowCollatRatio = ltv.sub(DEFAULT_COLLAT_MAX_MARGIN);
         (uint256 daiLtv, ) = getProtocolCollatRatios(dai);
-        daiBorrowCollatRatio = daiLtv.sub(DEFAULT_COLLAT_MAX_MARGIN);
-
-        DECIMALS = 10**vault.decimals();
+        targetCollatRatio = liquidationThreshold
+            .sub(DEFAULT_COLLAT_TARGET_MARGIN)
+            .toUint64();
+        maxCollatRatio = liquidationThreshold
+            .sub(DEFAULT_COLLAT_MAX_MARGIN)
+            .toUint64();
+        maxBorrowCollatRatio = ltv.sub(DEFAULT_COLLAT_MAX_MARGIN).toUint64();
+        daiBorrowCollatRatio = daiLtv.sub(DEFAULT_COLLAT_MAX_MARGIN).toUint64();
 
         // approve spend aave spend
         approveMaxSpend(address(want), address(lendingPool));
-        approveMaxSpend(address(aToken), address(lendingPool));
+        approveMaxSpend(_aToken, address(lendingPool));
 
         // approve flashloan spend
         address _dai = dai;
@@ -198,10 +306,11 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
         require(_maxBorrowCollatRatio < ltv);
         require(_daiBorrowCollatRatio < daiLtv);
 
-        targetCollatRatio = _targetCollatRatio;
-        maxCollatRatio = _maxCollatRatio;
-        maxBorrowCollatRatio = _maxBorrowCollatRatio;
-        daiBorrowCollatRatio = _daiBorrowCollatRatio;
+        // NOTE: all ratios are below 1 ether, they always fit in 64 bits
+        targetCollatRatio = uint64(_targetCollatRatio);
+        maxCollatRatio = uint64(_maxCollatRatio);
+        maxBorrowCollatRatio = uint64(_maxBorrowCollatRatio);
+        daiBorrowCollatRatio = uint64(_daiBorrowCollatRatio);
     }
 
     function setIsFlashMintActive(bool _isFlashMintActive)
@@ -211,6 +320,59 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
         isFlashMintActive = _isFlashMintActive;
     }
 
+    function setWantFlashLender(address _wantFlashLender)
+        external
+        onlyGovernance
+    {
+        require(_wantFlashLender != FlashMintLib.LENDER);
+        address _previous = wantFlashLender;
+        if (_previous != address(0)) {
+            want.safeApprove(_previous, 0);
+        }
+        if (_wantFlashLender != address(0)) {
+            approveMaxSpend(address(want), _wantFlashLender);
+        }
+        wantFlashLender = _wantFlashLender;
+    }
+
+    function setFlashGasBudget(uint256 _flashGasBudget)
+        external
+        onlyVaultManagers
+    {
+        flashGasBudget = _flashGasBudget.toUint32();
+    }
+
+    function setValuationMode(ValuationMode _valuationMode)
+        external
+        onlyVaultManagers
+    {
+        valuationMode = _valuationMode;
+    }
+
+    function setRewardClaimGasMultiple(uint8 _rewardClaimGasMultiple)
+        external
+        onlyVaultManagers
+    {
+        rewardClaimGasMultiple = _rewardClaimGasMultiple;
+    }
+
+    function setRewardSaleSlippage(uint256 _rewardSaleSlippageBps)
+        external
+        onlyVaultManagers
+    {
+        require(_rewardSaleSlippageBps <= MAX_BPS);
+        rewardSaleSlippageBps = uint16(_rewardSaleSlippageBps);
+    }
+
+    function setIdleWantBuffer(uint256 _idleWant, uint256 _idleWantBps)
+        external
+        onlyVaultManagers
+    {
+        require(_idleWantBps <= MAX_BPS);
+        idleWant = _idleWant.toUint128();
+        idleWantBps = uint16(_idleWantBps);
+    }
+
     function setWithdrawCheck(bool _withdrawCheck) external onlyVaultManagers {
         withdrawCheck = _withdrawCheck;
     }
@@ -222,8 +384,8 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
     ) external onlyVaultManagers {
         require(_minRatio < maxBorrowCollatRatio);
         require(_maxIterations > 0 && _maxIterations < 16);
-        minWant = _minWant;
-        minRatio = _minRatio;
+        minWant = _minWant.toUint128();
+        minRatio = uint64(_minRatio);
         maxIterations = _maxIterations;
     }
 
@@ -240,19 +402,67 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
         require(
             _swapRouter == SwapRouter.UniV2 ||
                 _swapRouter == SwapRouter.SushiV2 ||
-                _swapRouter == SwapRouter.UniV3
+                _swapRouter == SwapRouter.UniV3 ||
+                _swapRouter == SwapRouter.UniV3Route ||
+                _swapRouter == SwapRouter.Best
         );
         require(_maxStkAavePriceImpactBps <= MAX_BPS);
         swapRouter = _swapRouter;
         sellStkAave = _sellStkAave;
         cooldownStkAave = _cooldownStkAave;
-        minRewardToSell = _minRewardToSell;
-        maxStkAavePriceImpactBps = _maxStkAavePriceImpactBps;
+        minRewardToSell = _minRewardToSell.toUint128();
+        maxStkAavePriceImpactBps = uint16(_maxStkAavePriceImpactBps);
         stkAaveToAaveSwapFee = _stkAaveToAaveSwapFee;
         aaveToWethSwapFee = _aaveToWethSwapFee;
         wethToWantSwapFee = _wethToWantSwapFee;
     }
 
+    function getConfig() external view returns (Config memory) {
+        return
+            Config(
+                targetCollatRatio,
+                maxCollatRatio,
+                maxBorrowCollatRatio,
+                daiBorrowCollatRatio,
+                minWant,
+                minRatio,
+                maxIterations,
+                isFlashMintActive,
+                withdrawCheck,
+                flashGasBudget
+            );
+    }
+
+    function getSnapshot() external view returns (Snapshot memory snapshot) {
+        snapshot.params = vault.strategies(address(this));
+        snapshot.looseWant = balanceOfWant();
+        (snapshot.deposits, snapshot.borrows) = getCurrentPosition();
+        snapshot.estimatedTotalAssets = estimatedTotalAssets();
+        snapshot.currentCollatRatio = getCollatRatio(
+            snapshot.deposits,
+            snapshot.borrows
+        );
+        snapshot.targetCollatRatio = targetCollatRatio;
+        snapshot.maxCollatRatio = maxCollatRatio;
+        snapshot.maxBorrowCollatRatio = maxBorrowCollatRatio;
+        (snapshot.ltv, snapshot.liquidationThreshold) = getProtocolCollatRatios(
+            address(want)
+        );
+        snapshot.aaveBalance = balanceOfAave();
+        snapshot.stkAaveBalance = balanceOfStkAave();
+        snapshot.pendingRewards = incentivesController.getRewardsBalance(
+            getAaveAssets(),
+            address(this)
+        );
+        snapshot.estimatedRewardsInWant = estimatedRewardsInWant();
+        snapshot.cooldownStatus = _checkCooldown();
+        snapshot.cooldownStartTimestamp = stkAave.stakersCooldowns(
+            address(this)
+        );
+        snapshot.protocolParamsSyncedAt = protocolParamsSyncedAt;
+        snapshot.flashLiquidity = FlashMintLib.maxLiquidity();
+    }
+
     function name() external view override returns (string memory) {
         return "StrategyGenLevAAVE-Flashmint";
     }
@@ -291,6 +501,32 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
         return tokenToWant(aave, aaveBalance.add(combinedStkAave));
     }
 
+    // Whether a harvest at gasPrice claims and sells the rewards. Both sides
+    // are compared in ETH at the oracle price, so harvests don't pay for a
+    // router quote to make the decision
+    function shouldClaimRewards(uint256 gasPrice) public view returns (bool) {
+        uint256 _rewardClaimGasMultiple = rewardClaimGasMultiple;
+        if (_rewardClaimGasMultiple == 0) {
+            return true;
+        }
+        uint256 rewards =
+            incentivesController
+                .getRewardsBalance(getAaveAssets(), address(this))
+                .add(balanceOfStkAave())
+                .add(balanceOfAave());
+        uint256 aavePrice = priceOracle.getAssetPrice(aave);
+
+        // nothing to weigh the gas against (an eth_call, a bundle paying the
+        // miner directly, or no oracle price): claim once there is enough
+        // to sell
+        if (gasPrice == 0 || aavePrice == 0) {
+            return rewards > minRewardToSell;
+        }
+        uint256 gasCost =
+            CLAIM_AND_SELL_GAS.mul(gasPrice).mul(_rewardClaimGasMultiple);
+        return rewards.mul(aavePrice).div(1e18) > gasCost;
+    }
+
     function prepareReturn(uint256 _debtOutstanding)
         internal
         override
@@ -300,15 +536,22 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
             uint256 _debtPayment
         )
     {
-        // claim & sell rewards
-        _claimAndSellRewards();
+        // keep the cached protocol risk params fresh for tendTrigger
+        _syncProtocolParams();
+
+        // claim & sell rewards, unless they're dust next to the gas it costs
+        if (shouldClaimRewards(tx.gasprice)) {
+            _claimAndSellRewards();
+        }
 
         // account for profit / losses
         uint256 totalDebt = vault.strategies(address(this)).totalDebt;
 
         // Assets immediately convertable to want only
-        uint256 supply = getCurrentSupply();
-        uint256 totalAssets = balanceOfWant().add(supply);
+        SupportStructs.Position memory position = getPosition();
+        uint256 amountAvailable = balanceOfWant();
+        uint256 totalAssets =
+            amountAvailable.add(position.deposits).sub(position.borrows);
 
         if (totalDebt > totalAssets) {
             // we have losses
@@ -319,14 +562,16 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
         }
 
         // free funds to repay debt + profit to the strategy
-        uint256 amountAvailable = balanceOfWant();
         uint256 amountRequired = _debtOutstanding.add(_profit);
 
         if (amountRequired > amountAvailable) {
-            // we need to free funds
+            // we need to free funds, refilling the withdrawal buffer with them
             // we dismiss losses here, they cannot be generated from withdrawal
             // but it is possible for the strategy to unwind full position
-            (amountAvailable, ) = liquidatePosition(amountRequired);
+            (amountAvailable, ) = _liquidatePosition(
+                amountRequired.add(idleWantBuffer(position, amountAvailable)),
+                position
+            );
 
             // Don't do a redundant adjustment in adjustPosition
             alreadyAdjusted = true;
@@ -368,49 +613,80 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
         }
 
         uint256 wantBalance = balanceOfWant();
-        // deposit available want as collateral
-        if (
-            wantBalance > _debtOutstanding &&
-            wantBalance.sub(_debtOutstanding) > minWant
-        ) {
-            _depositCollateral(wantBalance.sub(_debtOutstanding));
-            // we update the value
-            wantBalance = balanceOfWant();
+        SupportStructs.Position memory position = getPosition();
+        // the debt outstanding and the withdrawal buffer stay loose
+        uint256 toKeep =
+            _debtOutstanding.add(idleWantBuffer(position, wantBalance));
+        // available want to be deposited as collateral
+        uint256 toDeposit;
+        if (wantBalance > toKeep && wantBalance.sub(toKeep) > minWant) {
+            toDeposit = wantBalance.sub(toKeep);
         }
-        // check current position
-        uint256 currentCollatRatio = getCurrentCollatRatio();
+
+        // check current position, accounting for the want we are about to deposit
+        uint256 currentCollatRatio =
+            getCollatRatio(position.deposits.add(toDeposit), position.borrows);
+        uint256 _targetCollatRatio = targetCollatRatio;
 
         // Either we need to free some funds OR we want to be max levered
-        if (_debtOutstanding > wantBalance) {
-            // we should free funds
-            uint256 amountRequired = _debtOutstanding.sub(wantBalance);
+        if (
+            _debtOutstanding > wantBalance ||
+            toKeep > wantBalance.add(minWant)
+        ) {
+            // we should free funds, refilling the buffer
+            uint256 amountRequired = toKeep.sub(wantBalance);
 
             // NOTE: vault will take free funds during the next harvest
-            _freeFunds(amountRequired);
-        } else if (currentCollatRatio < targetCollatRatio) {
-            // we should lever up
-            if (targetCollatRatio.sub(currentCollatRatio) > minRatio) {
-                // we only act on relevant differences
-                _leverMax();
-            }
-        } else if (currentCollatRatio > targetCollatRatio) {
-            if (currentCollatRatio.sub(targetCollatRatio) > minRatio) {
-                (uint256 deposits, uint256 borrows) = getCurrentPosition();
+            _freeFunds(amountRequired, position);
+        } else if (
+            currentCollatRatio < _targetCollatRatio &&
+            _targetCollatRatio.sub(currentCollatRatio) > minRatio
+        ) {
+            // we should lever up, we only act on relevant differences
+            // NOTE: loose want is deposited while levering up
+            _leverMax(position, toDeposit);
+        } else {
+            position.deposits = position.deposits.add(
+                _depositCollateral(toDeposit)
+            );
+
+            if (
+                currentCollatRatio > _targetCollatRatio &&
+                currentCollatRatio.sub(_targetCollatRatio) > minRatio
+            ) {
                 uint256 newBorrow =
                     getBorrowFromSupply(
-                        deposits.sub(borrows),
-                        targetCollatRatio
+                        position.deposits.sub(position.borrows),
+                        _targetCollatRatio
                     );
-                _leverDownTo(newBorrow, borrows);
+                _leverDownTo(newBorrow, position);
             }
         }
     }
 
+    // Loose want kept to serve withdrawals, refilled by harvests and tends
+    function idleWantBuffer(
+        SupportStructs.Position memory position,
+        uint256 wantBalance
+    ) internal view returns (uint256) {
+        uint256 realAssets =
+            wantBalance.add(position.deposits).sub(position.borrows);
+        return
+            Math.max(idleWant, realAssets.mul(idleWantBps).div(MAX_BPS));
+    }
+
     function liquidatePosition(uint256 _amountNeeded)
         internal
         override
         returns (uint256 _liquidatedAmount, uint256 _loss)
     {
+        return _liquidatePosition(_amountNeeded, getPosition());
+    }
+
+    function _liquidatePosition(
+        uint256 _amountNeeded,
+        SupportStructs.Position memory position
+    ) internal returns (uint256 _liquidatedAmount, uint256 _loss) {
         // NOTE: Maintain invariant `want.balanceOf(this) >= _liquidatedAmount`
         // NOTE: Maintain invariant `_liquidatedAmount + _loss <= _amountNeeded`
         uint256 wantBalance = balanceOfWant();
@@ -421,7 +697,7 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
 
         // we need to free funds
         uint256 amountRequired = _amountNeeded.sub(wantBalance);
-        _freeFunds(amountRequired);
+        _freeFunds(amountRequired, position);
 
         uint256 freeAssets = balanceOfWant();
         if (_amountNeeded > freeAssets) {
@@ -466,8 +742,88 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
         (_amountFreed, ) = liquidatePosition(type(uint256).max);
     }
 
+    // NOTE: a levered position is handed over as it is, without unwinding
+    // it, which needs _newStrategy to implement acceptMigration: migrating
+    // to a different contract type reverts until the position is unwound
+    // (revoke the strategy and harvest it first)
     function prepareMigration(address _newStrategy) internal override {
-        require(getCurrentSupply() < minWant);
+        // rewards accrue to this address, they move with the position. A
+        // stkAave cooldown in progress doesn't carry over
+        incentivesController.claimRewards(
+            getAaveAssets(),
+            type(uint256).max,
+            address(this)
+        );
+        uint256 stkAaveBalance = balanceOfStkAave();
+        if (stkAaveBalance > 0) {
+            stkAave.claimRewards(address(this), type(uint256).max);
+            IERC20(address(stkAave)).safeTransfer(
+                _newStrategy,
+                stkAaveBalance
+            );
+        }
+        uint256 aaveBalance = balanceOfAave();
+        if (aaveBalance > 0) {
+            IERC20(aave).safeTransfer(_newStrategy, aaveBalance);
+        }
+
+        (uint256 deposits, uint256 borrows) = getCurrentPosition();
+        if (borrows > 0) {
+            // past want's ltv the position is handed over in onFlashLoan
+            uint256 requiredDAI =
+                FlashMintLib.migratePosition(
+                    _newStrategy,
+                    deposits,
+                    maxBorrowCollatRatio,
+                    _flashRequest(false, borrows)
+                );
+            if (requiredDAI == 0) {
+                _handOverPosition(_newStrategy, borrows, 0);
+            }
+        }
+
+        uint256 aTokenBalance = balanceOfAToken();
+        if (aTokenBalance > 0) {
+            IERC20(address(aToken())).safeTransfer(
+                _newStrategy,
+                aTokenBalance
+            );
+        }
+    }
+
+    // Called by a strategy of our vault handing its position over to this
+    // one, only while we hold none: takes _amountDAI from it as extra
+    // collateral and lets it reopen its debt in our name. The same
+    // prepareMigration ends it with completeMigration
+    function acceptMigration(uint256 _borrows, uint256 _amountDAI) external {
+        require(vault.strategies(msg.sender).activation > 0);
+        require(balanceOfAToken() == 0 && balanceOfDebtToken() == 0);
+        require(_amountDAI <= type(uint96).max);
+        migrationSource = msg.sender;
+        if (_amountDAI > 0) {
+            migrationDAI = uint96(_amountDAI);
+            IERC20(dai).safeTransferFrom(
+                msg.sender,
+                address(this),
+                _amountDAI
+            );
+            lendingPool.deposit(dai, _amountDAI, address(this), referral);
+        }
+        debtToken().approveDelegation(msg.sender, _borrows);
+    }
+
+    // Returns the DAI taken by acceptMigration, once we hold the position,
+    // and revokes what is left of the credit
+    function completeMigration() external {
+        address source = migrationSource;
+        require(msg.sender == source);
+        uint256 amountDAI = migrationDAI;
+        migrationSource = address(0);
+        migrationDAI = 0;
+        debtToken().approveDelegation(source, 0);
+        if (amountDAI > 0) {
+            lendingPool.withdraw(dai, amountDAI, source);
+        }
     }
 
     function protectedTokens()
@@ -528,130 +884,157 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
         }
 
         // Always keep 1 wei to get around cooldown clear
-        if (sellStkAave && stkAaveBalance >= minRewardToSell.add(1)) {
-            uint256 minAAVEOut =
-                stkAaveBalance.mul(MAX_BPS.sub(maxStkAavePriceImpactBps)).div(
-                    MAX_BPS
-                );
-            _sellSTKAAVEToAAVE(stkAaveBalance.sub(1), minAAVEOut);
+        if (sellStkAave && stkAaveBalance > minRewardToSell) {
+            if (swapRouter == SwapRouter.UniV3Route) {
+                _sellSTKAAVEForWant(stkAaveBalance.sub(1));
+            } else {
+                uint256 minAAVEOut =
+                    stkAaveBalance
+                        .mul(MAX_BPS.sub(maxStkAavePriceImpactBps))
+                        .div(MAX_BPS);
+                _sellSTKAAVEToAAVE(stkAaveBalance.sub(1), minAAVEOut);
+            }
         }
 
         // sell AAVE for want
         uint256 aaveBalance = balanceOfAave();
         if (aaveBalance >= minRewardToSell) {
-            _sellAAVEForWant(aaveBalance, 0);
+            _sellAAVEForWant(aaveBalance);
         }
     }
 
-    function _freeFunds(uint256 amountToFree) internal returns (uint256) {
+    function _freeFunds(
+        uint256 amountToFree,
+        SupportStructs.Position memory position
+    ) internal returns (uint256) {
         if (amountToFree == 0) return 0;
 
-        (uint256 deposits, uint256 borrows) = getCurrentPosition();
-
-        uint256 realAssets = deposits.sub(borrows);
+        uint256 realAssets = position.deposits.sub(position.borrows);
         uint256 amountRequired = Math.min(amountToFree, realAssets);
         uint256 newSupply = realAssets.sub(amountRequired);
         uint256 newBorrow = getBorrowFromSupply(newSupply, targetCollatRatio);
 
         // repay required amount
-        _leverDownTo(newBorrow, borrows);
+        _leverDownTo(newBorrow, position);
 
         return balanceOfWant();
     }
 
-    function _leverMax() internal {
-        (uint256 deposits, uint256 borrows) = getCurrentPosition();
-
+    function _leverMax(
+        SupportStructs.Position memory position,
+        uint256 toDeposit
+    ) internal {
         // NOTE: decimals should cancel out
-        uint256 realSupply = deposits.sub(borrows);
+        uint256 realSupply =
+            position.deposits.add(toDeposit).sub(position.borrows);
         uint256 newBorrow = getBorrowFromSupply(realSupply, targetCollatRatio);
-        uint256 totalAmountToBorrow = newBorrow.sub(borrows);
+        uint256 totalAmountToBorrow = newBorrow.sub(position.borrows);
 
-        if (isFlashMintActive) {
-            // The best approach is to lever up using regular method, then finish with flash loan
+        if (isFlashMintActive && totalAmountToBorrow > minWant) {
+            // The whole borrow is known upfront: a single flash mint deposits
+            // toDeposit and borrows the final amount in one callback
+            _leverUpFlashLoan(totalAmountToBorrow, position, toDeposit);
+            return;
+        }
+
+        position.deposits = position.deposits.add(
+            _depositCollateral(toDeposit)
+        );
+
+        for (
+            uint8 i = 0;
+            i < maxIterations && totalAmountToBorrow > minWant;
+            i++
+        ) {
             totalAmountToBorrow = totalAmountToBorrow.sub(
-                _leverUpStep(totalAmountToBorrow)
+                _leverUpStep(totalAmountToBorrow, position)
             );
-
-            if (totalAmountToBorrow > minWant) {
-                totalAmountToBorrow = totalAmountToBorrow.sub(
-                    _leverUpFlashLoan(totalAmountToBorrow)
-                );
-            }
-        } else {
-            for (
-                uint8 i = 0;
-                i < maxIterations && totalAmountToBorrow > minWant;
-                i++
-            ) {
-                totalAmountToBorrow = totalAmountToBorrow.sub(
-                    _leverUpStep(totalAmountToBorrow)
-                );
-            }
         }
     }
 
-    function _leverUpFlashLoan(uint256 amount) internal returns (uint256) {
-        (uint256 deposits, uint256 borrows) = getCurrentPosition();
+    function _leverUpFlashLoan(
+        uint256 amount,
+        SupportStructs.Position memory position,
+        uint256 toDeposit
+    ) internal returns (uint256) {
+        FlashMintLib.FlashRequest memory request =
+            _flashRequest(false, amount);
+        uint256 _maxBorrowCollatRatio = maxBorrowCollatRatio;
+
+        // NOTE: loose want is deposited after borrowing, so it is not
+        // counted towards closing the LTV gap
         uint256 depositsToMeetLtv =
-            getDepositFromBorrow(borrows, maxBorrowCollatRatio);
-        uint256 depositsDeficitToMeetLtv = 0;
-        if (depositsToMeetLtv > deposits) {
-            depositsDeficitToMeetLtv = depositsToMeetLtv.sub(deposits);
-        }
-        return
-            FlashMintLib.doFlashMint(
-                false,
-                amount,
-                address(want),
-                daiBorrowCollatRatio,
-                depositsDeficitToMeetLtv
+            getDepositFromBorrow(position.borrows, _maxBorrowCollatRatio);
+        if (depositsToMeetLtv > position.deposits) {
+            request.depositToCloseLTVGap = depositsToMeetLtv.sub(
+                position.deposits
             );
+        }
+
+        // lending want directly only works if aave lets us borrow it back
+        // against our own deposits, without extra DAI collateral
+        request.wantRouteAllowed =
+            getBorrowFromDeposit(
+                position.deposits.add(toDeposit).add(amount),
+                _maxBorrowCollatRatio
+            ) >=
+            position.borrows.add(amount);
+
+        // only the want adjustPosition chose is deposited, the debt
+        // outstanding and dust stay loose
+        request.toDeposit = toDeposit;
+
+        return FlashMintLib.doFlashMint(request);
     }
 
-    function _leverUpStep(uint256 amount) internal returns (uint256) {
+    function _leverUpStep(
+        uint256 amount,
+        SupportStructs.Position memory position
+    ) internal returns (uint256) {
         if (amount == 0) {
             return 0;
         }
 
-        uint256 wantBalance = balanceOfWant();
-
         // calculate how much borrow can I take
-        (uint256 deposits, uint256 borrows) = getCurrentPosition();
         uint256 canBorrow =
-            getBorrowFromDeposit(
-                deposits.add(wantBalance),
-                maxBorrowCollatRatio
-            );
+            getBorrowFromDeposit(position.deposits, maxBorrowCollatRatio);
 
-        if (canBorrow <= borrows) {
+        if (canBorrow <= position.borrows) {
             return 0;
         }
-        canBorrow = canBorrow.sub(borrows);
+        canBorrow = canBorrow.sub(position.borrows);
 
         if (canBorrow < amount) {
             amount = canBorrow;
         }
 
-        // deposit available want as collateral
-        _depositCollateral(wantBalance);
-
-        // borrow available amount
+        // borrow available amount and deposit it as collateral
         _borrowWant(amount);
+        _depositCollateral(amount);
+
+        position.borrows = position.borrows.add(amount);
+        position.deposits = position.deposits.add(amount);
 
         return amount;
     }
 
-    function _leverDownTo(uint256 newAmountBorrowed, uint256 currentBorrowed)
-        internal
-    {
-        if (currentBorrowed > newAmountBorrowed) {
-            uint256 totalRepayAmount = currentBorrowed.sub(newAmountBorrowed);
+    function _leverDownTo(
+        uint256 newAmountBorrowed,
+        SupportStructs.Position memory position
+    ) internal {
+        if (position.borrows > newAmountBorrowed) {
+            uint256 totalRepayAmount = position.borrows.sub(newAmountBorrowed);
 
             if (isFlashMintActive) {
-                totalRepayAmount = totalRepayAmount.sub(
-                    _leverDownFlashLoan(totalRepayAmount)
+                totalRepayAmount = _leverDownFlashRounds(
+                    totalRepayAmount,
+                    newAmountBorrowed,
+                    position
                 );
+                if (totalRepayAmount == 0) {
+                    // position is already on target, no rebalance needed
+                    return;
+                }
             }
 
             uint256 _maxCollatRatio = maxCollatRatio;
@@ -661,7 +1044,7 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
                 i < maxIterations && totalRepayAmount > minWant;
                 i++
             ) {
-                _withdrawExcessCollateral(_maxCollatRatio);
+                _withdrawExcessCollateral(_maxCollatRatio, position);
                 uint256 toRepay = totalRepayAmount;
                 uint256 wantBalance = balanceOfWant();
                 if (toRepay > wantBalance) {
@@ -669,49 +1052,105 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
                 }
                 uint256 repaid = _repayWant(toRepay);
                 totalRepayAmount = totalRepayAmount.sub(repaid);
+                position.borrows = position.borrows.sub(repaid);
             }
+
+            // aave rounding makes tracked balances drift by a few wei,
+            // re-read them before withdrawing the excess collateral
+            (position.deposits, position.borrows) = getCurrentPosition();
         }
 
         // deposit back to get targetCollatRatio (we always need to leave this in this ratio)
-        (uint256 deposits, uint256 borrows) = getCurrentPosition();
         uint256 _targetCollatRatio = targetCollatRatio;
         uint256 targetDeposit =
-            getDepositFromBorrow(borrows, _targetCollatRatio);
-        if (targetDeposit > deposits) {
-            uint256 toDeposit = targetDeposit.sub(deposits);
+            getDepositFromBorrow(position.borrows, _targetCollatRatio);
+        if (targetDeposit > position.deposits) {
+            uint256 toDeposit = targetDeposit.sub(position.deposits);
             if (toDeposit > minWant) {
                 _depositCollateral(Math.min(toDeposit, balanceOfWant()));
             }
         } else {
-            _withdrawExcessCollateral(_targetCollatRatio);
+            _withdrawExcessCollateral(_targetCollatRatio, position);
         }
     }
 
-    function _leverDownFlashLoan(uint256 amount) internal returns (uint256) {
-        if (amount <= minWant) return 0;
-        (, uint256 borrows) = getCurrentPosition();
-        if (amount > borrows) {
-            amount = borrows;
+    // Chains flash unwinds until the repayment is done or the gas budget is
+    // spent, every round but the last one is capped by the lender's liquidity.
+    // Returns the amount left to repay, 0 if the position is on target.
+    function _leverDownFlashRounds(
+        uint256 totalRepayAmount,
+        uint256 newAmountBorrowed,
+        SupportStructs.Position memory position
+    ) internal returns (uint256) {
+        uint256 gasStart = gasleft();
+        uint256 _flashGasBudget = flashGasBudget;
+        uint256 targetDeposit =
+            getDepositFromBorrow(newAmountBorrowed, targetCollatRatio);
+
+        while (gasStart.sub(gasleft()) < _flashGasBudget) {
+            // withdraw exactly what is needed to land on targetCollatRatio:
+            // the repayment plus the want we are freeing
+            uint256 amountToFree = 0;
+            if (position.deposits > targetDeposit.add(totalRepayAmount)) {
+                amountToFree = position.deposits.sub(targetDeposit).sub(
+                    totalRepayAmount
+                );
+            }
+            uint256 repaid =
+                _leverDownFlashLoan(totalRepayAmount, amountToFree);
+            if (repaid == 0) {
+                break;
+            }
+            if (repaid == totalRepayAmount) {
+                return 0;
+            }
+            // aave rounding makes tracked balances drift by a few wei, size
+            // the next round from the real position so a full exit neither
+            // overdraws the aTokens nor leaves dust debt behind
+            (position.deposits, position.borrows) = getCurrentPosition();
+            if (position.borrows <= newAmountBorrowed) {
+                return 0;
+            }
+            totalRepayAmount = position.borrows.sub(newAmountBorrowed);
         }
-        return
-            FlashMintLib.doFlashMint(
-                true,
-                amount,
-                address(want),
-                daiBorrowCollatRatio,
-                0
-            );
+
+        return totalRepayAmount;
     }
 
-    function _withdrawExcessCollateral(uint256 collatRatio)
+    function _leverDownFlashLoan(uint256 amount, uint256 amountToFree)
         internal
-        returns (uint256 amount)
+        returns (uint256)
     {
-        (uint256 deposits, uint256 borrows) = getCurrentPosition();
-        uint256 theoDeposits = getDepositFromBorrow(borrows, collatRatio);
-        if (deposits > theoDeposits) {
-            uint256 toWithdraw = deposits.sub(theoDeposits);
-            return _withdrawCollateral(toWithdraw);
+        if (amount <= minWant) return 0;
+        FlashMintLib.FlashRequest memory request = _flashRequest(true, amount);
+        request.amountToFree = amountToFree;
+        // repaying never needs extra collateral
+        request.wantRouteAllowed = true;
+        return FlashMintLib.doFlashMint(request);
+    }
+
+    function _flashRequest(bool deficit, uint256 amount)
+        internal
+        view
+        returns (FlashMintLib.FlashRequest memory request)
+    {
+        request.deficit = deficit;
+        request.amount = amount;
+        request.token = address(want);
+        request.tokenUnit = wantUnit();
+        request.collatRatioDAI = daiBorrowCollatRatio;
+        request.wantLender = wantFlashLender;
+    }
+
+    function _withdrawExcessCollateral(
+        uint256 collatRatio,
+        SupportStructs.Position memory position
+    ) internal returns (uint256 amount) {
+        uint256 theoDeposits =
+            getDepositFromBorrow(position.borrows, collatRatio);
+        if (position.deposits > theoDeposits) {
+            amount = _withdrawCollateral(position.deposits.sub(theoDeposits));
+            position.deposits = position.deposits.sub(amount);
         }
     }
 
@@ -738,17 +1177,71 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
         return amount;
     }
 
+    function aToken() public view returns (IAToken) {
+        if (address(this) == self) {
+            return originalAToken;
+        }
+        return IAToken(_getArgAddress(20));
+    }
+
+    function debtToken() public view returns (IVariableDebtToken) {
+        if (address(this) == self) {
+            return originalDebtToken;
+        }
+        return IVariableDebtToken(_getArgAddress(40));
+    }
+
     // INTERNAL VIEWS
+    function wantUnit() internal view returns (uint256) {
+        if (address(this) == self) {
+            return originalDecimals;
+        }
+        return _getArgUint256(60);
+    }
+
+    // Immutable args are appended to the calldata by the clone proxy,
+    // followed by their length in 2 bytes
+    function _getArgOffset() internal pure returns (uint256 offset) {
+        assembly {
+            offset := sub(
+                calldatasize(),
+                add(shr(240, calldataload(sub(calldatasize(), 2))), 2)
+            )
+        }
+    }
+
+    function _getArgAddress(uint256 argOffset)
+        internal
+        pure
+        returns (address arg)
+    {
+        uint256 offset = _getArgOffset();
+        assembly {
+            arg := shr(96, calldataload(add(offset, argOffset)))
+        }
+    }
+
+    function _getArgUint256(uint256 argOffset)
+        internal
+        pure
+        returns (uint256 arg)
+    {
+        uint256 offset = _getArgOffset();
+        assembly {
+            arg := calldataload(add(offset, argOffset))
+        }
+    }
+
     function balanceOfWant() internal view returns (uint256) {
         return want.balanceOf(address(this));
     }
 
     function balanceOfAToken() internal view returns (uint256) {
-        return aToken.balanceOf(address(this));
+        return aToken().balanceOf(address(this));
     }
 
     function balanceOfDebtToken() internal view returns (uint256) {
-        return debtToken.balanceOf(address(this));
+        return debtToken().balanceOf(address(this));
     }
 
     function balanceOfAave() internal view returns (uint256) {
@@ -766,12 +1259,125 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
         uint256 fee,
         bytes calldata data
     ) external override returns (bytes32) {
-        require(msg.sender == FlashMintLib.LENDER);
         require(initiator == address(this));
-        (bool deficit, uint256 amountWant) = abi.decode(data, (bool, uint256));
+        if (
+            abi.decode(data, (FlashMintLib.Operation)) ==
+            FlashMintLib.Operation.Migration
+        ) {
+            require(msg.sender == FlashMintLib.LENDER);
+            (, address newStrategy, uint256 borrows) =
+                abi.decode(data, (FlashMintLib.Operation, address, uint256));
+            _handOverPosition(newStrategy, borrows, amount);
+            return FlashMintLib.CALLBACK_SUCCESS;
+        }
+        (
+            ,
+            bool deficit,
+            uint256 amountWant,
+            uint256 amountToFree,
+            uint256 toDeposit
+        ) =
+            abi.decode(
+                data,
+                (FlashMintLib.Operation, bool, uint256, uint256, uint256)
+            );
 
-        return
-            FlashMintLib.loanLogic(deficit, amountWant, amount, address(want));
+        if (msg.sender == FlashMintLib.LENDER) {
+            return
+                FlashMintLib.loanLogic(
+                    deficit,
+                    amountWant,
+                    amountToFree,
+                    toDeposit,
+                    amount,
+                    address(want)
+                );
+        }
+
+        require(msg.sender == wantFlashLender);
+        FlashMintLib.wantLoanLogic(
+            deficit,
+            amountWant,
+            amountToFree,
+            toDeposit,
+            fee,
+            false,
+            address(want)
+        );
+        return FlashMintLib.CALLBACK_SUCCESS;
+    }
+
+    // Moves our position to newStrategy, lending it amountDAI as extra
+    // collateral while it takes over our debt. Every migration of a levered
+    // position goes through here and ends the migration on newStrategy
+    function _handOverPosition(
+        address newStrategy,
+        uint256 borrows,
+        uint256 amountDAI
+    ) internal {
+        if (amountDAI > 0) {
+            IERC20(dai).safeApprove(newStrategy, amountDAI);
+        }
+        Strategy(newStrategy).acceptMigration(borrows, amountDAI);
+        FlashMintLib.migrationFlashLoan(newStrategy, borrows, address(want));
+        Strategy(newStrategy).completeMigration();
+    }
+
+    // Aave V2 flash loan callback
+    function executeOperation(
+        address[] calldata,
+        uint256[] calldata,
+        uint256[] calldata premiums,
+        address initiator,
+        bytes calldata params
+    ) external returns (bool) {
+        require(msg.sender == address(lendingPool));
+        require(initiator == address(this));
+        if (
+            abi.decode(params, (FlashMintLib.Operation)) ==
+            FlashMintLib.Operation.Migration
+        ) {
+            (, address newStrategy, uint256 borrows) =
+                abi.decode(params, (FlashMintLib.Operation, address, uint256));
+            FlashMintLib.migrationFlashLoanLogic(
+                newStrategy,
+                borrows,
+                address(want),
+                address(aToken())
+            );
+            return true;
+        }
+        (
+            ,
+            bool deficit,
+            uint256 amountWant,
+            uint256 amountToFree,
+            uint256 toDeposit
+        ) =
+            abi.decode(
+                params,
+                (FlashMintLib.Operation, bool, uint256, uint256, uint256)
+            );
+
+        // levering up keeps the loan as our variable debt
+        FlashMintLib.wantLoanLogic(
+            deficit,
+            amountWant,
+            amountToFree,
+            toDeposit,
+            premiums[0],
+            !deficit,
+            address(want)
+        );
+        return true;
+    }
+
+    function getPosition()
+        internal
+        view
+        returns (SupportStructs.Position memory position)
+    {
+        (position.deposits, position.borrows) = getCurrentPosition();
     }
 
     function getCurrentPosition()
@@ -789,12 +1395,7 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
         returns (uint256 currentCollatRatio)
     {
         (uint256 deposits, uint256 borrows) = getCurrentPosition();
-
-        if (deposits > 0) {
-            currentCollatRatio = borrows.mul(COLLATERAL_RATIO_PRECISION).div(
-                deposits
-            );
-        }
+        return getCollatRatio(deposits, borrows);
     }
 
     function getCurrentSupply() public view returns (uint256) {
@@ -812,6 +1413,13 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
             return amount;
         }
 
+        if (valuationMode == ValuationMode.Oracle) {
+            uint256 quote = _oracleTokenToWant(token, amount);
+            if (quote > 0) {
+                return quote;
+            }
+        }
+
         // KISS: just use a v2 router for quotes which aren't used in critical logic
         IUni router =
             swapRouter == SwapRouter.SushiV2 ? SUSHI_V2_ROUTER : UNI_V2_ROUTER;
@@ -824,6 +1432,24 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
         return amounts[amounts.length - 1];
     }
 
+    // NOTE: only used for aave and weth, which both have 18 decimals
+    function _oracleTokenToWant(address token, uint256 amount)
+        internal
+        view
+        returns (uint256)
+    {
+        address[] memory tokens = new address[](2);
+        tokens[0] = token;
+        tokens[1] = address(want);
+        uint256[] memory prices = priceOracle.getAssetsPrices(tokens);
+
+        // an asset without oracle source falls back to the router quote
+        if (prices[0] == 0 || prices[1] == 0) {
+            return 0;
+        }
+        return amount.mul(prices[0]).mul(wantUnit()).div(prices[1]).div(1e18);
+    }
+
     function ethToWant(uint256 _amtInWei)
         public
         view
@@ -895,32 +1521,153 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
         }
     }
 
-    function _sellAAVEForWant(uint256 amountIn, uint256 minOut) internal {
-        if (amountIn == 0) {
-            return;
-        }
-        if (swapRouter == SwapRouter.UniV3) {
-            UNI_V3_ROUTER.exactInput(
-                ISwapRouter.ExactInputParams(
-                    getTokenOutPathV3(address(aave), address(want)),
-                    address(this),
-                    now,
-                    amountIn,
-                    minOut
-                )
+    // stkAave => AAVE => WETH => want, without the hops past want
+    // NOTE: encoded from the reward slot, already warm when selling, which is
+    // cheaper than reading back a path cached in storage
+    function getRewardPathV3() internal view returns (bytes memory _path) {
+        address _want = address(want);
+        if (_want == aave) {
+            _path = abi.encodePacked(
+                address(stkAave),
+                stkAaveToAaveSwapFee,
+                aave
+            );
+        } else if (_want == weth) {
+            _path = abi.encodePacked(
+                address(stkAave),
+                stkAaveToAaveSwapFee,
+                aave,
+                aaveToWethSwapFee,
+                weth
             );
         } else {
-            IUni router =
-                swapRouter == SwapRouter.UniV2
-                    ? UNI_V2_ROUTER
-                    : SUSHI_V2_ROUTER;
+            _path = abi.encodePacked(
+                address(stkAave),
+                stkAaveToAaveSwapFee,
+                aave,
+                aaveToWethSwapFee,
+                weth,
+                wethToWantSwapFee,
+                _want
+            );
+        }
+    }
+
+    // Quotes amountIn AAVE on every router, returns the best and its output
+    function _bestRouterForAAVE(uint256 amountIn)
+        internal
+        returns (SwapRouter _swapRouter, uint256 _amountOut)
+    {
+        address[] memory pathV2 = getTokenOutPathV2(aave, address(want));
+        _swapRouter = SwapRouter.UniV2;
+        _amountOut = _quoteV2(UNI_V2_ROUTER, amountIn, pathV2);
+
+        uint256 quote = _quoteV2(SUSHI_V2_ROUTER, amountIn, pathV2);
+        if (quote > _amountOut) {
+            _swapRouter = SwapRouter.SushiV2;
+            _amountOut = quote;
+        }
+
+        try
+            UNI_V3_QUOTER.quoteExactInput{gas: QUOTE_GAS_BUDGET}(
+                getTokenOutPathV3(aave, address(want)),
+                amountIn
+            )
+        returns (uint256 quoteV3) {
+            if (quoteV3 > _amountOut) {
+                _swapRouter = SwapRouter.UniV3;
+                _amountOut = quoteV3;
+            }
+        } catch {}
+    }
+
+    function _quoteV2(
+        IUni router,
+        uint256 amountIn,
+        address[] memory path
+    ) internal view returns (uint256) {
+        try router.getAmountsOut{gas: QUOTE_GAS_BUDGET}(amountIn, path) returns (
+            uint256[] memory amounts
+        ) {
+            return amounts[amounts.length - 1];
+        } catch {
+            return 0;
+        }
+    }
+
+    // Oracle value in want of aaveAmount AAVE, 0 without a price for AAVE
+    // or want, and the least want a sale of it accepts
+    function _minWantOut(uint256 aaveAmount)
+        internal
+        view
+        returns (uint256 value, uint256 minOut)
+    {
+        value = _oracleTokenToWant(aave, aaveAmount);
+        minOut = value.mul(MAX_BPS.sub(rewardSaleSlippageBps)).div(MAX_BPS);
+    }
+
+    // The sale is skipped without an oracle price to bound it, and a pool
+    // off the oracle price fails the swap: either way the AAVE is kept for
+    // a later harvest instead of reverting it
+    function _sellAAVEForWant(uint256 amountIn) internal {
+        SwapRouter _swapRouter = swapRouter;
+        (uint256 value, uint256 minOut) = _minWantOut(amountIn);
+        bool sold;
+        if (value > 0) {
+            if (_swapRouter == SwapRouter.Best) {
+                uint256 bestOut;
+                (_swapRouter, bestOut) = _bestRouterForAAVE(amountIn);
+                sold =
+                    bestOut >= minOut &&
+                    _swapAAVEForWant(_swapRouter, amountIn, minOut);
+            } else {
+                sold = _swapAAVEForWant(_swapRouter, amountIn, minOut);
+            }
+        }
+        if (!sold) {
+            emit RewardSaleSkipped(aave, _swapRouter, amountIn, minOut);
+        }
+    }
+
+    function _swapAAVEForWant(
+        SwapRouter _swapRouter,
+        uint256 amountIn,
+        uint256 minOut
+    ) internal returns (bool) {
+        if (
+            _swapRouter == SwapRouter.UniV3 ||
+            _swapRouter == SwapRouter.UniV3Route
+        ) {
+            try
+                UNI_V3_ROUTER.exactInput(
+                    ISwapRouter.ExactInputParams(
+                        getTokenOutPathV3(address(aave), address(want)),
+                        address(this),
+                        now,
+                        amountIn,
+                        minOut
+                    )
+                )
+            {
+                return true;
+            } catch {
+                return false;
+            }
+        }
+        IUni router =
+            _swapRouter == SwapRouter.UniV2 ? UNI_V2_ROUTER : SUSHI_V2_ROUTER;
+        try
             router.swapExactTokensForTokens(
                 amountIn,
                 minOut,
                 getTokenOutPathV2(address(aave), address(want)),
                 address(this),
                 now
-            );
+            )
+        {
+            return true;
+        } catch {
+            return false;
         }
     }
 
@@ -941,24 +1688,102 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
         );
     }
 
+    function _sellSTKAAVEForWant(uint256 amountIn) internal {
+        // stkAave is valued as AAVE, bounded and kept as in _sellAAVEForWant
+        (uint256 value, uint256 minOut) = _minWantOut(amountIn);
+        bool sold;
+        if (value > 0) {
+            // Single swap through the stkAave, AAVE and WETH v3 pools
+            try
+                UNI_V3_ROUTER.exactInput(
+                    ISwapRouter.ExactInputParams(
+                        getRewardPathV3(),
+                        address(this),
+                        now,
+                        amountIn,
+                        minOut
+                    )
+                )
+            {
+                sold = true;
+            } catch {}
+        }
+        if (!sold) {
+            emit RewardSaleSkipped(
+                address(stkAave),
+                SwapRouter.UniV3Route,
+                amountIn,
+                minOut
+            );
+        }
+    }
+
     function getAaveAssets() internal view returns (address[] memory assets) {
         assets = new address[](2);
-        assets[0] = address(aToken);
-        assets[1] = address(debtToken);
+        assets[0] = address(aToken());
+        assets[1] = address(debtToken());
     }
 
-    function getProtocolCollatRatios(address token)
+    // permissionless, anyone can refresh the cache after an aave governance change
+    function syncProtocolParams() external {
+        _syncProtocolParams();
+    }
+
+    function _syncProtocolParams() internal {
+        (uint256 ltv, uint256 liquidationThreshold) =
+            _getLiveCollatRatiosBps(address(want));
+        (uint256 daiLtv, uint256 daiLiquidationThreshold) =
+            _getLiveCollatRatiosBps(dai);
+        // NOTE: aave bps values are capped at 1e4, they always fit in 16 bits
+        wantLtvBps = uint16(ltv);
+        wantLiquidationThresholdBps = uint16(liquidationThreshold);
+        daiLtvBps = uint16(daiLtv);
+        daiLiquidationThresholdBps = uint16(daiLiquidationThreshold);
+        protocolParamsSyncedAt = uint32(block.timestamp);
+    }
+
+    function _getLiveCollatRatiosBps(address token)
         internal
         view
         returns (uint256 ltv, uint256 liquidationThreshold)
     {
         (, ltv, liquidationThreshold, , , , , , , ) = protocolDataProvider
             .getReserveConfigurationData(token);
+    }
+
+    // reads the cached params of want or dai, or aave itself if the cache is stale
+    function getProtocolCollatRatios(address token)
+        internal
+        view
+        returns (uint256 ltv, uint256 liquidationThreshold)
+    {
+        if (
+            block.timestamp.sub(protocolParamsSyncedAt) >
+            PROTOCOL_PARAMS_MAX_AGE
+        ) {
+            (ltv, liquidationThreshold) = _getLiveCollatRatiosBps(token);
+        } else if (token == dai) {
+            ltv = daiLtvBps;
+            liquidationThreshold = daiLiquidationThresholdBps;
+        } else {
+            ltv = wantLtvBps;
+            liquidationThreshold = wantLiquidationThresholdBps;
+        }
         // convert bps to wad
         ltv = ltv.mul(BPS_WAD_RATIO);
         liquidationThreshold = liquidationThreshold.mul(BPS_WAD_RATIO);
     }
 
+    function getCollatRatio(uint256 deposits, uint256 borrows)
+        internal
+        pure
+        returns (uint256 collatRatio)
+    {
+        if (deposits > 0) {
+            collatRatio = borrows.mul(COLLATERAL_RATIO_PRECISION).div(deposits);
+        }
+    }
+
     function getBorrowFromDeposit(uint256 deposit, uint256 collatRatio)
         internal
         pure
@@ -0,0 +1,68 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+
+import "@openzeppelin/contracts/math/SafeMath.sol";
+
+import "./MockERC20.sol";
+import "../../interfaces/dai/IERC3156FlashBorrower.sol";
+
+// Maker DssFlash minting DAI up to `max` for a `toll` fee, for tests only.
+// It has no constructor so its code can be placed at the mainnet address
+contract MockDssFlash {
+    using SafeMath for uint256;
+
+    bytes32 private constant CALLBACK_SUCCESS =
+        keccak256("ERC3156FlashBorrower.onFlashLoan");
+
+    MockERC20 public dai;
+    uint256 public max;
+    uint256 public toll;
+
+    function initialize(MockERC20 _dai) external {
+        dai = _dai;
+    }
+
+    // same setters as Maker's, without the auth
+    function file(bytes32 what, uint256 data) external {
+        if (what == "max") {
+            max = data;
+        } else if (what == "toll") {
+            toll = data;
+        } else {
+            revert("DssFlash/file-unrecognized-param");
+        }
+    }
+
+    function maxFlashLoan(address token) external view returns (uint256) {
+        return token == address(dai) ? max : 0;
+    }
+
+    function flashFee(address token, uint256 amount)
+        public
+        view
+        returns (uint256)
+    {
+        require(token == address(dai), "DssFlash/token-unsupported");
+        return amount.mul(toll).div(1e18);
+    }
+
+    function flashLoan(
+        IERC3156FlashBorrower receiver,
+        address token,
+        uint256 amount,
+        bytes calldata data
+    ) external returns (bool) {
+        require(amount <= max, "DssFlash/ceiling-exceeded");
+        uint256 fee = flashFee(token, amount);
+
+        dai.mint(address(receiver), amount);
+        require(
+            receiver.onFlashLoan(msg.sender, token, amount, fee, data) ==
+                CALLBACK_SUCCESS,
+            "DssFlash/callback-failed"
+        );
+        dai.transferFrom(address(receiver), address(this), amount.add(fee));
+        dai.burn(address(this), amount);
+        return true;
+    }
+}
@@ -0,0 +1,72 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+
+import {
+    SafeERC20,
+    SafeMath,
+    IERC20
+} from "@openzeppelin/contracts/token/ERC20/SafeERC20.sol";
+
+import "../../interfaces/dai/IERC3156FlashLender.sol";
+import "../../interfaces/dai/IERC3156FlashBorrower.sol";
+
+// ERC-3156 lender of its own balance with a configurable fee, for tests only
+contract MockFlashLender is IERC3156FlashLender {
+    using SafeERC20 for IERC20;
+    using SafeMath for uint256;
+
+    bytes32 private constant CALLBACK_SUCCESS =
+        keccak256("ERC3156FlashBorrower.onFlashLoan");
+
+    uint256 public feeBps;
+    bool public paused; // every query and loan reverts
+
+    function setFeeBps(uint256 _feeBps) external {
+        feeBps = _feeBps;
+    }
+
+    function setPaused(bool _paused) external {
+        paused = _paused;
+    }
+
+    function maxFlashLoan(address token)
+        public
+        view
+        override
+        returns (uint256)
+    {
+        require(!paused, "paused");
+        return IERC20(token).balanceOf(address(this));
+    }
+
+    function flashFee(address token, uint256 amount)
+        public
+        view
+        override
+        returns (uint256)
+    {
+        require(maxFlashLoan(token) > 0, "unsupported token");
+        return amount.mul(feeBps).div(1e4);
+    }
+
+    function flashLoan(
+        IERC3156FlashBorrower receiver,
+        address token,
+        uint256 amount,
+        bytes calldata data
+    ) external override returns (bool) {
+        uint256 fee = flashFee(token, amount);
+        IERC20(token).safeTransfer(address(receiver), amount);
+        require(
+            receiver.onFlashLoan(msg.sender, token, amount, fee, data) ==
+                CALLBACK_SUCCESS,
+            "callback failed"
+        );
+        IERC20(token).safeTransferFrom(
+            address(receiver),
+            address(this),
+            amount.add(fee)
+        );
+        return true;
+    }
+}
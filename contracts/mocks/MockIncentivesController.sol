@@ -0,0 +1,67 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+
+import "@openzeppelin/contracts/math/SafeMath.sol";
+
+import "./MockERC20.sol";
+
+// Aave incentives controller paying stkAave at a fixed rate per unit of
+// aToken or debt token held, for tests only. Rewards accrue on the current
+// balances since the last claim. It has no constructor so its code can be
+// placed at the mainnet address
+contract MockIncentivesController {
+    using SafeMath for uint256;
+
+    MockERC20 public REWARD_TOKEN;
+    uint256 public distributionStart;
+    // reward wei per second for each whole token held, keyed by aToken/debt token
+    mapping(address => uint256) public emissionPerSecond;
+
+    mapping(address => uint256) public lastClaim;
+    mapping(address => uint256) public unclaimed;
+
+    function initialize(MockERC20 _rewardToken) external {
+        REWARD_TOKEN = _rewardToken;
+        distributionStart = block.timestamp;
+    }
+
+    function setEmissionPerSecond(address asset, uint256 emission) external {
+        emissionPerSecond[asset] = emission;
+    }
+
+    function getRewardsBalance(address[] calldata assets, address user)
+        public
+        view
+        returns (uint256 rewards)
+    {
+        uint256 since = lastClaim[user];
+        if (since < distributionStart) {
+            since = distributionStart;
+        }
+        uint256 elapsed = block.timestamp.sub(since);
+
+        rewards = unclaimed[user];
+        for (uint256 i = 0; i < assets.length; i++) {
+            MockERC20 token = MockERC20(payable(assets[i]));
+            rewards = rewards.add(
+                token
+                    .balanceOf(user)
+                    .mul(emissionPerSecond[assets[i]])
+                    .mul(elapsed)
+                    .div(10**uint256(token.decimals()))
+            );
+        }
+    }
+
+    function claimRewards(
+        address[] calldata assets,
+        uint256 amount,
+        address to
+    ) external returns (uint256 claimed) {
+        uint256 rewards = getRewardsBalance(assets, msg.sender);
+        claimed = amount > rewards ? rewards : amount;
+        unclaimed[msg.sender] = rewards - claimed;
+        lastClaim[msg.sender] = block.timestamp;
+        REWARD_TOKEN.mint(to, claimed);
+    }
+}
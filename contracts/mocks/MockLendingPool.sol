@@ -0,0 +1,542 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+pragma experimental ABIEncoderV2;
+
+import {
+    SafeERC20,
+    SafeMath,
+    IERC20
+} from "@openzeppelin/contracts/token/ERC20/SafeERC20.sol";
+
+import "./MockERC20.sol";
+import "./MockPriceOracle.sol";
+
+interface IMockFlashLoanReceiver {
+    function executeOperation(
+        address[] calldata assets,
+        uint256[] calldata amounts,
+        uint256[] calldata premiums,
+        address initiator,
+        bytes calldata params
+    ) external returns (bool);
+}
+
+// Aave V2 LendingPool with variable rate debt only, for tests only.
+// Indices accrue linearly between updates at the configured rates and
+// health is checked with the prices of `priceOracle`. It has no constructor
+// so its code can be placed at the mainnet address
+contract MockLendingPool {
+    using SafeERC20 for IERC20;
+    using SafeMath for uint256;
+
+    uint256 internal constant RAY = 1e27;
+    uint256 internal constant MAX_BPS = 10_000;
+
+    struct Reserve {
+        MockAToken aToken;
+        MockDebtToken debtToken;
+        uint256 ltv;
+        uint256 liquidationThreshold;
+        // rates are in ray per year
+        uint256 liquidityRate;
+        uint256 variableBorrowRate;
+        uint256 liquidityIndex;
+        uint256 variableBorrowIndex;
+        uint256 lastUpdateTimestamp;
+    }
+
+    mapping(address => Reserve) public reserves;
+    address[] public reservesList;
+    MockPriceOracle public priceOracle;
+    uint256 public FLASHLOAN_PREMIUM_TOTAL;
+
+    function setPriceOracle(MockPriceOracle _priceOracle) external {
+        priceOracle = _priceOracle;
+    }
+
+    function setFlashLoanPremium(uint256 _premiumBps) external {
+        FLASHLOAN_PREMIUM_TOTAL = _premiumBps;
+    }
+
+    function initReserve(
+        address asset,
+        MockAToken aToken,
+        MockDebtToken debtToken,
+        uint256 ltv,
+        uint256 liquidationThreshold
+    ) external {
+        Reserve storage reserve = reserves[asset];
+        if (address(reserve.aToken) == address(0)) {
+            reservesList.push(asset);
+        }
+        reserve.aToken = aToken;
+        reserve.debtToken = debtToken;
+        reserve.ltv = ltv;
+        reserve.liquidationThreshold = liquidationThreshold;
+        reserve.liquidityIndex = RAY;
+        reserve.variableBorrowIndex = RAY;
+        reserve.lastUpdateTimestamp = block.timestamp;
+    }
+
+    function setReserveConfiguration(
+        address asset,
+        uint256 ltv,
+        uint256 liquidationThreshold
+    ) external {
+        Reserve storage reserve = _reserve(asset);
+        reserve.ltv = ltv;
+        reserve.liquidationThreshold = liquidationThreshold;
+    }
+
+    function setReserveRates(
+        address asset,
+        uint256 liquidityRate,
+        uint256 variableBorrowRate
+    ) external {
+        Reserve storage reserve = _updateIndexes(asset);
+        reserve.liquidityRate = liquidityRate;
+        reserve.variableBorrowRate = variableBorrowRate;
+    }
+
+    function getReserveNormalizedIncome(address asset)
+        public
+        view
+        returns (uint256)
+    {
+        Reserve storage reserve = reserves[asset];
+        return
+            _accrue(
+                reserve.liquidityIndex,
+                reserve.liquidityRate,
+                reserve.lastUpdateTimestamp
+            );
+    }
+
+    function getReserveNormalizedVariableDebt(address asset)
+        public
+        view
+        returns (uint256)
+    {
+        Reserve storage reserve = reserves[asset];
+        return
+            _accrue(
+                reserve.variableBorrowIndex,
+                reserve.variableBorrowRate,
+                reserve.lastUpdateTimestamp
+            );
+    }
+
+    function deposit(
+        address asset,
+        uint256 amount,
+        address onBehalfOf,
+        uint16
+    ) external {
+        Reserve storage reserve = _updateIndexes(asset);
+        IERC20(asset).safeTransferFrom(
+            msg.sender,
+            address(reserve.aToken),
+            amount
+        );
+        reserve.aToken.mint(onBehalfOf, amount, reserve.liquidityIndex);
+    }
+
+    function withdraw(
+        address asset,
+        uint256 amount,
+        address to
+    ) external returns (uint256) {
+        Reserve storage reserve = _updateIndexes(asset);
+        uint256 balance = reserve.aToken.balanceOf(msg.sender);
+        if (amount == type(uint256).max) {
+            amount = balance;
+        }
+        require(amount <= balance, "not enough available user balance");
+        reserve.aToken.burn(msg.sender, to, amount, reserve.liquidityIndex);
+        require(_isHealthy(msg.sender), "health factor below 1");
+        return amount;
+    }
+
+    function borrow(
+        address asset,
+        uint256 amount,
+        uint256 interestRateMode,
+        uint16,
+        address onBehalfOf
+    ) external {
+        require(interestRateMode == 2, "only variable rate");
+        _openDebt(asset, amount, onBehalfOf);
+        reserves[asset].aToken.transferUnderlyingTo(msg.sender, amount);
+    }
+
+    function repay(
+        address asset,
+        uint256 amount,
+        uint256 rateMode,
+        address onBehalfOf
+    ) external returns (uint256) {
+        require(rateMode == 2, "only variable rate");
+        Reserve storage reserve = _updateIndexes(asset);
+        uint256 debt = reserve.debtToken.balanceOf(onBehalfOf);
+        uint256 paid = amount < debt ? amount : debt;
+        IERC20(asset).safeTransferFrom(
+            msg.sender,
+            address(reserve.aToken),
+            paid
+        );
+        reserve.debtToken.burn(onBehalfOf, paid, reserve.variableBorrowIndex);
+        return paid;
+    }
+
+    // mode 0 pulls back amount plus premium, any other mode opens variable
+    // debt for onBehalfOf, which needs credit delegation if it isn't the caller
+    function flashLoan(
+        address receiverAddress,
+        address[] memory assets,
+        uint256[] memory amounts,
+        uint256[] memory modes,
+        address onBehalfOf,
+        bytes memory params,
+        uint16
+    ) public {
+        uint256[] memory premiums = new uint256[](assets.length);
+        for (uint256 i = 0; i < assets.length; i++) {
+            premiums[i] = amounts[i].mul(FLASHLOAN_PREMIUM_TOTAL).div(MAX_BPS);
+            _reserve(assets[i]).aToken.transferUnderlyingTo(
+                receiverAddress,
+                amounts[i]
+            );
+        }
+
+        require(
+            IMockFlashLoanReceiver(receiverAddress).executeOperation(
+                assets,
+                amounts,
+                premiums,
+                msg.sender,
+                params
+            ),
+            "invalid flash loan executor return"
+        );
+
+        for (uint256 i = 0; i < assets.length; i++) {
+            if (modes[i] == 0) {
+                IERC20(assets[i]).safeTransferFrom(
+                    receiverAddress,
+                    address(_updateIndexes(assets[i]).aToken),
+                    amounts[i].add(premiums[i])
+                );
+            } else {
+                _openDebt(assets[i], amounts[i], onBehalfOf);
+            }
+        }
+    }
+
+    // like aave's validateTransfer, aTokens backing debt can only move while
+    // the sender stays above a health factor of 1
+    function finalizeTransfer(
+        address asset,
+        address from,
+        address,
+        uint256
+    ) external view {
+        require(msg.sender == address(_reserve(asset).aToken), "!aToken");
+        require(_isHealthy(from), "transfer not allowed");
+    }
+
+    function getUserAccountData(address user)
+        public
+        view
+        returns (
+            uint256 totalCollateralETH,
+            uint256 totalDebtETH,
+            uint256 availableBorrowsETH,
+            uint256 currentLiquidationThreshold,
+            uint256 ltv,
+            uint256 healthFactor
+        )
+    {
+        uint256 borrowableETH;
+        uint256 liquidationETH;
+        for (uint256 i = 0; i < reservesList.length; i++) {
+            address asset = reservesList[i];
+            (uint256 collateral, uint256 debt) = _userReserveETH(asset, user);
+            totalCollateralETH = totalCollateralETH.add(collateral);
+            totalDebtETH = totalDebtETH.add(debt);
+            borrowableETH = borrowableETH.add(
+                collateral.mul(reserves[asset].ltv)
+            );
+            liquidationETH = liquidationETH.add(
+                collateral.mul(reserves[asset].liquidationThreshold)
+            );
+        }
+
+        if (totalCollateralETH > 0) {
+            ltv = borrowableETH.div(totalCollateralETH);
+            currentLiquidationThreshold = liquidationETH.div(
+                totalCollateralETH
+            );
+        }
+        borrowableETH = borrowableETH.div(MAX_BPS);
+        if (borrowableETH > totalDebtETH) {
+            availableBorrowsETH = borrowableETH - totalDebtETH;
+        }
+        healthFactor = totalDebtETH == 0
+            ? type(uint256).max
+            : liquidationETH.mul(1e18).div(MAX_BPS).div(totalDebtETH);
+    }
+
+    function _openDebt(
+        address asset,
+        uint256 amount,
+        address onBehalfOf
+    ) internal {
+        Reserve storage reserve = _updateIndexes(asset);
+        if (onBehalfOf != msg.sender) {
+            reserve.debtToken.decreaseBorrowAllowance(
+                onBehalfOf,
+                msg.sender,
+                amount
+            );
+        }
+        reserve.debtToken.mint(onBehalfOf, amount, reserve.variableBorrowIndex);
+        require(
+            _isBelowLtv(onBehalfOf),
+            "collateral cannot cover new borrow"
+        );
+    }
+
+    function _isHealthy(address user) internal view returns (bool) {
+        (, , , , , uint256 healthFactor) = getUserAccountData(user);
+        return healthFactor >= 1e18;
+    }
+
+    // debt exactly at the ltv is still allowed
+    function _isBelowLtv(address user) internal view returns (bool) {
+        (uint256 collateral, uint256 debt, , , uint256 ltv, ) =
+            getUserAccountData(user);
+        return debt <= collateral.mul(ltv).div(MAX_BPS);
+    }
+
+    function _userReserveETH(address asset, address user)
+        internal
+        view
+        returns (uint256 collateral, uint256 debt)
+    {
+        Reserve storage reserve = reserves[asset];
+        uint256 price = priceOracle.getAssetPrice(asset);
+        uint256 unit = 10**uint256(MockERC20(payable(asset)).decimals());
+        collateral = reserve.aToken.balanceOf(user).mul(price).div(unit);
+        debt = reserve.debtToken.balanceOf(user).mul(price).div(unit);
+    }
+
+    function _reserve(address asset) internal view returns (Reserve storage) {
+        Reserve storage reserve = reserves[asset];
+        require(address(reserve.aToken) != address(0), "unknown reserve");
+        return reserve;
+    }
+
+    function _updateIndexes(address asset) internal returns (Reserve storage) {
+        Reserve storage reserve = _reserve(asset);
+        reserve.liquidityIndex = getReserveNormalizedIncome(asset);
+        reserve.variableBorrowIndex = getReserveNormalizedVariableDebt(asset);
+        reserve.lastUpdateTimestamp = block.timestamp;
+        return reserve;
+    }
+
+    function _accrue(
+        uint256 index,
+        uint256 rate,
+        uint256 lastUpdateTimestamp
+    ) internal view returns (uint256) {
+        uint256 elapsed = block.timestamp.sub(lastUpdateTimestamp);
+        return
+            index.mul(RAY.add(rate.mul(elapsed).div(365 days))).div(RAY);
+    }
+}
+
+// Balances scale with the reserve's liquidity index. The pool holds no
+// funds, the underlying sits in the aToken like on Aave
+contract MockAToken {
+    using SafeERC20 for IERC20;
+    using SafeMath for uint256;
+
+    uint256 internal constant RAY = 1e27;
+
+    MockLendingPool public immutable pool;
+    address public immutable UNDERLYING_ASSET_ADDRESS;
+
+    mapping(address => uint256) public scaledBalanceOf;
+    uint256 public scaledTotalSupply;
+
+    event Transfer(address indexed from, address indexed to, uint256 value);
+
+    modifier onlyPool() {
+        require(msg.sender == address(pool), "!pool");
+        _;
+    }
+
+    constructor(MockLendingPool _pool, address _underlying) public {
+        pool = _pool;
+        UNDERLYING_ASSET_ADDRESS = _underlying;
+    }
+
+    function decimals() external view returns (uint8) {
+        return MockERC20(payable(UNDERLYING_ASSET_ADDRESS)).decimals();
+    }
+
+    function balanceOf(address user) public view returns (uint256) {
+        return scaledBalanceOf[user].mul(_index()).div(RAY);
+    }
+
+    function totalSupply() external view returns (uint256) {
+        return scaledTotalSupply.mul(_index()).div(RAY);
+    }
+
+    function transfer(address to, uint256 amount) external returns (bool) {
+        uint256 scaled = _scaled(msg.sender, amount);
+        scaledBalanceOf[msg.sender] = scaledBalanceOf[msg.sender].sub(scaled);
+        scaledBalanceOf[to] = scaledBalanceOf[to].add(scaled);
+        pool.finalizeTransfer(UNDERLYING_ASSET_ADDRESS, msg.sender, to, amount);
+        emit Transfer(msg.sender, to, amount);
+        return true;
+    }
+
+    function mint(
+        address user,
+        uint256 amount,
+        uint256 index
+    ) external onlyPool {
+        uint256 scaled = amount.mul(RAY).div(index);
+        scaledBalanceOf[user] = scaledBalanceOf[user].add(scaled);
+        scaledTotalSupply = scaledTotalSupply.add(scaled);
+        emit Transfer(address(0), user, amount);
+    }
+
+    function burn(
+        address user,
+        address receiverOfUnderlying,
+        uint256 amount,
+        uint256
+    ) external onlyPool {
+        uint256 scaled = _scaled(user, amount);
+        scaledBalanceOf[user] = scaledBalanceOf[user].sub(scaled);
+        scaledTotalSupply = scaledTotalSupply.sub(scaled);
+        transferUnderlyingTo(receiverOfUnderlying, amount);
+        emit Transfer(user, address(0), amount);
+    }
+
+    // interest isn't backed by actual borrowers, shortfalls are minted
+    function transferUnderlyingTo(address target, uint256 amount)
+        public
+        onlyPool
+    {
+        MockERC20 underlying = MockERC20(payable(UNDERLYING_ASSET_ADDRESS));
+        uint256 available = underlying.balanceOf(address(this));
+        if (available < amount) {
+            underlying.mint(address(this), amount - available);
+        }
+        IERC20(address(underlying)).safeTransfer(target, amount);
+    }
+
+    function _index() internal view returns (uint256) {
+        return pool.getReserveNormalizedIncome(UNDERLYING_ASSET_ADDRESS);
+    }
+
+    // moving the whole balance never leaves rounding dust behind
+    function _scaled(address user, uint256 amount)
+        internal
+        view
+        returns (uint256)
+    {
+        uint256 balance = balanceOf(user);
+        require(amount <= balance, "amount exceeds balance");
+        if (amount == balance) {
+            return scaledBalanceOf[user];
+        }
+        return amount.mul(RAY).div(_index());
+    }
+}
+
+// Non transferable variable debt scaling with the reserve's borrow index
+contract MockDebtToken {
+    using SafeMath for uint256;
+
+    uint256 internal constant RAY = 1e27;
+
+    MockLendingPool public immutable pool;
+    address public immutable UNDERLYING_ASSET_ADDRESS;
+
+    mapping(address => uint256) public scaledBalanceOf;
+    uint256 public scaledTotalSupply;
+    mapping(address => mapping(address => uint256)) public borrowAllowance;
+
+    event Transfer(address indexed from, address indexed to, uint256 value);
+
+    modifier onlyPool() {
+        require(msg.sender == address(pool), "!pool");
+        _;
+    }
+
+    constructor(MockLendingPool _pool, address _underlying) public {
+        pool = _pool;
+        UNDERLYING_ASSET_ADDRESS = _underlying;
+    }
+
+    function decimals() external view returns (uint8) {
+        return MockERC20(payable(UNDERLYING_ASSET_ADDRESS)).decimals();
+    }
+
+    function balanceOf(address user) public view returns (uint256) {
+        return scaledBalanceOf[user].mul(_index()).div(RAY);
+    }
+
+    function totalSupply() external view returns (uint256) {
+        return scaledTotalSupply.mul(_index()).div(RAY);
+    }
+
+    function approveDelegation(address delegatee, uint256 amount) external {
+        borrowAllowance[msg.sender][delegatee] = amount;
+    }
+
+    function decreaseBorrowAllowance(
+        address delegator,
+        address delegatee,
+        uint256 amount
+    ) external onlyPool {
+        borrowAllowance[delegator][delegatee] = borrowAllowance[delegator][
+            delegatee
+        ]
+            .sub(amount, "borrow allowance not enough");
+    }
+
+    function mint(
+        address user,
+        uint256 amount,
+        uint256 index
+    ) external onlyPool {
+        // round up so the debt is never less than borrowed
+        uint256 scaled = amount.mul(RAY).add(index - 1).div(index);
+        scaledBalanceOf[user] = scaledBalanceOf[user].add(scaled);
+        scaledTotalSupply = scaledTotalSupply.add(scaled);
+        emit Transfer(address(0), user, amount);
+    }
+
+    function burn(
+        address user,
+        uint256 amount,
+        uint256 index
+    ) external onlyPool {
+        uint256 scaled =
+            amount >= balanceOf(user)
+                ? scaledBalanceOf[user]
+                : amount.mul(RAY).div(index);
+        scaledBalanceOf[user] = scaledBalanceOf[user].sub(scaled);
+        scaledTotalSupply = scaledTotalSupply.sub(scaled);
+        emit Transfer(user, address(0), amount);
+    }
+
+    function _index() internal view returns (uint256) {
+        return pool.getReserveNormalizedVariableDebt(UNDERLYING_ASSET_ADDRESS);
+    }
+}
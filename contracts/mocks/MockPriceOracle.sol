@@ -0,0 +1,39 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+
+// Aave price oracle with prices in ETH wei per whole token, for tests only
+contract MockPriceOracle {
+    mapping(address => uint256) public prices;
+
+    function setAssetPrice(address asset, uint256 price) external {
+        prices[asset] = price;
+    }
+
+    function getAssetPrice(address asset) public view returns (uint256) {
+        return prices[asset];
+    }
+
+    function getAssetsPrices(address[] calldata assets)
+        external
+        view
+        returns (uint256[] memory result)
+    {
+        result = new uint256[](assets.length);
+        for (uint256 i = 0; i < assets.length; i++) {
+            result[i] = prices[assets[i]];
+        }
+    }
+}
+
+// Aave LendingPoolAddressesProvider, for tests only
+contract MockAddressesProvider {
+    address public getLendingPool;
+    address public getPriceOracle;
+
+    function setAddresses(address _lendingPool, address _priceOracle)
+        external
+    {
+        getLendingPool = _lendingPool;
+        getPriceOracle = _priceOracle;
+    }
+}
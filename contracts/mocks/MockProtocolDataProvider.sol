@@ -0,0 +1,113 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+
+import "./MockLendingPool.sol";
+
+// Aave ProtocolDataProvider reading the reserves of the mock pool, for tests
+// only. It has no constructor so its code can be placed at the mainnet address
+contract MockProtocolDataProvider {
+    MockAddressesProvider public ADDRESSES_PROVIDER;
+
+    function setAddressesProvider(MockAddressesProvider _addressesProvider)
+        external
+    {
+        ADDRESSES_PROVIDER = _addressesProvider;
+    }
+
+    function getReserveTokensAddresses(address asset)
+        external
+        view
+        returns (
+            address aTokenAddress,
+            address stableDebtTokenAddress,
+            address variableDebtTokenAddress
+        )
+    {
+        (MockAToken aToken, MockDebtToken debtToken, , , , , , , ) =
+            _pool().reserves(asset);
+        return (address(aToken), address(0), address(debtToken));
+    }
+
+    function getReserveConfigurationData(address asset)
+        external
+        view
+        returns (
+            uint256 decimals,
+            uint256 ltv,
+            uint256 liquidationThreshold,
+            uint256 liquidationBonus,
+            uint256 reserveFactor,
+            bool usageAsCollateralEnabled,
+            bool borrowingEnabled,
+            bool stableBorrowRateEnabled,
+            bool isActive,
+            bool isFrozen
+        )
+    {
+        (, , ltv, liquidationThreshold, , , , , ) = _pool().reserves(asset);
+        decimals = MockERC20(payable(asset)).decimals();
+        liquidationBonus = 10_500;
+        reserveFactor = 1_000;
+        usageAsCollateralEnabled = true;
+        borrowingEnabled = true;
+        isActive = true;
+    }
+
+    function getReserveData(address asset)
+        external
+        view
+        returns (
+            uint256 availableLiquidity,
+            uint256 totalStableDebt,
+            uint256 totalVariableDebt,
+            uint256 liquidityRate,
+            uint256 variableBorrowRate,
+            uint256 stableBorrowRate,
+            uint256 averageStableBorrowRate,
+            uint256 liquidityIndex,
+            uint256 variableBorrowIndex,
+            uint40 lastUpdateTimestamp
+        )
+    {
+        MockLendingPool pool = _pool();
+        MockAToken aToken;
+        MockDebtToken debtToken;
+        (aToken, debtToken, , , liquidityRate, variableBorrowRate, , , ) = pool
+            .reserves(asset);
+        availableLiquidity = IERC20(asset).balanceOf(address(aToken));
+        totalVariableDebt = debtToken.totalSupply();
+        liquidityIndex = pool.getReserveNormalizedIncome(asset);
+        variableBorrowIndex = pool.getReserveNormalizedVariableDebt(asset);
+        lastUpdateTimestamp = uint40(block.timestamp);
+    }
+
+    function getUserReserveData(address asset, address user)
+        external
+        view
+        returns (
+            uint256 currentATokenBalance,
+            uint256 currentStableDebt,
+            uint256 currentVariableDebt,
+            uint256 principalStableDebt,
+            uint256 scaledVariableDebt,
+            uint256 stableBorrowRate,
+            uint256 liquidityRate,
+            uint40 stableRateLastUpdated,
+            bool usageAsCollateralEnabled
+        )
+    {
+        MockAToken aToken;
+        MockDebtToken debtToken;
+        (aToken, debtToken, , , liquidityRate, , , , ) = _pool().reserves(
+            asset
+        );
+        currentATokenBalance = aToken.balanceOf(user);
+        currentVariableDebt = debtToken.balanceOf(user);
+        scaledVariableDebt = debtToken.scaledBalanceOf(user);
+        usageAsCollateralEnabled = true;
+    }
+
+    function _pool() internal view returns (MockLendingPool) {
+        return MockLendingPool(ADDRESSES_PROVIDER.getLendingPool());
+    }
+}
@@ -0,0 +1,207 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+pragma experimental ABIEncoderV2;
+
+import "@openzeppelin/contracts/math/SafeMath.sol";
+
+import "./MockERC20.sol";
+import "./MockPriceOracle.sol";
+import "../../interfaces/uniswap/ISwapRouter.sol";
+
+// Swaps mock tokens at the oracle prices minus a pool fee, burning the input
+// and minting the output. It has no constructor so its code can be placed
+// at the mainnet routers, set the oracle with initialize
+abstract contract MockRouterBase {
+    using SafeMath for uint256;
+
+    MockPriceOracle public priceOracle;
+    // value (in oracle units) of the pools' reserves, 0 for infinite depth
+    uint256 public depth;
+
+    function initialize(MockPriceOracle _priceOracle) external {
+        priceOracle = _priceOracle;
+    }
+
+    function setDepth(uint256 _depth) external {
+        depth = _depth;
+    }
+
+    // feePpm is in millionths, as in uniswap v3 pool fees
+    function _quote(
+        address tokenIn,
+        address tokenOut,
+        uint256 amountIn,
+        uint256 feePpm
+    ) internal view returns (uint256) {
+        uint256 valueIn =
+            amountIn.mul(priceOracle.getAssetPrice(tokenIn)).div(_unit(tokenIn));
+        // constant product price impact
+        if (depth > 0) {
+            valueIn = valueIn.mul(depth).div(depth.add(valueIn));
+        }
+        return
+            valueIn
+                .mul(_unit(tokenOut))
+                .div(priceOracle.getAssetPrice(tokenOut))
+                .mul(uint256(1e6).sub(feePpm))
+                .div(1e6);
+    }
+
+    function _swap(
+        address tokenIn,
+        address tokenOut,
+        uint256 amountIn,
+        uint256 amountOut,
+        address to
+    ) internal {
+        MockERC20(payable(tokenIn)).transferFrom(
+            msg.sender,
+            address(this),
+            amountIn
+        );
+        MockERC20(payable(tokenIn)).burn(address(this), amountIn);
+        MockERC20(payable(tokenOut)).mint(to, amountOut);
+    }
+
+    function _unit(address token) internal view returns (uint256) {
+        return 10**uint256(MockERC20(payable(token)).decimals());
+    }
+}
+
+// UniswapV2Router02 (also used for sushiswap) with 0.3% pools
+contract MockUniswapV2Router is MockRouterBase {
+    uint256 private constant FEE_PPM = 3_000;
+
+    function getAmountsOut(uint256 amountIn, address[] memory path)
+        public
+        view
+        returns (uint256[] memory amounts)
+    {
+        require(path.length >= 2, "UniswapV2Library: INVALID_PATH");
+        amounts = new uint256[](path.length);
+        amounts[0] = amountIn;
+        for (uint256 i = 1; i < path.length; i++) {
+            amounts[i] = _quote(path[i - 1], path[i], amounts[i - 1], FEE_PPM);
+        }
+    }
+
+    function swapExactTokensForTokens(
+        uint256 amountIn,
+        uint256 amountOutMin,
+        address[] calldata path,
+        address to,
+        uint256 deadline
+    ) external returns (uint256[] memory amounts) {
+        require(deadline >= block.timestamp, "UniswapV2Router: EXPIRED");
+        amounts = getAmountsOut(amountIn, path);
+        uint256 amountOut = amounts[amounts.length - 1];
+        require(
+            amountOut >= amountOutMin,
+            "UniswapV2Router: INSUFFICIENT_OUTPUT_AMOUNT"
+        );
+        _swap(path[0], path[path.length - 1], amountIn, amountOut, to);
+    }
+}
+
+// Uniswap V3 SwapRouter, pools charge the fee tier of the path
+contract MockUniswapV3Router is MockRouterBase {
+    uint256 private constant ADDR_SIZE = 20;
+    uint256 private constant HOP_SIZE = 23;
+
+    function exactInputSingle(ISwapRouter.ExactInputSingleParams calldata params)
+        external
+        payable
+        returns (uint256 amountOut)
+    {
+        require(params.deadline >= block.timestamp, "Transaction too old");
+        amountOut = _quote(
+            params.tokenIn,
+            params.tokenOut,
+            params.amountIn,
+            params.fee
+        );
+        require(amountOut >= params.amountOutMinimum, "Too little received");
+        _swap(
+            params.tokenIn,
+            params.tokenOut,
+            params.amountIn,
+            amountOut,
+            params.recipient
+        );
+    }
+
+    function exactInput(ISwapRouter.ExactInputParams memory params)
+        external
+        payable
+        returns (uint256 amountOut)
+    {
+        require(params.deadline >= block.timestamp, "Transaction too old");
+        bytes memory path = params.path;
+        amountOut = quoteExactInput(path, params.amountIn);
+        require(amountOut >= params.amountOutMinimum, "Too little received");
+
+        uint256 hops = (path.length - ADDR_SIZE) / HOP_SIZE;
+        (address firstToken, , ) = _decodeHop(path, 0);
+        (, , address lastToken) = _decodeHop(path, (hops - 1) * HOP_SIZE);
+        _swap(
+            firstToken,
+            lastToken,
+            params.amountIn,
+            amountOut,
+            params.recipient
+        );
+    }
+
+    function quoteExactInput(bytes memory path, uint256 amountIn)
+        public
+        view
+        returns (uint256 amountOut)
+    {
+        require(
+            path.length >= ADDR_SIZE + HOP_SIZE &&
+                (path.length - ADDR_SIZE) % HOP_SIZE == 0,
+            "invalid path"
+        );
+
+        amountOut = amountIn;
+        uint256 hops = (path.length - ADDR_SIZE) / HOP_SIZE;
+        for (uint256 i = 0; i < hops; i++) {
+            (address tokenIn, uint24 fee, address tokenOut) =
+                _decodeHop(path, i * HOP_SIZE);
+            amountOut = _quote(tokenIn, tokenOut, amountOut, fee);
+        }
+    }
+
+    function _decodeHop(bytes memory path, uint256 offset)
+        internal
+        pure
+        returns (
+            address tokenIn,
+            uint24 fee,
+            address tokenOut
+        )
+    {
+        assembly {
+            let start := add(add(path, 0x20), offset)
+            tokenIn := shr(96, mload(start))
+            fee := shr(232, mload(add(start, 20)))
+            tokenOut := shr(96, mload(add(start, 23)))
+        }
+    }
+}
+
+// Uniswap V3 Quoter, quotes the placed router and its depth
+contract MockUniswapV3Quoter {
+    MockUniswapV3Router public router;
+
+    function initialize(MockUniswapV3Router _router) external {
+        router = _router;
+    }
+
+    function quoteExactInput(bytes memory path, uint256 amountIn)
+        external
+        returns (uint256 amountOut)
+    {
+        return router.quoteExactInput(path, amountIn);
+    }
+}
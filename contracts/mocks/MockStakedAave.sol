@@ -0,0 +1,59 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+
+import "./MockERC20.sol";
+
+// stkAave redeemable for AAVE during the unstake window that follows the
+// cooldown, for tests only. Set `aave` and the windows with initializeStaking
+contract MockStakedAave is MockERC20 {
+    MockERC20 public aave;
+    uint256 public COOLDOWN_SECONDS;
+    uint256 public UNSTAKE_WINDOW;
+
+    mapping(address => uint256) public stakersCooldowns;
+
+    function initializeStaking(
+        MockERC20 _aave,
+        uint256 _cooldownSeconds,
+        uint256 _unstakeWindow
+    ) external {
+        aave = _aave;
+        COOLDOWN_SECONDS = _cooldownSeconds;
+        UNSTAKE_WINDOW = _unstakeWindow;
+    }
+
+    function stake(address to, uint256 amount) external {
+        aave.transferFrom(msg.sender, address(this), amount);
+        mint(to, amount);
+    }
+
+    function cooldown() external {
+        require(balanceOf[msg.sender] != 0, "INVALID_BALANCE_ON_COOLDOWN");
+        stakersCooldowns[msg.sender] = block.timestamp;
+    }
+
+    function redeem(address to, uint256 amount) external {
+        uint256 cooldownEnd =
+            stakersCooldowns[msg.sender].add(COOLDOWN_SECONDS);
+        require(block.timestamp > cooldownEnd, "INSUFFICIENT_COOLDOWN");
+        require(
+            block.timestamp.sub(cooldownEnd) <= UNSTAKE_WINDOW,
+            "UNSTAKE_WINDOW_FINISHED"
+        );
+
+        uint256 balance = balanceOf[msg.sender];
+        uint256 amountToRedeem = amount > balance ? balance : amount;
+        burn(msg.sender, amountToRedeem);
+        if (balance == amountToRedeem) {
+            stakersCooldowns[msg.sender] = 0;
+        }
+        aave.mint(to, amountToRedeem);
+    }
+
+    // staking rewards aren't simulated
+    function claimRewards(address, uint256) external {}
+
+    function getTotalRewardsBalance(address) external pure returns (uint256) {
+        return 0;
+    }
+}
@@ -438,4 +438,6 @@ interface ILendingPool {
     function setPause(bool val) external;
 
     function paused() external view returns (bool);
+
+    function FLASHLOAN_PREMIUM_TOTAL() external view returns (uint256);
 }
@@ -0,0 +1,17 @@
+"""
+Off-chain tooling of the LevAave strategy: models to evaluate configurations
+before they are set on chain (`simulator`, `risk`) and the `keeper` daemon.
+"""
+
+from levaave.ratios import uint
+from levaave.simulator import (
+    Batch,
+    Params,
+    adjust_position,
+    flash_mint_size,
+    free_funds,
+    idle_want_buffer,
+    lever_down_to,
+    lever_max,
+    liquidate_position,
+)
@@ -0,0 +1,253 @@
+"""
+Local SQLite index of the strategies' `Leverage` (FlashMintLib) and
+`Harvested` (BaseStrategy) events.
+
+Logs are fetched in block ranges and written one range per transaction along
+with the checkpoint, so an interrupted sync resumes where it stopped and never
+holds more than a range in memory. Amounts are stored as exact decimal
+strings, queries cast them to floats.
+
+    index = EventIndex("reports/events.db")
+    Indexer(web3, index, strategies).sync(from_block=13_000_000)
+    for row in index.flash_utilization(cap=500_000_000 * 10**18):
+        ...
+"""
+
+import logging
+import sqlite3
+
+log = logging.getLogger(__name__)
+
+LEVERAGE = "Leverage(uint256,uint256,uint256,uint256,bool,address)"
+HARVESTED = "Harvested(uint256,uint256,uint256,uint256)"
+DAY = 24 * 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    name TEXT PRIMARY KEY,
+    block INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leverage (
+    block INTEGER NOT NULL,
+    timestamp INTEGER NOT NULL,
+    tx_hash TEXT NOT NULL,
+    log_index INTEGER NOT NULL,
+    strategy TEXT NOT NULL,
+    amount_requested TEXT NOT NULL,
+    amount_used TEXT NOT NULL,
+    required_dai TEXT NOT NULL,
+    amount_to_close_ltv_gap TEXT NOT NULL,
+    deficit INTEGER NOT NULL,
+    lender TEXT NOT NULL,
+    PRIMARY KEY (tx_hash, log_index)
+);
+CREATE INDEX IF NOT EXISTS leverage_strategy ON leverage (strategy, block);
+CREATE TABLE IF NOT EXISTS harvests (
+    block INTEGER NOT NULL,
+    timestamp INTEGER NOT NULL,
+    tx_hash TEXT NOT NULL,
+    log_index INTEGER NOT NULL,
+    strategy TEXT NOT NULL,
+    profit TEXT NOT NULL,
+    loss TEXT NOT NULL,
+    debt_payment TEXT NOT NULL,
+    debt_outstanding TEXT NOT NULL,
+    gas_used INTEGER,
+    gas_price INTEGER,
+    PRIMARY KEY (tx_hash, log_index)
+);
+CREATE INDEX IF NOT EXISTS harvests_strategy ON harvests (strategy, block);
+"""
+
+
+class EventIndex:
+    """The SQLite store and its queries, every query streams its rows"""
+
+    def __init__(self, path):
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(SCHEMA)
+
+    def checkpoint(self, name):
+        """Last block indexed by `name`, None if it never ran"""
+        row = self.db.execute(
+            "SELECT block FROM checkpoints WHERE name = ?", (name,)
+        ).fetchone()
+        return row and row["block"]
+
+    def write(self, name, to_block, leverage, harvests):
+        """Appends the events of a range and moves the checkpoint, atomically"""
+        with self.db:
+            self.db.executemany(
+                "INSERT OR IGNORE INTO leverage VALUES (?,?,?,?,?,?,?,?,?,?,?)",
+                leverage,
+            )
+            self.db.executemany(
+                "INSERT OR IGNORE INTO harvests VALUES (?,?,?,?,?,?,?,?,?,?,?)",
+                harvests,
+            )
+            self.db.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?)", (name, to_block)
+            )
+
+    def flash_utilization(self, cap, strategy=None, period=DAY):
+        """
+        Flash mints per period: how many were capped by the lender's liquidity
+        and the largest share of `cap` (DssFlash's max, in DAI) they used
+        """
+        return self._query(
+            f"""
+            SELECT timestamp / {int(period)} * {int(period)} AS period,
+                COUNT(*) AS flash_loans,
+                SUM(CAST(amount_used AS REAL) < CAST(amount_requested AS REAL))
+                    AS capped,
+                SUM(CAST(required_dai AS REAL)) AS required_dai,
+                MAX(CAST(required_dai AS REAL)) / ? AS max_utilization
+            FROM leverage {self._where(strategy)}
+            GROUP BY period ORDER BY period
+            """,
+            (float(cap),),
+            strategy,
+        )
+
+    def profit_per_harvest(self, strategy=None):
+        return self._query(
+            f"""
+            SELECT block, timestamp, strategy,
+                CAST(profit AS REAL) AS profit, CAST(loss AS REAL) AS loss
+            FROM harvests {self._where(strategy)}
+            ORDER BY block, log_index
+            """,
+            (),
+            strategy,
+        )
+
+    def gas_per_harvest(self, strategy=None, period=DAY):
+        """Average gas and cost in wei of the harvests of each period"""
+        return self._query(
+            f"""
+            SELECT timestamp / {int(period)} * {int(period)} AS period,
+                COUNT(*) AS harvests,
+                AVG(gas_used) AS gas_used,
+                AVG(CAST(gas_used AS REAL) * gas_price) AS cost
+            FROM harvests {self._where(strategy)}
+            GROUP BY period ORDER BY period
+            """,
+            (),
+            strategy,
+        )
+
+    def _where(self, strategy):
+        return "WHERE strategy = ?" if strategy else ""
+
+    def _query(self, sql, params, strategy):
+        if strategy:
+            params = params + (str(strategy),)
+        return self.db.execute(sql, params)
+
+
+class Indexer:
+    def __init__(
+        self,
+        web3,
+        index,
+        addresses=None,
+        name="levaave",
+        chunk_size=2_000,
+        confirmations=0,
+        with_gas=True,
+    ):
+        """
+        Indexes the events of `addresses`, or of any contract when None.
+        `with_gas` fetches the receipt of every harvest for its gas.
+        """
+        self.web3 = web3
+        self.index = index
+        self.addresses = addresses and [str(a) for a in addresses]
+        self.name = name
+        self.chunk_size = chunk_size
+        self.confirmations = confirmations
+        self.with_gas = with_gas
+        self.topics = {
+            _hex(web3.keccak(text=LEVERAGE)): "leverage",
+            _hex(web3.keccak(text=HARVESTED)): "harvests",
+        }
+
+    def sync(self, from_block=0, to_block=None):
+        """Indexes up to `to_block` (latest confirmed by default), returns it"""
+        checkpoint = self.index.checkpoint(self.name)
+        start = from_block if checkpoint is None else max(checkpoint + 1, from_block)
+        if to_block is None:
+            to_block = self.web3.eth.block_number - self.confirmations
+
+        size = self.chunk_size
+        while start <= to_block:
+            end = min(start + size - 1, to_block)
+            try:
+                logs = self._get_logs(start, end)
+            except ValueError as e:
+                # nodes cap the logs of a single query, retry on a smaller range
+                if size == 1:
+                    raise
+                size = max(1, size // 2)
+                log.info("%s, retrying with %d blocks", e, size)
+                continue
+
+            self.index.write(self.name, end, *self._decode(logs))
+            log.info("indexed blocks %d-%d: %d events", start, end, len(logs))
+            start = end + 1
+            size = min(self.chunk_size, size * 2)
+        return to_block
+
+    def _get_logs(self, start, end):
+        params = {
+            "fromBlock": start,
+            "toBlock": end,
+            "topics": [list(self.topics)],
+        }
+        if self.addresses:
+            params["address"] = self.addresses
+        return self.web3.eth.get_logs(params)
+
+    def _decode(self, logs):
+        leverage, harvests = [], []
+        timestamps = {}
+        for event in logs:
+            block = event["blockNumber"]
+            if block not in timestamps:
+                timestamps[block] = self.web3.eth.get_block(block)["timestamp"]
+            head = (
+                block,
+                timestamps[block],
+                _hex(event["transactionHash"]),
+                event["logIndex"],
+                event["address"],
+            )
+            words = _words(event["data"])
+
+            if self.topics[_hex(event["topics"][0])] == "leverage":
+                *amounts, deficit, lender = words
+                lender = self.web3.toChecksumAddress(f"0x{lender:040x}")
+                leverage.append(
+                    head + tuple(str(a) for a in amounts) + (deficit, lender)
+                )
+            else:
+                gas = (None, None)
+                if self.with_gas:
+                    receipt = self.web3.eth.get_transaction_receipt(
+                        event["transactionHash"]
+                    )
+                    gas = (receipt["gasUsed"], receipt.get("effectiveGasPrice"))
+                harvests.append(head + tuple(str(w) for w in words) + gas)
+        return leverage, harvests
+
+
+def _hex(value):
+    value = value.hex() if isinstance(value, bytes) else value
+    return value if value.startswith("0x") else "0x" + value
+
+
+def _words(data):
+    # every field of both events is a static 32 bytes word
+    data = bytes.fromhex(_hex(data)[2:])
+    return [int.from_bytes(data[i : i + 32], "big") for i in range(0, len(data), 32)]
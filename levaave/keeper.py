@@ -0,0 +1,424 @@
+"""
+Keeper daemon for a fleet of LevAave strategies.
+
+On every new block it reads the health of all strategies through LevAaveLens,
+a few batches in flight at once, and sends the harvests and tends whose
+trigger fires: one transaction per strategy, or a single KeeperExecutor.work
+for all of them. Node calls are blocking web3 calls run on a thread pool, so
+batches, receipts and the block poll overlap.
+
+Triggers are priced at the current gas price. Harvests wait while the base fee
+is above `max_base_fee`, tends protect the position from liquidation and are
+always sent.
+"""
+
+import asyncio
+import bisect
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from web3.exceptions import TimeExhausted
+
+log = logging.getLogger(__name__)
+
+# rough upper bound of a levered harvest, used to price the call for the triggers
+HARVEST_GAS = 2_000_000
+GAS_LIMIT_MARGIN = 1.2
+# Strategy.LIQUIDATION_WARNING_THRESHOLD
+LIQUIDATION_WARNING_THRESHOLD = 10**16
+PRIORITY_FEE = 2 * 10**9
+# web3's default, a receipt still missing after it is waited for again
+RECEIPT_TIMEOUT = 120
+
+ERC20_ABI = [
+    {
+        "name": "decimals",
+        "type": "function",
+        "stateMutability": "view",
+        "inputs": [],
+        "outputs": [{"name": "", "type": "uint8"}],
+    },
+    {
+        "name": "symbol",
+        "type": "function",
+        "stateMutability": "view",
+        "inputs": [],
+        "outputs": [{"name": "", "type": "string"}],
+    },
+]
+
+# Tracks how long triggers wait for their transaction to be mined
+LATENCY_BUCKETS = [1, 2, 5, 12, 24, 60, 120, 300, 600, 1800, 3600]
+
+
+def load_abi(name, build_dir="build/contracts"):
+    """ABI of a contract compiled by brownie"""
+    with open(os.path.join(build_dir, f"{name}.json")) as f:
+        return json.load(f)["abi"]
+
+
+def decode(value, abi_output):
+    """web3 returns structs as tuples, this names their fields after the ABI"""
+    if abi_output["type"].endswith("[]"):
+        item = dict(abi_output, type=abi_output["type"][:-2])
+        return [decode(v, item) for v in value]
+    if abi_output["type"] == "tuple":
+        return {
+            c["name"]: decode(v, c) for c, v in zip(abi_output["components"], value)
+        }
+    return value
+
+
+class Histogram:
+    """Latency in seconds, bucketed by their upper bound"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the `q` quantile"""
+        seen = 0
+        for bound, count in zip(self.buckets + [self.max], self.counts):
+            seen += count
+            if seen >= q * self.count:
+                return min(bound, self.max)
+        return self.max
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "p50": self.percentile(0.5),
+            "p99": self.percentile(0.99),
+            "max": self.max,
+        }
+
+
+class StrategyInfo:
+    """Immutable data of a strategy, read once"""
+
+    def __init__(self, address, want, symbol, decimals):
+        self.address = address
+        self.want = want
+        self.symbol = symbol
+        self.decimals = decimals
+
+    def format(self, amount):
+        """`amount` of want in token units"""
+        return f"{amount / 10 ** self.decimals:,.4f} {self.symbol}"
+
+
+class NonceManager:
+    """Hands out nonces locally so transactions of a block don't wait on each other"""
+
+    def __init__(self, keeper):
+        self._keeper = keeper
+        self._lock = asyncio.Lock()
+        self._nonce = None
+        self._outstanding = set()  # handed out, not sent yet
+        self._free = []  # failed to send, handed out again first
+
+    async def next(self):
+        async with self._lock:
+            if self._free:
+                nonce = self._free.pop(0)
+            else:
+                if self._nonce is None:
+                    self._nonce = await self._keeper.node(
+                        self._keeper.web3.eth.get_transaction_count,
+                        self._keeper.address,
+                        "pending",
+                    )
+                nonce = self._nonce
+                self._nonce += 1
+            self._outstanding.add(nonce)
+            return nonce
+
+    def sent(self, nonce):
+        self._outstanding.discard(nonce)
+        self._resync()
+
+    def failed(self, nonce):
+        """
+        A nonce that failed to send leaves a gap, the next send fills it. The
+        node is only asked again once no other nonce is outstanding, until then
+        its pending count can miss theirs and hand one of them out twice.
+        """
+        self._outstanding.discard(nonce)
+        bisect.insort(self._free, nonce)
+        self._resync()
+
+    def _resync(self):
+        if self._free and not self._outstanding:
+            self._nonce = None
+            self._free.clear()
+
+
+class Keeper:
+    def __init__(
+        self,
+        web3,
+        lens,
+        strategies,
+        account,
+        executor=None,
+        abis=None,
+        batch_size=50,
+        concurrency=8,
+        poll_interval=1.0,
+        max_base_fee=None,
+        priority_fee=PRIORITY_FEE,
+        harvest_gas=HARVEST_GAS,
+        receipt_timeout=RECEIPT_TIMEOUT,
+    ):
+        """
+        `account` is an eth_account LocalAccount, or the address of an account
+        the node signs for. It must be keeper of the strategies, or of
+        `executor` when one is given. Build it from a coroutine, its locks
+        belong to the running event loop.
+        """
+        abis = abis or {
+            name: load_abi(name)
+            for name in ["Strategy", "LevAaveLens", "KeeperExecutor"]
+        }
+        self.web3 = web3
+        self.lens = web3.eth.contract(lens, abi=abis["LevAaveLens"])
+        self.executor = executor and web3.eth.contract(
+            executor, abi=abis["KeeperExecutor"]
+        )
+        self.strategies = [
+            web3.eth.contract(s, abi=abis["Strategy"]) for s in strategies
+        ]
+        self.account = account
+        self.address = getattr(account, "address", account)
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_base_fee = max_base_fee
+        self.priority_fee = priority_fee
+        self.harvest_gas = harvest_gas
+        self.receipt_timeout = receipt_timeout
+
+        self.info = {}
+        self.latency = {s.address: Histogram() for s in self.strategies}
+        self.nonces = NonceManager(self)
+        self._pool = ThreadPoolExecutor(concurrency)
+        self._calls = asyncio.Semaphore(concurrency)
+        self._pending = {}  # strategy => (tx hash, detection time, block)
+        self._receipts = set()
+        self._health_abi = next(
+            f for f in self.lens.abi if f.get("name") == "getHealth"
+        )["outputs"][0]
+
+    async def node(self, fn, *args, **kwargs):
+        async with self._calls:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool, lambda: fn(*args, **kwargs))
+
+    async def load(self):
+        """Caches want, its symbol and decimals of every strategy for the logs"""
+
+        async def load_one(strategy):
+            want = await self.node(strategy.functions.want().call)
+            token = self.web3.eth.contract(want, abi=ERC20_ABI)
+            symbol, decimals = await asyncio.gather(
+                self.node(token.functions.symbol().call),
+                self.node(token.functions.decimals().call),
+            )
+            self.info[strategy.address] = StrategyInfo(
+                strategy.address, want, symbol, decimals
+            )
+
+        await asyncio.gather(*[load_one(s) for s in self.strategies])
+
+    async def fees(self, block):
+        """Transaction fee fields and the gas price triggers are priced at"""
+        base_fee = block.get("baseFeePerGas")
+        if base_fee is None:
+            gas_price = await self.node(lambda: self.web3.eth.gas_price)
+            return {"gasPrice": gas_price}, gas_price
+        fees = {
+            "maxFeePerGas": 2 * base_fee + self.priority_fee,
+            "maxPriorityFeePerGas": self.priority_fee,
+        }
+        return fees, base_fee + self.priority_fee
+
+    async def health(self, block_number, call_cost):
+        """LevAaveLens.getHealth of every strategy, batches read concurrently"""
+        addresses = [s.address for s in self.strategies]
+        batches = [
+            addresses[i : i + self.batch_size]
+            for i in range(0, len(addresses), self.batch_size)
+        ]
+        results = await asyncio.gather(
+            *[
+                self.node(
+                    self.lens.functions.getHealth(batch, call_cost).call,
+                    block_identifier=block_number,
+                )
+                for batch in batches
+            ]
+        )
+        return [decode(h, self._health_abi) for r in results for h in r]
+
+    async def step(self, block=None):
+        """Checks every strategy at `block` and sends what needs to be done"""
+        block = block or await self.node(self.web3.eth.get_block, "latest")
+        fees, gas_price = await self.fees(block)
+        call_cost = self.harvest_gas * gas_price
+        expensive = self.max_base_fee is not None and (
+            block.get("baseFeePerGas", gas_price) > self.max_base_fee
+        )
+
+        work = []
+        for health in await self.health(block["number"], call_cost):
+            strategy = health["strategy"]
+            if not health["ok"] or not health["triggersOk"]:
+                log.warning("%s: failed to read its health", strategy)
+                continue
+            if strategy in self._pending:
+                continue
+            # tendTrigger is false whenever harvestTrigger is true
+            at_risk = health["tendTrigger"] or (
+                health["distanceToLiquidation"] <= LIQUIDATION_WARNING_THRESHOLD
+            )
+            assets = self._format(strategy, health["snapshot"]["estimatedTotalAssets"])
+            if health["harvestTrigger"] and not expensive:
+                log.info("%s: harvesting %s", strategy, assets)
+                work.append((strategy, "harvest"))
+            elif at_risk:
+                ratio = health["snapshot"]["currentCollatRatio"] / 1e18
+                log.info(
+                    "%s: collateral ratio at %.4f, tending %s", strategy, ratio, assets
+                )
+                work.append((strategy, "tend"))
+
+        if not work:
+            return []
+        detected = (time.monotonic(), block["number"])
+        if self.executor:
+            strategies = [s for s, _ in work]
+            tx = self.executor.functions.work(strategies, call_cost)
+            await self._send(tx, fees, strategies, detected)
+        else:
+            await asyncio.gather(
+                *[
+                    self._send(
+                        self._contract(s).get_function_by_name(action)(),
+                        fees,
+                        [s],
+                        detected,
+                    )
+                    for s, action in work
+                ]
+            )
+        return work
+
+    async def run(self, stop=None):
+        """Runs `step` on every new block until `stop` is set"""
+        stop = stop or asyncio.Event()
+        await self.load()
+        last = None
+        while not stop.is_set():
+            block = await self.node(self.web3.eth.get_block, "latest")
+            if block["number"] != last:
+                last = block["number"]
+                try:
+                    await self.step(block)
+                except Exception:
+                    log.exception("block %d: keeper step failed", last)
+            try:
+                await asyncio.wait_for(stop.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+        await self.drain()
+
+    async def drain(self):
+        """Waits for every sent transaction to be mined"""
+        while self._receipts:
+            await asyncio.gather(*list(self._receipts))
+
+    def _contract(self, address):
+        return next(s for s in self.strategies if s.address == address)
+
+    def _format(self, strategy, amount):
+        info = self.info.get(strategy)
+        return info.format(amount) if info else f"{amount} wei of want"
+
+    async def _send(self, fn, fees, strategies, detected):
+        tx = {"from": self.address, **fees}
+        try:
+            gas = await self.node(fn.estimate_gas, tx)
+        except Exception as e:
+            log.warning("%s: %s would revert: %s", strategies, fn.fn_name, e)
+            return
+        tx["gas"] = int(gas * GAS_LIMIT_MARGIN)
+        nonce = tx["nonce"] = await self.nonces.next()
+
+        try:
+            if isinstance(self.account, str):
+                tx_hash = await self.node(fn.transact, tx)
+            else:
+                signed = self.account.sign_transaction(fn.build_transaction(tx))
+                tx_hash = await self.node(
+                    self.web3.eth.send_raw_transaction, signed.rawTransaction
+                )
+        except Exception as e:
+            self.nonces.failed(nonce)
+            log.error("%s: failed to send %s: %s", strategies, fn.fn_name, e)
+            return
+        self.nonces.sent(nonce)
+
+        for strategy in strategies:
+            self._pending[strategy] = (tx_hash, *detected)
+        task = asyncio.ensure_future(self._wait(tx_hash, strategies))
+        self._receipts.add(task)
+        task.add_done_callback(self._receipts.discard)
+
+    async def _wait(self, tx_hash, strategies):
+        # the strategies stay pending until the transaction is mined: sending
+        # again would take a fresh nonce while this one can still be included
+        while True:
+            try:
+                receipt = await self.node(
+                    self.web3.eth.wait_for_transaction_receipt,
+                    tx_hash,
+                    timeout=self.receipt_timeout,
+                )
+                break
+            except TimeExhausted:
+                log.warning(
+                    "%s: %s not mined after %ds, still waiting",
+                    strategies,
+                    tx_hash.hex(),
+                    self.receipt_timeout,
+                )
+            except Exception:
+                log.exception("%s: failed to fetch the receipt", strategies)
+                await asyncio.sleep(self.poll_interval)
+        pending = [self._pending.pop(s) for s in strategies]
+        for strategy, (_, detected_at, detected_block) in zip(strategies, pending):
+            self.latency[strategy].observe(time.monotonic() - detected_at)
+            log.info(
+                "%s: mined %d blocks after its trigger, status %d",
+                strategy,
+                receipt["blockNumber"] - detected_block,
+                receipt["status"],
+            )
+        return receipt
@@ -0,0 +1,39 @@
+"""
+Collateral ratio helpers of Strategy.sol, on integer arrays.
+
+Values are numpy arrays with dtype=object, so arithmetic runs on python ints:
+no overflow, and `//` truncates like solidity's division of unsigned values.
+"""
+
+import numpy as np
+
+WAD = 10**18
+COLLATERAL_RATIO_PRECISION = WAD
+BPS_WAD_RATIO = 10**14
+
+
+def uint(values, size=None):
+    """Object array of python ints, broadcasting a scalar to `size`"""
+    if np.isscalar(values):
+        values = [values] * (size or 1)
+    return np.array([int(v) for v in values], dtype=object)
+
+
+def get_collat_ratio(deposits, borrows):
+    has_deposits = deposits > 0
+    safe_deposits = np.where(has_deposits, deposits, 1)
+    return np.where(
+        has_deposits, borrows * COLLATERAL_RATIO_PRECISION // safe_deposits, 0
+    )
+
+
+def get_borrow_from_deposit(deposit, collat_ratio):
+    return deposit * collat_ratio // COLLATERAL_RATIO_PRECISION
+
+
+def get_deposit_from_borrow(borrow, collat_ratio):
+    return borrow * COLLATERAL_RATIO_PRECISION // collat_ratio
+
+
+def get_borrow_from_supply(supply, collat_ratio):
+    return supply * collat_ratio // (COLLATERAL_RATIO_PRECISION - collat_ratio)
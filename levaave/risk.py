@@ -0,0 +1,421 @@
+"""
+Monte Carlo estimate of how often a levered position gets liquidated, for a
+grid of `targetCollatRatio` margins and `tendTrigger` warning thresholds.
+
+Want and DAI are borrowed against themselves, so their prices cancel out of
+the health factor: the collateral ratio only drifts with the spread between
+the borrow and supply rates, which spike when a reserve is fully utilized.
+Prices still matter when unwinding, since FlashMintLib converts through the
+oracle prices and DssFlash caps each flash mint in DAI. A position crossing
+the warning threshold is tended after the keeper's latency, or levered back to
+target at the next harvest, whichever comes first.
+
+Paths are split in chunks simulated by a pool of processes, each with its own
+random stream, so results only depend on the seed and the chunk size.
+
+    python -m levaave.risk WETH WBTC --paths 1000000
+"""
+
+import argparse
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from levaave.ratios import WAD
+from levaave.simulator import (
+    DEFAULT_COLLAT_MAX_MARGIN,
+    DEFAULT_COLLAT_TARGET_MARGIN,
+    FLASH_ROUND_GAS,
+)
+
+SECONDS_PER_YEAR = 365 * 24 * 3600
+# ratios are plain floats here, the position is modelled per unit of assets
+TARGET_MARGIN = DEFAULT_COLLAT_TARGET_MARGIN / WAD
+MAX_MARGIN = DEFAULT_COLLAT_MAX_MARGIN / WAD
+LIQUIDATION_WARNING_THRESHOLD = 0.01
+
+TARGET_MARGINS = np.arange(1, 13) * 0.0025
+THRESHOLDS = np.arange(1, 9) * 0.0025
+
+
+class Market:
+    """Aave reserve of a want and the random processes driving it"""
+
+    def __init__(
+        self,
+        ltv_bps,
+        liquidation_threshold_bps,
+        supply_apr,
+        borrow_apr,
+        rate_reversion=50.0,
+        rate_volatility=1.5,
+        spikes_per_year=6.0,
+        spike_multiple=20.0,
+        want_volatility=0.6,
+        dai_volatility=0.7,
+        correlation=0.5,
+        want_price=1.0,
+        dai_price=1.0 / 4_000,
+        dai_ltv_bps=7_500,
+        position=1_000.0,
+        max_liquidity=500_000_000.0,
+    ):
+        self.ltv = ltv_bps / 10_000
+        self.liquidation_threshold = liquidation_threshold_bps / 10_000
+        self.dai_ltv = dai_ltv_bps / 10_000
+        self.supply_apr = supply_apr
+        self.borrow_apr = borrow_apr
+        # log borrow rate reverts to its base, `rate_reversion` per year
+        self.rate_reversion = rate_reversion
+        self.rate_volatility = rate_volatility
+        self.spikes_per_year = spikes_per_year
+        self.spike_multiple = spike_multiple
+        # yearly volatility and correlation of want and DAI against eth
+        self.want_volatility = want_volatility
+        self.dai_volatility = dai_volatility
+        self.correlation = correlation
+        # starting aave oracle prices, in eth
+        self.want_price = want_price
+        self.dai_price = dai_price
+        # real assets of the strategy, in want, and DssFlash's max, in DAI
+        self.position = position
+        self.max_liquidity = max_liquidity
+
+
+# rough figures for the wants the suite runs against, tweak them before
+# relying on a recommendation
+MARKETS = {
+    "WBTC": Market(7_000, 7_500, 0.001, 0.01, want_price=15.0, position=50.0),
+    "YFI": Market(4_000, 5_500, 0.001, 0.02, want_price=9.0, position=50.0),
+    "WETH": Market(8_250, 8_500, 0.003, 0.015, want_volatility=0.0),
+    "LINK": Market(7_000, 7_500, 0.001, 0.01, want_price=0.005, position=50_000),
+}
+# stablecoins move with DAI
+for symbol, ltv_bps, liquidation_threshold_bps in [
+    ("USDT", 8_000, 8_500),
+    ("DAI", 7_500, 8_000),
+    ("USDC", 8_000, 8_500),
+]:
+    MARKETS[symbol] = Market(
+        ltv_bps,
+        liquidation_threshold_bps,
+        0.02,
+        0.03,
+        want_volatility=0.7,
+        correlation=0.99,
+        want_price=1 / 4_000,
+        position=4_000_000,
+    )
+
+
+class Keeper:
+    """How fast tends land and how often the strategy is harvested"""
+
+    def __init__(
+        self,
+        median_latency=600,
+        latency_dispersion=1.5,
+        harvest_interval=7 * 24 * 3600,
+        is_flash_mint_active=True,
+        flash_gas_budget=6_000_000,
+        max_iterations=6,
+        min_ratio=0.005,
+    ):
+        # seconds between a trigger and its tend being mined, log-normal so
+        # that a keeper is now and then down for hours
+        self.median_latency = median_latency
+        self.latency_dispersion = latency_dispersion
+        self.harvest_interval = harvest_interval
+        self.is_flash_mint_active = is_flash_mint_active
+        self.flash_gas_budget = flash_gas_budget
+        self.max_iterations = max_iterations
+        self.min_ratio = min_ratio
+
+
+class Result:
+    """Liquidations and tends summed over paths, per (margin, threshold)"""
+
+    def __init__(self, target_margins, thresholds, paths, liquidations, tends):
+        self.target_margins = target_margins
+        self.thresholds = thresholds
+        self.paths = paths
+        self.liquidations = liquidations
+        self.tends = tends
+
+    @property
+    def probability(self):
+        return self.liquidations / self.paths
+
+    def upper_bound(self, z=3.0):
+        """Wilson score upper bound of the liquidation probability"""
+        p, n = self.probability, self.paths
+        center = p + z**2 / (2 * n)
+        spread = z * np.sqrt(p * (1 - p) / n + z**2 / (4 * n**2))
+        return (center + spread) / (1 + z**2 / n)
+
+
+def feasible(target_margins, thresholds, min_ratio=0.005):
+    """
+    Tends must land further than `minRatio` from the target, or
+    adjustPosition would do nothing and the keeper would tend again and again.
+    """
+    margins, thresholds = np.meshgrid(target_margins, thresholds, indexing="ij")
+    return margins - thresholds > min_ratio
+
+
+def max_margin(threshold):
+    """
+    maxCollatRatio caps the iterative unwind withdrawals, it must sit between
+    the warning threshold and the liquidation threshold for a tend to repay
+    without a flash mint.
+    """
+    return np.minimum(MAX_MARGIN, np.asarray(threshold) / 2)
+
+
+def simulate(
+    market,
+    keeper=None,
+    target_margins=TARGET_MARGINS,
+    thresholds=THRESHOLDS,
+    paths=1_000_000,
+    horizon=30 * 24 * 3600,
+    step=900,
+    chunk=20_000,
+    seed=0,
+    workers=None,
+):
+    """Runs `paths` paths of `horizon` seconds for every feasible cell"""
+    keeper = keeper or Keeper()
+    target_margins = np.asarray(target_margins, dtype=float)
+    thresholds = np.asarray(thresholds, dtype=float)
+    cells = np.argwhere(feasible(target_margins, thresholds, keeper.min_ratio))
+
+    sizes = [chunk] * (paths // chunk) + ([paths % chunk] if paths % chunk else [])
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [
+        (
+            market,
+            keeper,
+            target_margins[cells[:, 0]],
+            thresholds[cells[:, 1]],
+            size,
+            horizon,
+            step,
+            chunk_seed,
+        )
+        for size, chunk_seed in zip(sizes, seeds)
+    ]
+
+    workers = workers or os.cpu_count()
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(workers) as executor:
+            chunks = list(executor.map(_simulate_chunk, tasks))
+    else:
+        chunks = [_simulate_chunk(task) for task in tasks]
+
+    shape = (len(target_margins), len(thresholds))
+    liquidations = np.full(shape, np.nan)
+    tends = np.full(shape, np.nan)
+    liquidations[cells[:, 0], cells[:, 1]] = sum(c[0] for c in chunks)
+    tends[cells[:, 0], cells[:, 1]] = sum(c[1] for c in chunks)
+    return Result(target_margins, thresholds, paths, liquidations, tends)
+
+
+def recommend(result, tolerance=1e-4):
+    """
+    Smallest target margin whose liquidation probability stays under
+    `tolerance`, with the threshold that gets it the fewest liquidations.
+    Returns None when no cell of the grid is safe enough.
+    """
+    safe = result.upper_bound() <= tolerance
+    for i, target_margin in enumerate(result.target_margins):
+        if not safe[i].any():
+            continue
+        candidates = np.flatnonzero(safe[i])
+        # fewest liquidations, then fewest tends
+        j = min(
+            candidates,
+            key=lambda j: (result.liquidations[i, j], result.tends[i, j]),
+        )
+        threshold = result.thresholds[j]
+        return {
+            "target_margin": float(target_margin),
+            "max_margin": float(max_margin(threshold)),
+            "warning_threshold": float(threshold),
+            "probability": float(result.probability[i, j]),
+            "tends_per_path": float(result.tends[i, j] / result.paths),
+        }
+    return None
+
+
+def collateral_targets(recommendation, liquidation_threshold):
+    """targetCollatRatio and maxCollatRatio to pass to setCollateralTargets"""
+    margins = [recommendation["target_margin"], recommendation["max_margin"]]
+    return [liquidation_threshold - round(m * WAD) for m in margins]
+
+
+def _simulate_chunk(task):
+    market, keeper, target_margins, thresholds, size, horizon, step, seed = task
+    rng = np.random.default_rng(seed)
+    m, k = market, keeper
+    cells = len(target_margins)
+    dt = step / SECONDS_PER_YEAR
+
+    log_lt = math.log(m.liquidation_threshold)
+    target = m.liquidation_threshold - target_margins
+    log_warning = np.log(m.liquidation_threshold - thresholds)[:, None]
+    max_ratio = m.liquidation_threshold - max_margin(thresholds)
+
+    # the ratio drifts by the same factor for every cell of a path, so it is
+    # kept as exp(offset + drift) and a cell only gets looked at once its
+    # path's drift crosses `watch`. Per path minimums skip the quiet paths
+    drift = np.zeros(size)
+    offset = np.repeat(np.log(target)[:, None], size, axis=1)
+    watch = log_warning - offset
+    lands_at = np.full((cells, size), np.inf)
+    path_watch = watch.min(axis=0)
+    path_landing = np.full(size, np.inf)
+    liquidated = np.zeros((cells, size), dtype=bool)
+    tends = np.zeros((cells, size), dtype=np.int64)
+
+    base_rate = math.log(m.borrow_apr)
+    log_rate = np.full(size, base_rate)
+    supply_share = m.supply_apr / m.borrow_apr
+    log_want = np.full(size, math.log(m.want_price))
+    log_dai = np.full(size, math.log(m.dai_price))
+    # correlated want and DAI moves against eth
+    cross = math.sqrt(1 - m.correlation**2)
+
+    def settle(c, p):
+        ratio = np.exp(offset[c, p] + drift[p])
+        dai_per_want = np.exp(log_want[p] - log_dai[p])
+        ratio = _adjust(ratio, target[c], max_ratio[c], dai_per_want, m, k)
+        offset[c, p] = np.log(ratio) - drift[p]
+        watch[c, p] = log_warning[c, 0] - offset[c, p]
+
+    def refresh(p):
+        p = np.unique(p)
+        path_watch[p] = watch[:, p].min(axis=0)
+        path_landing[p] = lands_at[:, p].min(axis=0)
+
+    harvest_every = max(1, round(k.harvest_interval / step))
+    for n in range(1, int(horizon // step) + 1):
+        now = n * step
+
+        jumps = rng.random(size) < m.spikes_per_year * dt
+        log_rate += (
+            m.rate_reversion * (base_rate - log_rate) * dt
+            + m.rate_volatility * math.sqrt(dt) * rng.standard_normal(size)
+            + np.where(jumps, math.log(m.spike_multiple), 0)
+        )
+        # debt compounds at the borrow rate, deposits at the supply rate
+        drift += np.exp(log_rate) * (1 - supply_share) * dt
+
+        z_want, z_other = rng.standard_normal((2, size))
+        z_dai = m.correlation * z_want + cross * z_other
+        log_want += m.want_volatility * math.sqrt(dt) * z_want
+        log_want -= m.want_volatility**2 / 2 * dt
+        log_dai += m.dai_volatility * math.sqrt(dt) * z_dai
+        log_dai -= m.dai_volatility**2 / 2 * dt
+
+        hot = np.flatnonzero(drift >= path_watch)
+        if len(hot):
+            c, j = np.nonzero(drift[hot] >= watch[:, hot])
+            p = hot[j]
+            dead = offset[c, p] + drift[p] >= log_lt
+            liquidated[c[dead], p[dead]] = True
+            watch[c[dead], p[dead]] = np.inf
+            lands_at[c[dead], p[dead]] = np.inf
+            # the others crossed the warning, a pending tend only watches the
+            # liquidation threshold
+            c, p = c[~dead], p[~dead]
+            latency = k.median_latency * rng.lognormal(0, k.latency_dispersion, len(c))
+            lands_at[c, p] = now + latency
+            watch[c, p] = log_lt - offset[c, p]
+            refresh(hot)
+
+        due = np.flatnonzero(path_landing <= now)
+        if len(due):
+            c, j = np.nonzero(lands_at[:, due] <= now)
+            p = due[j]
+            tends[c, p] += 1
+            lands_at[c, p] = np.inf
+            settle(c, p)
+            refresh(due)
+
+        if n % harvest_every == 0:
+            lands_at[:] = np.inf
+            settle(*np.nonzero(~liquidated))
+            refresh(np.arange(size))
+
+    return liquidated.sum(axis=1), tends.sum(axis=1)
+
+
+def _adjust(ratio, target, max_ratio, dai_per_want, market, keeper):
+    """adjustPosition, returns the collateral ratios it lands on"""
+    ratio = np.where(ratio < target - keeper.min_ratio, target, ratio)
+    down = ratio > target + keeper.min_ratio
+    # borrows and deposits per unit of real assets, which unwinding keeps
+    borrows = ratio / (1 - ratio)
+    to_repay = np.where(down, borrows - target / (1 - target), 0)
+
+    if keeper.is_flash_mint_active:
+        # each round mints up to DssFlash's max, until flashGasBudget runs out
+        rounds = math.ceil(keeper.flash_gas_budget / FLASH_ROUND_GAS)
+        per_round = market.max_liquidity * (market.dai_ltv - MAX_MARGIN)
+        capacity = rounds * per_round / dai_per_want / market.position
+        repaid = np.minimum(to_repay, capacity)
+        borrows = borrows - repaid
+        to_repay = to_repay - repaid
+
+    # then withdraw up to maxCollatRatio and repay, maxIterations times
+    for _ in range(keeper.max_iterations):
+        withdrawable = np.maximum(borrows + 1 - borrows / max_ratio, 0)
+        repaid = np.minimum(to_repay, withdrawable)
+        borrows = borrows - repaid
+        to_repay = to_repay - repaid
+
+    return np.where(down, borrows / (borrows + 1), ratio)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("wants", nargs="*", default=list(MARKETS))
+    parser.add_argument("--paths", type=int, default=1_000_000)
+    parser.add_argument("--days", type=float, default=30)
+    parser.add_argument("--step", type=int, default=900, help="seconds")
+    parser.add_argument("--latency", type=float, default=600, help="seconds")
+    parser.add_argument("--tolerance", type=float, default=1e-4)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    keeper = Keeper(median_latency=args.latency)
+    report = {}
+    for want in args.wants:
+        result = simulate(
+            MARKETS[want],
+            keeper,
+            paths=args.paths,
+            horizon=args.days * 24 * 3600,
+            step=args.step,
+            seed=args.seed,
+            workers=args.workers,
+        )
+        report[want] = recommend(result, args.tolerance) or {}
+        current = np.flatnonzero(np.isclose(result.target_margins, TARGET_MARGIN))
+        default = np.flatnonzero(
+            np.isclose(result.thresholds, LIQUIDATION_WARNING_THRESHOLD)
+        )
+        if len(current) and len(default):
+            report[want]["default_probability"] = float(
+                result.probability[current[0], default[0]]
+            )
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
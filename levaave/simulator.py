@@ -0,0 +1,447 @@
+"""
+Off-chain mirror of the Strategy's levering logic, vectorized over scenarios.
+
+Each scenario is one strategy position with its own config. Functions take a
+`Batch` and update it in place, exactly like the contract would update its
+Aave position, only touching the scenarios selected by `mask`. Loops run up to
+the largest `maxIterations` of the batch, with finished scenarios masked out.
+
+Flash loans are sized as `FlashMintLib` does for DssFlash. The want lenders
+are only picked when free, which Aave never is, so they are not modelled.
+"""
+
+import numpy as np
+
+from levaave.ratios import (
+    COLLATERAL_RATIO_PRECISION,
+    WAD,
+    BPS_WAD_RATIO,
+    get_borrow_from_deposit,
+    get_borrow_from_supply,
+    get_collat_ratio,
+    get_deposit_from_borrow,
+    uint,
+)
+
+MAX_BPS = 10_000
+DEFAULT_COLLAT_TARGET_MARGIN = 2 * 10**16
+DEFAULT_COLLAT_MAX_MARGIN = 5 * 10**15
+
+# rough gas per call, good to rank scenarios rather than to predict a tx
+GAS = {
+    "deposit": 180_000,
+    "withdraw": 230_000,
+    "borrow": 280_000,
+    "repay": 160_000,
+    "flash": 120_000,
+}
+# gas of one flash unwind round, to play out `flashGasBudget`
+FLASH_ROUND_GAS = 4 * 220_000 + GAS["flash"]
+
+
+class Params:
+    """Strategy config and market, a scalar or an array per scenario"""
+
+    def __init__(
+        self,
+        target_collat_ratio,
+        max_collat_ratio,
+        max_borrow_collat_ratio,
+        dai_borrow_collat_ratio,
+        min_want=100,
+        min_ratio=5 * 10**15,
+        max_iterations=6,
+        is_flash_mint_active=True,
+        flash_gas_budget=6_000_000,
+        want_unit=WAD,
+        want_price=WAD,
+        dai_price=WAD,
+        is_dai=False,
+        max_liquidity=500_000_000 * WAD,
+        idle_want=0,
+        idle_want_bps=0,
+    ):
+        self.target_collat_ratio = _int(target_collat_ratio)
+        self.max_collat_ratio = _int(max_collat_ratio)
+        self.max_borrow_collat_ratio = _int(max_borrow_collat_ratio)
+        self.dai_borrow_collat_ratio = _int(dai_borrow_collat_ratio)
+        self.min_want = _int(min_want)
+        self.min_ratio = _int(min_ratio)
+        self.max_iterations = np.asarray(max_iterations)
+        self.is_flash_mint_active = np.asarray(is_flash_mint_active, dtype=bool)
+        self.flash_gas_budget = np.asarray(flash_gas_budget)
+        # prices are aave oracle prices, in eth
+        self.want_unit = _int(want_unit)
+        self.want_price = _int(want_price)
+        self.dai_price = _int(dai_price)
+        self.is_dai = np.asarray(is_dai, dtype=bool)
+        self.max_liquidity = _int(max_liquidity)
+        # loose want kept to serve withdrawals, see setIdleWantBuffer
+        self.idle_want = _int(idle_want)
+        self.idle_want_bps = _int(idle_want_bps)
+
+    @classmethod
+    def from_protocol(cls, ltv_bps, liquidation_threshold_bps, dai_ltv_bps, **kwargs):
+        """Collateral targets as set by Strategy._initializeThis"""
+        ltv = _int(ltv_bps) * BPS_WAD_RATIO
+        liquidation_threshold = _int(liquidation_threshold_bps) * BPS_WAD_RATIO
+        dai_ltv = _int(dai_ltv_bps) * BPS_WAD_RATIO
+        return cls(
+            liquidation_threshold - DEFAULT_COLLAT_TARGET_MARGIN,
+            liquidation_threshold - DEFAULT_COLLAT_MAX_MARGIN,
+            ltv - DEFAULT_COLLAT_MAX_MARGIN,
+            dai_ltv - DEFAULT_COLLAT_MAX_MARGIN,
+            **kwargs,
+        )
+
+
+class Batch:
+    """Positions of every scenario, plus what it took to get there"""
+
+    def __init__(self, params, deposits, borrows, loose):
+        size = max(len(np.atleast_1d(v)) for v in [deposits, borrows, loose])
+        self.params = params
+        self.deposits = uint(deposits, size)
+        self.borrows = uint(borrows, size)
+        self.loose = uint(loose, size)
+        self.pool_calls = np.zeros(size, dtype=int)
+        self.flash_loans = np.zeros(size, dtype=int)
+        self.flash_dai = uint(0, size)
+        self.gas = np.zeros(size, dtype=int)
+
+    @property
+    def size(self):
+        return len(self.deposits)
+
+    def collat_ratio(self):
+        return get_collat_ratio(self.deposits, self.borrows)
+
+    def real_assets(self):
+        return self.loose + self.deposits - self.borrows
+
+    def results(self):
+        return {
+            "deposits": self.deposits,
+            "borrows": self.borrows,
+            "loose": self.loose,
+            "collat_ratio": self.collat_ratio(),
+            "pool_calls": self.pool_calls,
+            "flash_loans": self.flash_loans,
+            "flash_dai": self.flash_dai,
+            "gas": self.gas,
+        }
+
+    def _call(self, mask, name, count=1):
+        self.pool_calls += np.where(mask, count, 0)
+        self.gas += np.where(mask, count * GAS[name], 0)
+
+
+def adjust_position(batch, debt_outstanding, mask=None):
+    """Strategy.adjustPosition, levering up or down to targetCollatRatio"""
+    p = batch.params
+    mask = _mask(batch, mask)
+    debt_outstanding = uint(debt_outstanding, batch.size)
+
+    # the debt outstanding and the withdrawal buffer stay loose
+    to_keep = debt_outstanding + idle_want_buffer(batch)
+    can_deposit = (batch.loose > to_keep) & (batch.loose - to_keep > p.min_want)
+    to_deposit = np.where(can_deposit, batch.loose - to_keep, 0)
+    current = get_collat_ratio(batch.deposits + to_deposit, batch.borrows)
+
+    free = mask & (
+        (debt_outstanding > batch.loose) | (to_keep > batch.loose + p.min_want)
+    )
+    free_funds(batch, _floor(to_keep - batch.loose), free)
+
+    lever_up = (
+        mask
+        & ~free
+        & (current < p.target_collat_ratio)
+        & (p.target_collat_ratio - current > p.min_ratio)
+    )
+    lever_max(batch, to_deposit, lever_up)
+
+    rest = mask & ~free & ~lever_up
+    _deposit(batch, to_deposit, rest)
+    lever_down = (
+        rest
+        & (current > p.target_collat_ratio)
+        & (current - p.target_collat_ratio > p.min_ratio)
+    )
+    new_borrow = get_borrow_from_supply(
+        _floor(batch.deposits - batch.borrows), p.target_collat_ratio
+    )
+    lever_down_to(batch, new_borrow, lever_down)
+
+
+def idle_want_buffer(batch):
+    """Strategy.idleWantBuffer"""
+    p = batch.params
+    return np.maximum(
+        uint(p.idle_want, batch.size),
+        batch.real_assets() * p.idle_want_bps // MAX_BPS,
+    )
+
+
+def lever_max(batch, to_deposit, mask=None):
+    """Strategy._leverMax"""
+    p = batch.params
+    mask = _mask(batch, mask)
+    to_deposit = uint(to_deposit, batch.size)
+
+    real_supply = batch.deposits + to_deposit - batch.borrows
+    new_borrow = get_borrow_from_supply(real_supply, p.target_collat_ratio)
+    total = _floor(new_borrow - batch.borrows)
+
+    flash = mask & p.is_flash_mint_active & (total > p.min_want)
+    _lever_up_flash(batch, total, to_deposit, flash)
+
+    iterative = mask & ~flash
+    _deposit(batch, to_deposit, iterative)
+    for i in range(int(np.max(p.max_iterations))):
+        active = iterative & (i < p.max_iterations) & (total > p.min_want)
+        if not active.any():
+            break
+        total = total - _lever_up_step(batch, total, active)
+
+
+def lever_down_to(batch, new_amount_borrowed, mask=None):
+    """Strategy._leverDownTo"""
+    p = batch.params
+    mask = _mask(batch, mask)
+    new_amount_borrowed = uint(new_amount_borrowed, batch.size)
+
+    repaying = mask & (batch.borrows > new_amount_borrowed)
+    total = np.where(repaying, batch.borrows - new_amount_borrowed, 0)
+
+    flash = repaying & p.is_flash_mint_active
+    total = np.where(
+        flash, _lever_down_flash_rounds(batch, total, new_amount_borrowed, flash), total
+    )
+    # a flash unwind that repaid everything leaves the position on target
+    done = flash & (total == 0)
+    repaying = repaying & ~done
+
+    for i in range(int(np.max(p.max_iterations))):
+        active = repaying & (i < p.max_iterations) & (total > p.min_want)
+        if not active.any():
+            break
+        _withdraw_excess_collateral(batch, p.max_collat_ratio, active)
+        to_repay = np.minimum(total, batch.loose)
+        repaid = _repay(batch, to_repay, active)
+        total = total - repaid
+
+    # deposit back or withdraw to land on targetCollatRatio
+    rebalance = mask & ~done
+    target_deposit = get_deposit_from_borrow(batch.borrows, p.target_collat_ratio)
+    short = rebalance & (target_deposit > batch.deposits)
+    to_deposit = _floor(target_deposit - batch.deposits)
+    _deposit(
+        batch, np.minimum(to_deposit, batch.loose), short & (to_deposit > p.min_want)
+    )
+    _withdraw_excess_collateral(batch, p.target_collat_ratio, rebalance & ~short)
+
+
+def free_funds(batch, amount_to_free, mask=None):
+    """Strategy._freeFunds, returns the loose want"""
+    p = batch.params
+    mask = _mask(batch, mask)
+    amount_to_free = uint(amount_to_free, batch.size)
+    mask = mask & (amount_to_free > 0)
+
+    real_assets = batch.deposits - batch.borrows
+    amount_required = np.minimum(amount_to_free, real_assets)
+    new_borrow = get_borrow_from_supply(
+        real_assets - amount_required, p.target_collat_ratio
+    )
+    lever_down_to(batch, new_borrow, mask)
+    return batch.loose
+
+
+def liquidate_position(batch, amount_needed, mask=None, refill_buffer=False):
+    """
+    Strategy._liquidatePosition, returns (liquidated amount, loss). With
+    `refill_buffer` the idle want buffer is freed on top of `amount_needed`,
+    as prepareReturn does
+    """
+    p = batch.params
+    mask = _mask(batch, mask)
+    amount_needed = uint(amount_needed, batch.size)
+    if refill_buffer:
+        amount_needed = amount_needed + idle_want_buffer(batch)
+
+    enough = batch.loose > amount_needed
+    free_funds(batch, _floor(amount_needed - batch.loose), mask & ~enough)
+
+    short = amount_needed > batch.loose
+    diff = _floor(amount_needed - batch.loose)
+    liquidated = np.where(enough | ~short, amount_needed, batch.loose)
+    loss = np.where(~enough & short & (diff <= p.min_want), diff, 0)
+    return np.where(mask, liquidated, 0), np.where(mask, loss, 0)
+
+
+def flash_mint_size(params, amount, deposit_to_close_ltv_gap=0):
+    """
+    FlashMintLib._flashMintDAI sizing, returns (want amount actually levered,
+    DAI minted, whether the amount was capped by DssFlash's liquidity)
+    """
+    amount = uint(amount)
+    gap = uint(deposit_to_close_ltv_gap, len(amount))
+    p = params
+
+    required_dai = (
+        _to_dai(p, amount) * COLLATERAL_RATIO_PRECISION // p.dai_borrow_collat_ratio
+    )
+    gap_dai = np.where(gap > 0, _to_dai(p, gap), 0)
+    required_dai = required_dai + gap_dai
+
+    capped = required_dai > p.max_liquidity
+    capped_amount = (
+        _from_dai(p, _floor(p.max_liquidity - gap_dai))
+        * p.dai_borrow_collat_ratio
+        // COLLATERAL_RATIO_PRECISION
+    )
+    amount = np.where(capped, capped_amount, amount)
+    required_dai = np.where(capped, p.max_liquidity, required_dai)
+    return amount, required_dai, capped
+
+
+def _lever_up_flash(batch, amount, to_deposit, mask):
+    p = batch.params
+    deposits_to_meet_ltv = get_deposit_from_borrow(
+        batch.borrows, p.max_borrow_collat_ratio
+    )
+    gap = _floor(deposits_to_meet_ltv - batch.deposits)
+    amount, required_dai, _ = flash_mint_size(p, amount, gap)
+
+    # loanLogic deposits DAI, borrows, deposits the borrow plus to_deposit and
+    # takes the DAI back. With DAI as want the DAI deposit is the want deposit
+    _flash(batch, required_dai, mask)
+    batch._call(mask, "borrow")
+    batch._call(mask, "deposit")
+    batch._call(mask, "withdraw")
+    batch._call(mask & ~p.is_dai, "deposit")
+    batch.deposits = np.where(
+        mask, batch.deposits + to_deposit + amount, batch.deposits
+    )
+    batch.borrows = np.where(mask, batch.borrows + amount, batch.borrows)
+    batch.loose = np.where(mask, batch.loose - to_deposit, batch.loose)
+
+
+def _lever_up_step(batch, amount, mask):
+    p = batch.params
+    can_borrow = get_borrow_from_deposit(batch.deposits, p.max_borrow_collat_ratio)
+    mask = mask & (amount > 0) & (can_borrow > batch.borrows)
+    amount = np.where(mask, np.minimum(amount, _floor(can_borrow - batch.borrows)), 0)
+
+    _borrow(batch, amount, mask)
+    _deposit(batch, amount, mask)
+    return amount
+
+
+def _lever_down_flash_rounds(batch, total, new_amount_borrowed, mask):
+    p = batch.params
+    target_deposit = get_deposit_from_borrow(new_amount_borrowed, p.target_collat_ratio)
+
+    rounds = 0
+    active = mask.copy()
+    while active.any():
+        active = active & (rounds * FLASH_ROUND_GAS < p.flash_gas_budget)
+        # _leverDownFlashLoan skips dust repayments
+        active = active & (total > p.min_want)
+        if not active.any():
+            break
+
+        amount_to_free = np.where(
+            batch.deposits > target_deposit + total,
+            _floor(batch.deposits - target_deposit - total),
+            0,
+        )
+        repaid, required_dai, capped = flash_mint_size(p, total)
+        amount_to_free = np.where(capped, 0, amount_to_free)
+
+        # loanLogic deposits DAI, withdraws want, repays and takes the DAI
+        # back. With DAI as want there is no DAI to deposit
+        _flash(batch, required_dai, active)
+        batch._call(active, "repay")
+        batch._call(active, "withdraw")
+        batch._call(active & ~p.is_dai, "deposit")
+        batch._call(active & ~p.is_dai, "withdraw")
+        batch.deposits = np.where(
+            active, batch.deposits - repaid - amount_to_free, batch.deposits
+        )
+        batch.borrows = np.where(active, batch.borrows - repaid, batch.borrows)
+        batch.loose = np.where(active, batch.loose + amount_to_free, batch.loose)
+
+        total = np.where(active, total - repaid, total)
+        active = active & (repaid > 0) & (total > 0)
+        rounds += 1
+    return total
+
+
+def _withdraw_excess_collateral(batch, collat_ratio, mask):
+    theo_deposits = get_deposit_from_borrow(batch.borrows, collat_ratio)
+    excess = mask & (batch.deposits > theo_deposits)
+    _withdraw(batch, _floor(batch.deposits - theo_deposits), excess)
+
+
+def _deposit(batch, amount, mask):
+    mask = mask & (amount > 0)
+    batch._call(mask, "deposit")
+    batch.deposits = np.where(mask, batch.deposits + amount, batch.deposits)
+    batch.loose = np.where(mask, batch.loose - amount, batch.loose)
+
+
+def _withdraw(batch, amount, mask):
+    mask = mask & (amount > 0)
+    batch._call(mask, "withdraw")
+    batch.deposits = np.where(mask, batch.deposits - amount, batch.deposits)
+    batch.loose = np.where(mask, batch.loose + amount, batch.loose)
+
+
+def _borrow(batch, amount, mask):
+    mask = mask & (amount > 0)
+    batch._call(mask, "borrow")
+    batch.borrows = np.where(mask, batch.borrows + amount, batch.borrows)
+    batch.loose = np.where(mask, batch.loose + amount, batch.loose)
+
+
+def _repay(batch, amount, mask):
+    # aave only takes up to the debt
+    repaid = np.where(mask & (amount > 0), np.minimum(amount, batch.borrows), 0)
+    batch._call(repaid > 0, "repay")
+    batch.borrows = batch.borrows - repaid
+    batch.loose = batch.loose - repaid
+    return repaid
+
+
+def _flash(batch, required_dai, mask):
+    batch.flash_loans += np.where(mask, 1, 0)
+    batch.flash_dai = np.where(mask, batch.flash_dai + required_dai, batch.flash_dai)
+    batch.gas += np.where(mask, GAS["flash"], 0)
+
+
+def _to_dai(p, amount):
+    value = amount * p.want_price // p.want_unit * WAD // p.dai_price
+    return np.where(p.is_dai | (amount == 0), amount, value)
+
+
+def _from_dai(p, amount):
+    value = amount * p.dai_price // WAD * p.want_unit // p.want_price
+    return np.where(p.is_dai | (amount == 0), amount, value)
+
+
+def _floor(values):
+    # where solidity would revert on underflow the scenario is masked out
+    return np.where(values > 0, values, 0)
+
+
+def _int(value):
+    # numpy scalars would overflow like int64, python ints don't
+    return int(value) if np.isscalar(value) else uint(value)
+
+
+def _mask(batch, mask):
+    if mask is None:
+        return np.ones(batch.size, dtype=bool)
+    return np.asarray(mask, dtype=bool)
@@ -2,6 +2,11 @@
 pragma solidity 0.6.12;
 
 library SupportStructs {
+    struct Position {
+        uint256 deposits;
+        uint256 borrows;
+    }
+
     struct CalcMaxDebtLocalVars {
         uint256 availableLiquidity;
         uint256 totalStableDebt;
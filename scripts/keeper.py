@@ -0,0 +1,58 @@
+"""
+Harvest or tend, in a single transaction, every LevAave strategy whose
+trigger fires.
+
+    FACTORY=0x... EXECUTOR=0x... brownie run keeper --network mainnet
+
+The batch is built from the factory's original and `Cloned` events, keeping the
+strategies the executor is keeper of.
+"""
+
+import os
+
+from brownie import KeeperExecutor, LevAaveFactory, Strategy, accounts, chain, network
+import click
+
+# rough upper bound of a levered harvest, used to price the call for the triggers
+HARVEST_GAS = 2_000_000
+ACTIONS = ["none", "harvest", "tend"]
+
+
+def get_strategies(factory, keeper, from_block):
+    strategies = [factory.original()]
+    for event in factory.events.get_sequence(from_block, event_type="Cloned"):
+        strategies.append(event.args.clone)
+
+    return [s for s in strategies if Strategy.at(s).keeper() == keeper]
+
+
+def build_batch(executor, strategies, call_cost):
+    actions = executor.workable(strategies, call_cost)
+    return [(s, ACTIONS[a]) for s, a in zip(strategies, actions) if a != 0]
+
+
+def main():
+    print(f"You are using the '{network.show_active()}' network")
+    keeper = accounts.load(click.prompt("Account", type=click.Choice(accounts.load())))
+    factory = LevAaveFactory.at(os.environ["FACTORY"])
+    executor = KeeperExecutor.at(os.environ["EXECUTOR"])
+    from_block = int(os.environ.get("FROM_BLOCK", 0))
+
+    strategies = get_strategies(factory, executor.address, from_block)
+    call_cost = HARVEST_GAS * chain.base_fee
+    batch = build_batch(executor, strategies, call_cost)
+    for strategy, action in batch:
+        print(f"{Strategy.at(strategy).name()} [{strategy}]: {action}")
+
+    if not batch:
+        print(f"Nothing to do for {len(strategies)} strategies")
+        return
+
+    tx = executor.work([s for s, _ in batch], call_cost, {"from": keeper})
+    for event in tx.events["Worked"]:
+        status = "ok" if event["success"] else "FAILED"
+        print(
+            f"{event['strategy']}: {ACTIONS[event['action']]} {status}, "
+            f"{event['gasUsed']:,} gas"
+        )
+    print(f"Batch of {len(batch)}: {tx.gas_used:,} gas")
@@ -0,0 +1,58 @@
+"""
+Keep a fleet of LevAave strategies, harvesting and tending on every block
+until interrupted.
+
+    FACTORY=0x... LENS=0x... brownie run keeper_daemon --network mainnet
+
+Set EXECUTOR=0x... to send a single KeeperExecutor.work per block instead of a
+transaction per strategy, and MAX_BASE_FEE (gwei) to hold harvests while gas is
+expensive. Latency histograms are printed on exit.
+"""
+
+import asyncio
+import logging
+import os
+
+from brownie import KeeperExecutor, LevAaveFactory, LevAaveLens, Strategy
+from brownie import accounts, network, web3
+import click
+from levaave.keeper import Keeper
+from scripts.keeper import get_strategies
+
+
+async def keep(strategies, account):
+    executor = os.environ.get("EXECUTOR")
+    max_base_fee = os.environ.get("MAX_BASE_FEE")
+    keeper = Keeper(
+        web3,
+        os.environ["LENS"],
+        strategies,
+        web3.eth.account.from_key(account.private_key),
+        executor=executor,
+        abis={
+            "Strategy": Strategy.abi,
+            "LevAaveLens": LevAaveLens.abi,
+            "KeeperExecutor": KeeperExecutor.abi,
+        },
+        max_base_fee=max_base_fee and int(float(max_base_fee) * 10**9),
+    )
+    try:
+        await keeper.run()
+    finally:
+        for strategy, histogram in keeper.latency.items():
+            if histogram.count:
+                print(f"{strategy}: {histogram.as_dict()}")
+
+
+def main():
+    print(f"You are using the '{network.show_active()}' network")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    account = accounts.load(click.prompt("Account", type=click.Choice(accounts.load())))
+    factory = LevAaveFactory.at(os.environ["FACTORY"])
+    from_block = int(os.environ.get("FROM_BLOCK", 0))
+
+    # strategies are kept by the executor when there is one, else by the account
+    keeper = web3.toChecksumAddress(os.environ.get("EXECUTOR", account.address))
+    strategies = get_strategies(factory, keeper, from_block)
+    print(f"Keeping {len(strategies)} strategies")
+    asyncio.run(keep(strategies, account))
@@ -1,11 +1,107 @@
-import pytest
-from brownie import config, Contract, network
+import os
 
-# Function scoped isolation fixture to enable xdist.
-# Snapshots the chain before each test and reverts after test completion.
+import pytest
+from brownie import config, Contract, MockERC20, network
+from utils import actions, utils
+from utils.snapshots import SnapshotPool
+from utils.tokens import token_addresses, token_prices, whale_addresses
+
+# TEST_PROFILE=mocks runs against local stand-ins of Aave, Maker and the
+# routers on a development network instead of a mainnet fork
+USE_MOCKS = os.environ.get("TEST_PROFILE") == "mocks"
+
+# Canonical chain states, in the order tests using them run: each state is
+# built once per want, from the state it's registered on in `snapshots`
+STATES = ["clean", "levered", "levered_with_rewards", "levered_no_flash"]
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "state(name): chain state the test starts from, see STATES"
+    )
+    config.addinivalue_line(
+        "markers", "no_chain: pure python test, nothing is deployed for it"
+    )
+
+
+# Reverting to a state drops every snapshot taken after it, so tests are
+# grouped by state within each want
+@pytest.hookimpl(trylast=True)
+def pytest_collection_modifyitems(items):
+    wants = []
+
+    def order(item):
+        callspec = getattr(item, "callspec", None)
+        want = callspec.params.get("token") if callspec else None
+        if want not in wants:
+            wants.append(want)
+        marker = item.get_closest_marker("state")
+        return wants.index(want), STATES.index(marker.args[0]) if marker else 0
+
+    items.sort(key=order)
+
+
+# Every chain test starts from a state of its want, "clean" unless it is
+# marked with another one: vault, factory and strategy deployed and the user
+# funded, all done once per session. Each xdist worker has its own chain,
+# session and snapshot pool.
 @pytest.fixture(scope="function", autouse=True)
-def shared_setup(fn_isolation):
-    pass
+def shared_setup(request):
+    if request.node.get_closest_marker("no_chain"):
+        return
+    marker = request.node.get_closest_marker("state")
+    snapshots = request.getfixturevalue("snapshots")
+    snapshots.revert(marker.args[0] if marker else "clean")
+
+
+@pytest.fixture(scope="session")
+def snapshot_pool(chain, mock_protocol):
+    yield SnapshotPool(chain)
+
+
+# deployments for every want start from the same chain
+@pytest.fixture(scope="session")
+def fresh_chain(snapshot_pool, token):
+    snapshot_pool.revert("genesis")
+
+
+@pytest.fixture(scope="session")
+def snapshots(
+    snapshot_pool, chain, token, vault, strategy, user, amount, gov, strategist
+):
+    snapshot_pool.take("clean")
+
+    def lever(flashloans_active):
+        def build():
+            strategy.setIsFlashMintActive(flashloans_active, {"from": gov})
+            actions.user_deposit(user, vault, token, amount)
+            chain.sleep(1)
+            strategy.harvest({"from": strategist})
+
+        return build
+
+    snapshot_pool.register("levered", lever(True), parent="clean")
+    snapshot_pool.register("levered_no_flash", lever(False), parent="clean")
+    snapshot_pool.register(
+        "levered_with_rewards",
+        lambda: utils.sleep(7 * 24 * 3600),
+        parent="levered",
+    )
+    yield snapshot_pool
+
+
+@pytest.fixture(scope="session", autouse=True)
+def mock_protocol(accounts, gov, strat_ms):
+    if not USE_MOCKS:
+        yield None
+        return
+
+    from utils import mocks
+
+    # impersonated accounts have no ether outside of a fork
+    for account in [gov, strat_ms]:
+        accounts[9].transfer(account, "100 ether")
+    yield mocks.deploy(accounts[9], whale=accounts[8])
 
 
 @pytest.fixture(scope="session")
@@ -48,21 +144,11 @@ def keeper(accounts):
     yield accounts[5]
 
 
-@pytest.fixture(autouse=True)
-def FlashMaintLibrary(FlashMintLib, gov):
+@pytest.fixture(scope="session")
+def FlashMaintLibrary(FlashMintLib, gov, fresh_chain):
     yield gov.deploy(FlashMintLib)
 
 
-token_addresses = {
-    "WBTC": "0x2260FAC5E5542a773Aa44fBCfeDf7C193bc2C599",  # WBTC
-    "YFI": "0x0bc529c00C6401aEF6D220BE8C6Ea1667F6Ad93e",  # YFI
-    "WETH": "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2",  # WETH
-    "LINK": "0x514910771AF9Ca656af840dff83E8264EcF986CA",  # LINK
-    "USDT": "0xdAC17F958D2ee523a2206206994597C13D831ec7",  # USDT
-    "DAI": "0x6B175474E89094C44Da98b954EedeAC495271d0F",  # DAI
-    "USDC": "0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48",  # USDC
-}
-
 # TODO: uncomment those tokens you want to test as want
 @pytest.fixture(
     params=[
@@ -77,39 +163,23 @@ token_addresses = {
     scope="session",
     autouse=True,
 )
-def token(request):
-    yield Contract(token_addresses[request.param])
-
-
-whale_addresses = {
-    "WBTC": "0x28c6c06298d514db089934071355e5743bf21d60",
-    "WETH": "0x28c6c06298d514db089934071355e5743bf21d60",
-    "LINK": "0x28c6c06298d514db089934071355e5743bf21d60",
-    "YFI": "0x28c6c06298d514db089934071355e5743bf21d60",
-    "USDT": "0x47ac0Fb4F2D84898e4D9E7b4DaB3C24507a6D503",
-    "USDC": "0x47ac0Fb4F2D84898e4D9E7b4DaB3C24507a6D503",
-    "DAI": "0x47ac0Fb4F2D84898e4D9E7b4DaB3C24507a6D503",
-}
+def token(request, mock_protocol):
+    if mock_protocol:
+        yield mock_protocol.tokens[request.param]
+    else:
+        yield Contract(token_addresses[request.param])
 
 
 @pytest.fixture(scope="session", autouse=True)
-def token_whale(token):
-    yield whale_addresses[token.symbol()]
+def token_whale(token, mock_protocol):
+    if mock_protocol:
+        yield mock_protocol.whale
+    else:
+        yield whale_addresses[token.symbol()]
 
 
-token_prices = {
-    "WBTC": 60_000,
-    "WETH": 4_000,
-    "LINK": 20,
-    "YFI": 35_000,
-    "USDT": 1,
-    "USDC": 1,
-    "DAI": 1,
-}
-
-
-@pytest.fixture(autouse=True, scope="function")
-def amount(token, token_whale, user):
+@pytest.fixture(scope="session")
+def amount(token, token_whale, user, fresh_chain):
     # this will get the number of tokens (around $1m worth of token)
     base_amount = round(1_000_000 / token_prices[token.symbol()])
     amount = base_amount * 10 ** token.decimals()
@@ -135,9 +205,20 @@ def big_amount(token, token_whale, user):
 
 
 @pytest.fixture
-def weth():
+def weth(mock_protocol):
     token_address = "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2"
-    yield Contract(token_address)
+    if mock_protocol:
+        yield MockERC20.at(token_address)
+    else:
+        yield Contract(token_address)
+
+
+@pytest.fixture
+def weth_whale(mock_protocol):
+    if mock_protocol:
+        yield mock_protocol.whale
+    else:
+        yield whale_addresses["WETH"]
 
 
 @pytest.fixture
@@ -147,8 +228,8 @@ def weth_amount(user, weth):
     yield weth_amount
 
 
-@pytest.fixture(scope="function", autouse=True)
-def vault(pm, gov, rewards, guardian, management, token):
+@pytest.fixture(scope="session")
+def vault(pm, gov, rewards, guardian, management, token, fresh_chain):
     Vault = pm(config["dependencies"][0]).Vault
     vault = guardian.deploy(Vault)
     vault.initialize(token, gov, rewards, "", "", guardian, management)
@@ -160,6 +241,8 @@ def vault(pm, gov, rewards, guardian, management, token):
 
 @pytest.fixture(scope="session")
 def registry():
+    if USE_MOCKS:
+        pytest.skip("needs the yearn registry on mainnet")
     yield Contract("0x50c1a2eA0a861A967D9d0FFE2AE4012c2E053804")
 
 
@@ -168,12 +251,12 @@ def live_vault(registry, token):
     yield registry.latestVault(token)
 
 
-@pytest.fixture(scope="function")
-def factory(strategist, vault, LevAaveFactory):
+@pytest.fixture(scope="session")
+def factory(strategist, vault, LevAaveFactory, FlashMaintLibrary):
     yield strategist.deploy(LevAaveFactory, vault)
 
 
-@pytest.fixture(scope="function")
+@pytest.fixture(scope="session")
 def strategy(chain, keeper, vault, factory, gov, strategist, Strategy):
     strategy = Strategy.at(factory.original())
     strategy.setKeeper(keeper, {"from": strategist})
@@ -185,6 +268,8 @@ def strategy(chain, keeper, vault, factory, gov, strategist, Strategy):
 
 @pytest.fixture()
 def enable_healthcheck(strategy, gov):
+    if USE_MOCKS:
+        pytest.skip("needs the yearn healthcheck on mainnet")
     strategy.setHealthCheck("0xDDCea799fF1699e98EDF118e0629A974Df7DF012", {"from": gov})
     strategy.setDoHealthCheck(True, {"from": gov})
     yield True
@@ -0,0 +1,48 @@
+import os
+
+import pytest
+from brownie import Contract
+from utils.gas import GasReport
+from utils.tokens import token_addresses
+
+
+# Benchmarks run against every known want, not only the ones enabled in tests/conftest.py
+@pytest.fixture(params=list(token_addresses), scope="session", autouse=True)
+def token(request, mock_protocol):
+    if mock_protocol:
+        yield mock_protocol.tokens[request.param]
+    else:
+        yield Contract(token_addresses[request.param])
+
+
+@pytest.fixture(params=["amount", "big_amount"])
+def size(request):
+    yield request.param
+
+
+@pytest.fixture
+def deposit(request, size):
+    yield request.getfixturevalue(size)
+
+
+@pytest.fixture(scope="session")
+def gas_report():
+    report = GasReport()
+    yield report
+
+    # one report per xdist worker, tests/utils/gas.py merges them
+    worker = os.environ.get("PYTEST_XDIST_WORKER")
+    default_path = f"reports/gas-benchmark{'-' + worker if worker else ''}.json"
+    report.save(os.environ.get("GAS_REPORT", default_path))
+
+
+@pytest.fixture
+def record(gas_report, token):
+    def record(operation, tx, size="-", flashmint="-"):
+        print(
+            f"{operation} {token.symbol()} {size} flashmint={flashmint}: "
+            f"{tx.gas_used:,} gas"
+        )
+        gas_report.record(operation, token.symbol(), size, flashmint, tx.gas_used)
+
+    yield record
@@ -0,0 +1,106 @@
+import os
+
+import pytest
+from utils import actions, utils
+
+# opt-in: GAS_BENCHMARK=1 brownie test tests/gas
+pytestmark = pytest.mark.skipif(
+    not os.environ.get("GAS_BENCHMARK"), reason="set GAS_BENCHMARK=1 to benchmark"
+)
+
+
+def deposit_and_harvest(vault, strategy, token, user, strategist, deposit):
+    actions.user_deposit(user, vault, token, deposit)
+    utils.sleep(1)
+    return strategy.harvest({"from": strategist})
+
+
+def test_harvest(
+    token,
+    token_whale,
+    vault,
+    strategy,
+    user,
+    strategist,
+    size,
+    deposit,
+    flashloans_active,
+    record,
+):
+    tx = deposit_and_harvest(vault, strategy, token, user, strategist, deposit)
+    record("harvest_first_deposit", tx, size, flashloans_active)
+
+    utils.sleep(1)
+    tx = strategy.harvest({"from": strategist})
+    record("harvest_steady_state", tx, size, flashloans_active)
+
+    actions.generate_profit(strategy, token_whale, deposit // 1_000)
+    utils.sleep(1)
+    tx = strategy.harvest({"from": strategist})
+    record("harvest_profit", tx, size, flashloans_active)
+
+    actions.generate_loss(strategy, deposit // 1_000)
+    utils.sleep(1)
+    tx = strategy.harvest({"from": strategist})
+    record("harvest_loss", tx, size, flashloans_active)
+
+    tx = strategy.tend({"from": strategist})
+    record("tend", tx, size, flashloans_active)
+
+
+def test_withdraw(
+    token, vault, strategy, user, strategist, size, deposit, flashloans_active, record
+):
+    deposit_and_harvest(vault, strategy, token, user, strategist, deposit)
+
+    tx = vault.withdraw(deposit // 2, user, 10_000, {"from": user})
+    record("withdraw_partial", tx, size, flashloans_active)
+
+    tx = vault.withdraw(2 ** 256 - 1, user, 10_000, {"from": user})
+    record("withdraw_full", tx, size, flashloans_active)
+
+
+def test_manual_deleverage(
+    token, vault, strategy, user, strategist, gov, size, deposit, record
+):
+    deposit_and_harvest(vault, strategy, token, user, strategist, deposit)
+
+    (lend, borrow) = strategy.getCurrentPosition()
+    theo_min_deposit = borrow / (strategy.maxCollatRatio() / 1e18)
+    step_size = min(int(lend - theo_min_deposit), borrow)
+    tx = strategy.manualDeleverage(step_size, {"from": gov})
+    record("manual_deleverage", tx, size)
+
+
+def test_clone(vault, factory, strategist, record):
+    tx = factory.cloneLevAave(vault, {"from": strategist})
+    record("clone", tx)
+
+    tx = factory.cloneLevAaveDeterministic(
+        vault, "0x" + "00" * 32, {"from": strategist}
+    )
+    record("clone_deterministic", tx)
+
+
+@pytest.mark.parametrize("router", ["UniV2", "SushiV2", "UniV3", "UniV3Route", "Best"])
+def test_sell_rewards(
+    token, vault, strategy, user, strategist, gov, amount, router, record
+):
+    deposit_and_harvest(vault, strategy, token, user, strategist, amount)
+    utils.sleep(7 * 24 * 3600)
+
+    strategy.setRewardBehavior(
+        ["UniV2", "SushiV2", "UniV3", "UniV3Route", "Best"].index(router),
+        strategy.sellStkAave(),
+        strategy.cooldownStkAave(),
+        strategy.minRewardToSell(),
+        strategy.maxStkAavePriceImpactBps(),
+        strategy.stkAaveToAaveSwapFee(),
+        strategy.aaveToWethSwapFee(),
+        strategy.wethToWantSwapFee(),
+        {"from": gov},
+    )
+    tx = strategy.manualClaimAndSellRewards({"from": gov})
+    record(f"sell_rewards_{router}", tx, "amount")
+    # the gas harvests weigh the rewards against
+    assert tx.gas_used <= strategy.CLAIM_AND_SELL_GAS()
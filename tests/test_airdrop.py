@@ -2,6 +2,7 @@ from utils import actions, checks, utils
 import pytest
 
 
+@pytest.mark.state("levered")
 def test_airdrop(
     chain,
     accounts,
@@ -14,12 +15,7 @@ def test_airdrop(
     RELATIVE_APPROX,
     token_whale,
 ):
-    # Deposit to the vault
-    actions.user_deposit(user, vault, token, amount)
-
-    # Harvest 1: Send funds through the strategy
-    chain.sleep(1)
-    strategy.harvest({"from": strategist})
+    # Harvest 1: funds were sent through the strategy
     total_assets = strategy.estimatedTotalAssets()
     assert pytest.approx(total_assets, rel=RELATIVE_APPROX) == amount
 
@@ -1,4 +1,6 @@
+import brownie
 import pytest
+from brownie import config
 from utils import actions, utils
 
 
@@ -9,6 +11,7 @@ def test_clone(
     token,
     amount,
     weth,
+    weth_whale,
     strategist,
     gov,
     user,
@@ -34,12 +37,48 @@ def test_clone(
 
     # take funds to new strategy
     vault.addStrategy(cloned_strategy, 10_000, 0, 2 ** 256 - 1, 1_000, {"from": gov})
-    weth.transfer(
-        cloned_strategy, 1e6, {"from": "0xba12222222228d8ba445958a75a0704d566bf2c8"}
-    )
+    weth.transfer(cloned_strategy, 1e6, {"from": weth_whale})
     utils.sleep(1)
     cloned_strategy.harvest({"from": gov})
     assert (
         pytest.approx(cloned_strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX)
         == amount
     )
+
+
+def test_clone_deterministic(vault, strategy, factory, strategist, Strategy):
+    salt = "0x" + "01" * 32
+    predicted = factory.predictCloneAddress(strategist, vault, salt)
+
+    tx = factory.cloneLevAaveDeterministic(vault, salt, {"from": strategist})
+    print(f"Deterministic clone: {tx.gas_used:,} gas")
+    assert tx.return_value == predicted
+
+    # aave tokens are read from the immutable args of the clone
+    cloned_strategy = Strategy.at(predicted)
+    assert cloned_strategy.want() == strategy.want()
+    assert cloned_strategy.aToken() == strategy.aToken()
+    assert cloned_strategy.debtToken() == strategy.debtToken()
+    assert cloned_strategy.getConfig() == strategy.getConfig()
+
+    # the same sender, vault and salt can only be used once
+    with brownie.reverts():
+        factory.cloneLevAaveDeterministic(vault, salt, {"from": strategist})
+
+
+def test_clone_many(pm, gov, rewards, guardian, management, token, factory, Strategy):
+    Vault = pm(config["dependencies"][0]).Vault
+    vaults = []
+    for i in range(3):
+        vault = guardian.deploy(Vault)
+        vault.initialize(token, gov, rewards, "", "", guardian, management)
+        vaults.append(vault)
+
+    tx = factory.cloneMany(vaults, {"from": gov})
+    print(f"Clone {len(vaults)} strategies: {tx.gas_used:,} gas")
+
+    assert len(tx.events["Cloned"]) == len(vaults)
+    for vault, cloned_strategy in zip(vaults, tx.return_value):
+        cloned_strategy = Strategy.at(cloned_strategy)
+        assert cloned_strategy.vault() == vault
+        assert cloned_strategy.strategist() == gov
@@ -0,0 +1,170 @@
+import brownie
+import pytest
+from brownie import Contract, interface
+
+CONFIGURE_RESERVE_ABI = [
+    {
+        "inputs": [
+            {"name": "asset", "type": "address"},
+            {"name": "ltv", "type": "uint256"},
+            {"name": "liquidationThreshold", "type": "uint256"},
+            {"name": "liquidationBonus", "type": "uint256"},
+        ],
+        "name": "configureReserveAsCollateral",
+        "outputs": [],
+        "stateMutability": "nonpayable",
+        "type": "function",
+    }
+]
+
+
+def test_get_config(strategy):
+    config = strategy.getConfig().dict()
+
+    assert config["targetCollatRatio"] == strategy.targetCollatRatio()
+    assert config["maxCollatRatio"] == strategy.maxCollatRatio()
+    assert config["maxBorrowCollatRatio"] == strategy.maxBorrowCollatRatio()
+    assert config["daiBorrowCollatRatio"] == strategy.daiBorrowCollatRatio()
+    assert config["minWant"] == strategy.minWant()
+    assert config["minRatio"] == strategy.minRatio()
+    assert config["maxIterations"] == strategy.maxIterations()
+    assert config["isFlashMintActive"] == strategy.isFlashMintActive()
+    assert config["withdrawCheck"] == strategy.withdrawCheck()
+    assert config["flashGasBudget"] == strategy.flashGasBudget()
+
+
+@pytest.mark.state("levered_with_rewards")
+def test_get_snapshot(vault, strategy, token):
+    snapshot = strategy.getSnapshot().dict()
+
+    assert snapshot["params"] == vault.strategies(strategy)
+    assert snapshot["looseWant"] == token.balanceOf(strategy)
+    assert (snapshot["deposits"], snapshot["borrows"]) == strategy.getCurrentPosition()
+    assert snapshot["estimatedTotalAssets"] == strategy.estimatedTotalAssets()
+    assert snapshot["currentCollatRatio"] == strategy.getCurrentCollatRatio()
+    assert snapshot["targetCollatRatio"] == strategy.targetCollatRatio()
+    assert snapshot["maxCollatRatio"] == strategy.maxCollatRatio()
+    assert snapshot["maxBorrowCollatRatio"] == strategy.maxBorrowCollatRatio()
+    assert snapshot["ltv"] == strategy.wantLtvBps() * 10**14
+    assert snapshot["liquidationThreshold"] == (
+        strategy.wantLiquidationThresholdBps() * 10**14
+    )
+    assert snapshot["pendingRewards"] > 0
+    assert snapshot["estimatedRewardsInWant"] == strategy.estimatedRewardsInWant()
+    assert snapshot["protocolParamsSyncedAt"] == strategy.protocolParamsSyncedAt()
+    assert snapshot["flashLiquidity"] > 0
+
+
+def test_clone_config(strategy, factory, vault, strategist, Strategy):
+    cloned_strategy = Strategy.at(
+        factory.cloneLevAave(vault, {"from": strategist}).return_value
+    )
+    assert cloned_strategy.getConfig() == strategy.getConfig()
+    assert cloned_strategy.minRewardToSell() == strategy.minRewardToSell()
+    assert cloned_strategy.swapRouter() == strategy.swapRouter()
+
+
+def test_setters(strategy, gov):
+    strategy.setCollateralTargets(
+        strategy.targetCollatRatio() - 1,
+        strategy.maxCollatRatio() - 1,
+        strategy.maxBorrowCollatRatio() - 1,
+        strategy.daiBorrowCollatRatio() - 1,
+        {"from": gov},
+    )
+    strategy.setMinsAndMaxs(2**128 - 1, 0.001 * 1e18, 10, {"from": gov})
+    config = strategy.getConfig().dict()
+    assert config["minWant"] == 2**128 - 1
+    assert config["minRatio"] == 0.001 * 1e18
+    assert config["maxIterations"] == 10
+
+    strategy.setFlashGasBudget(2**32 - 1, {"from": gov})
+    assert strategy.getConfig().dict()["flashGasBudget"] == 2**32 - 1
+
+    # packed fields can't silently truncate
+    with brownie.reverts():
+        strategy.setMinsAndMaxs(2**128, 0.001 * 1e18, 10, {"from": gov})
+    with brownie.reverts():
+        strategy.setFlashGasBudget(2**32, {"from": gov})
+
+
+def test_sync_protocol_params(chain, strategy, token, user, strategist):
+    data_provider = interface.IProtocolDataProvider(
+        "0x057835Ad21a177dbdd3090bB1CAE03EaCF78Fc6d"
+    )
+    dai = "0x6B175474E89094C44Da98b954EedeAC495271d0F"
+    want_config = data_provider.getReserveConfigurationData(token).dict()
+    dai_config = data_provider.getReserveConfigurationData(dai).dict()
+
+    assert strategy.wantLtvBps() == want_config["ltv"]
+    assert strategy.wantLiquidationThresholdBps() == want_config["liquidationThreshold"]
+    assert strategy.daiLtvBps() == dai_config["ltv"]
+    assert strategy.daiLiquidationThresholdBps() == dai_config["liquidationThreshold"]
+
+    # anyone can refresh the cache
+    chain.sleep(3600)
+    tx = strategy.syncProtocolParams({"from": user})
+    assert strategy.protocolParamsSyncedAt() == tx.timestamp
+
+    # and every harvest refreshes it too
+    chain.sleep(3600)
+    tx = strategy.harvest({"from": strategist})
+    assert strategy.protocolParamsSyncedAt() == tx.timestamp
+
+
+def set_want_ltv(accounts, mock_protocol, token, ltv):
+    if mock_protocol:
+        liquidation_threshold = mock_protocol.pool.reserves(token)[3]
+        mock_protocol.pool.setReserveConfiguration(token, ltv, liquidation_threshold)
+        return
+
+    data_provider = interface.IProtocolDataProvider(
+        "0x057835Ad21a177dbdd3090bB1CAE03EaCF78Fc6d"
+    )
+    addresses_provider = interface.ILendingPoolAddressesProvider(
+        data_provider.ADDRESSES_PROVIDER()
+    )
+    configurator = Contract.from_abi(
+        "LendingPoolConfigurator",
+        addresses_provider.getLendingPoolConfigurator(),
+        CONFIGURE_RESERVE_ABI,
+    )
+    config = data_provider.getReserveConfigurationData(token).dict()
+    configurator.configureReserveAsCollateral(
+        token,
+        ltv,
+        config["liquidationThreshold"],
+        config["liquidationBonus"],
+        {"from": accounts.at(addresses_provider.getPoolAdmin(), force=True)},
+    )
+
+
+def test_stale_protocol_params_read_live(
+    chain, accounts, mock_protocol, strategy, token, gov, user
+):
+    synced_ltv = strategy.wantLtvBps()
+    new_ltv = synced_ltv - 500
+    set_want_ltv(accounts, mock_protocol, token, new_ltv)
+
+    # a fresh cache is trusted over aave
+    assert strategy.getSnapshot().dict()["ltv"] == synced_ltv * 10**14
+
+    # past a day the live params are read, the cache is left as it was
+    chain.sleep(24 * 3600 + 1)
+    chain.mine()
+    assert strategy.getSnapshot().dict()["ltv"] == new_ltv * 10**14
+    assert strategy.wantLtvBps() == synced_ltv
+    # the borrow ratio the cache allowed is now at the live ltv
+    with brownie.reverts():
+        strategy.setCollateralTargets(
+            strategy.targetCollatRatio(),
+            strategy.maxCollatRatio(),
+            new_ltv * 10**14,
+            strategy.daiBorrowCollatRatio(),
+            {"from": gov},
+        )
+
+    # until the next sync catches up
+    strategy.syncProtocolParams({"from": user})
+    assert strategy.wantLtvBps() == new_ltv
+    assert strategy.getSnapshot().dict()["ltv"] == new_ltv * 10**14
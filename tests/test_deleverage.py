@@ -3,6 +3,21 @@ from brownie import Contract
 import pytest
 from utils import actions, checks, utils
 
+DSS_FLASH = "0x1EB4CF3A948E7D72A198fe073cCb8C7a948cD853"
+MCD_PAUSE_PROXY = "0xBE8E3e3618f7474F8cB1d074A26afFef007E98FB"
+DSS_FLASH_FILE_ABI = [
+    {
+        "inputs": [
+            {"name": "what", "type": "bytes32"},
+            {"name": "data", "type": "uint256"},
+        ],
+        "name": "file",
+        "outputs": [],
+        "stateMutability": "nonpayable",
+        "type": "function",
+    }
+]
+
 
 def test_large_deleverage_to_zero(
     chain, gov, token, vault, strategy, user, strategist, big_amount, RELATIVE_APPROX
@@ -195,3 +210,59 @@ def test_large_manual_deleverage_to_zero(
         )
         == 0
     )
+
+
+@pytest.mark.state("levered")
+def test_flash_withdraw_lands_on_target(
+    token, vault, strategy, user, amount, RELATIVE_APPROX
+):
+    # Deposit to the vault and harvest
+    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
+
+    # a single flash mint repays and frees the want, no rebalance round trips
+    withdraw_amount = int(amount / 2)
+    tx = vault.withdraw(withdraw_amount, user, 10_000, {"from": user})
+    print(f"Withdraw through liquidatePosition: {tx.gas_used:,} gas")
+    utils.strategy_status(vault, strategy)
+
+    assert len(tx.events["Leverage"]) == 1
+    assert (
+        pytest.approx(strategy.getCurrentCollatRatio(), rel=1e-3)
+        == strategy.targetCollatRatio()
+    )
+    assert (
+        pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX)
+        == amount - withdraw_amount
+    )
+
+
+def test_flash_rounds_exit_in_one_harvest(
+    accounts, gov, token, vault, strategy, user, strategist, big_amount, RELATIVE_APPROX
+):
+    # Deposit to the vault and harvest
+    actions.user_deposit(user, vault, token, big_amount)
+    utils.sleep(1)
+    strategy.harvest({"from": strategist})
+
+    # cap DssFlash so unwinding needs several capped rounds
+    dss_flash = Contract.from_abi("DssFlash", DSS_FLASH, DSS_FLASH_FILE_ABI)
+    max_key = "0x" + b"max".hex().ljust(64, "0")
+    dss_flash.file(
+        max_key,
+        100_000_000 * 10**18,
+        {"from": accounts.at(MCD_PAUSE_PROXY, force=True)},
+    )
+
+    vault.revokeStrategy(strategy.address, {"from": gov})
+    utils.sleep(1)
+    tx = strategy.harvest({"from": strategist})
+    print(f"Exit in {len(tx.events['Leverage'])} flash rounds: {tx.gas_used:,} gas")
+    utils.strategy_status(vault, strategy)
+
+    assert len(tx.events["Leverage"]) > 1
+    assert vault.debtOutstanding(strategy) == 0
+    assert strategy.getCurrentPosition()[1] == 0
+    assert (
+        pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == 0
+        or strategy.estimatedTotalAssets() <= strategy.minWant()
+    )
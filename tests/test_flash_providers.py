@@ -0,0 +1,116 @@
+import brownie
+import pytest
+from utils import actions, utils
+
+LENDING_POOL = "0x7d2768dE32b0b80b7a3454c06BdAc94A69DDc7A9"
+DSS_FLASH = "0x1EB4CF3A948E7D72A198fe073cCb8C7a948cD853"
+
+
+@pytest.fixture
+def want_lender(gov, token, token_whale, amount, strategy, MockFlashLender):
+    lender = gov.deploy(MockFlashLender)
+    liquidity = min(amount * 10, token.balanceOf(token_whale))
+    token.transfer(lender, liquidity, {"from": token_whale})
+    strategy.setWantFlashLender(lender, {"from": gov})
+    yield lender
+
+
+def test_free_want_lender_used_on_deleverage(
+    token, vault, strategy, user, strategist, amount, want_lender, RELATIVE_APPROX
+):
+    actions.user_deposit(user, vault, token, amount)
+    utils.sleep(1)
+    strategy.harvest({"from": strategist})
+    liquidity = token.balanceOf(want_lender)
+
+    # want is lent directly, skipping the DAI collateral round trip
+    withdraw_amount = int(amount / 2)
+    tx = vault.withdraw(withdraw_amount, user, 10_000, {"from": user})
+    print(f"Withdraw through want lender: {tx.gas_used:,} gas")
+
+    assert len(tx.events["Leverage"]) == 1
+    assert tx.events["Leverage"]["flashLoan"] == want_lender
+    assert tx.events["Leverage"]["requiredDAI"] == 0
+    assert token.balanceOf(want_lender) == liquidity
+    assert (
+        pytest.approx(strategy.getCurrentCollatRatio(), rel=1e-3)
+        == strategy.targetCollatRatio()
+    )
+    assert (
+        pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX)
+        == amount - withdraw_amount
+    )
+
+
+def test_paid_want_lender_skipped(
+    token, vault, strategy, user, strategist, amount, want_lender
+):
+    want_lender.setFeeBps(5)
+    actions.user_deposit(user, vault, token, amount)
+    utils.sleep(1)
+    strategy.harvest({"from": strategist})
+
+    # DssFlash is free, so it is cheaper than a lender charging a fee
+    tx = vault.withdraw(int(amount / 2), user, 10_000, {"from": user})
+    assert tx.events["Leverage"]["flashLoan"] == DSS_FLASH
+
+
+def test_aave_lever_up_without_ltv_gap(
+    token, vault, strategy, user, strategist, gov, amount, RELATIVE_APPROX
+):
+    # with the target below the borrow LTV no DAI collateral is needed, so
+    # the borrow is flash loaned from aave and kept as debt
+    strategy.setCollateralTargets(
+        strategy.maxBorrowCollatRatio() - 5 * 10**16,
+        strategy.maxCollatRatio(),
+        strategy.maxBorrowCollatRatio(),
+        strategy.daiBorrowCollatRatio(),
+        {"from": gov},
+    )
+    actions.user_deposit(user, vault, token, amount)
+    utils.sleep(1)
+    tx = strategy.harvest({"from": strategist})
+    print(f"Lever up through aave flash loan: {tx.gas_used:,} gas")
+
+    assert len(tx.events["Leverage"]) == 1
+    assert tx.events["Leverage"]["flashLoan"] == LENDING_POOL
+    assert token.balanceOf(strategy) == 0
+    assert (
+        pytest.approx(strategy.getCurrentCollatRatio(), rel=1e-3)
+        == strategy.targetCollatRatio()
+    )
+    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
+
+
+def test_set_want_flash_lender(strategy, gov, management, token, MockFlashLender):
+    lender = gov.deploy(MockFlashLender)
+    with brownie.reverts("!authorized"):
+        strategy.setWantFlashLender(lender, {"from": management})
+    with brownie.reverts():
+        strategy.setWantFlashLender(DSS_FLASH, {"from": gov})
+
+    strategy.setWantFlashLender(lender, {"from": gov})
+    assert strategy.wantFlashLender() == lender
+    assert token.allowance(strategy, lender) == 2**256 - 1
+
+    strategy.setWantFlashLender(brownie.ZERO_ADDRESS, {"from": gov})
+    assert token.allowance(strategy, lender) == 0
+
+
+def test_reverting_want_lender_skipped(
+    token, vault, strategy, user, strategist, amount, want_lender, RELATIVE_APPROX
+):
+    actions.user_deposit(user, vault, token, amount)
+    utils.sleep(1)
+    strategy.harvest({"from": strategist})
+
+    # a lender reverting on its quotes is unavailable, DssFlash is used
+    want_lender.setPaused(True)
+    withdraw_amount = int(amount / 2)
+    tx = vault.withdraw(withdraw_amount, user, 10_000, {"from": user})
+    assert tx.events["Leverage"]["flashLoan"] == DSS_FLASH
+    assert (
+        pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX)
+        == amount - withdraw_amount
+    )
+    strategy.harvest({"from": strategist})
@@ -2,6 +2,7 @@ from utils import actions, checks, utils
 import pytest
 
 # tests harvesting a strategy that returns profits correctly
+@pytest.mark.state("levered")
 def test_profitable_harvest(
     chain,
     accounts,
@@ -14,12 +15,7 @@ def test_profitable_harvest(
     amount,
     RELATIVE_APPROX,
 ):
-    # Deposit to the vault
-    actions.user_deposit(user, vault, token, amount)
-
-    # Harvest 1: Send funds through the strategy
-    chain.sleep(1)
-    strategy.harvest({"from": strategist})
+    # Harvest 1: funds were sent through the strategy
     total_assets = strategy.estimatedTotalAssets()
     assert pytest.approx(total_assets, rel=RELATIVE_APPROX) == amount
 
@@ -47,15 +43,19 @@ def test_profitable_harvest(
 
 
 # tests harvesting a strategy that reports losses
+@pytest.mark.state("levered")
 def test_lossy_harvest(
-    chain, accounts, token, vault, strategy, user, strategist, amount, RELATIVE_APPROX
+    chain,
+    accounts,
+    token,
+    vault,
+    strategy,
+    user,
+    strategist,
+    amount,
+    RELATIVE_APPROX,
 ):
-    # Deposit to the vault
-    actions.user_deposit(user, vault, token, amount)
-
-    # Harvest 1: Send funds through the strategy
-    chain.sleep(1)
-    strategy.harvest({"from": strategist})
+    # Harvest 1: funds were sent through the strategy
     total_assets = strategy.estimatedTotalAssets()
     assert pytest.approx(total_assets, rel=RELATIVE_APPROX) == amount
 
@@ -84,6 +84,7 @@ def test_lossy_harvest(
 
 # tests harvesting a strategy twice, once with loss and another with profit
 # it checks that even with previous profit and losses, accounting works as expected
+@pytest.mark.state("levered")
 def test_choppy_harvest(
     chain,
     accounts,
@@ -96,12 +97,7 @@ def test_choppy_harvest(
     amount,
     RELATIVE_APPROX,
 ):
-    # Deposit to the vault
-    actions.user_deposit(user, vault, token, amount)
-
     # Harvest 1: Send funds through the strategy
-    chain.sleep(1)
-    strategy.harvest({"from": strategist})
 
     assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
 
@@ -0,0 +1,42 @@
+from brownie import web3
+from levaave.indexer import EventIndex, Indexer
+from utils import actions
+
+DSS_FLASH = "0x1EB4CF3A948E7D72A198fe073cCb8C7a948cD853"
+
+
+def test_index_leverage_and_harvests(
+    chain, tmp_path, token, vault, strategy, user, strategist, amount
+):
+    start = chain.height + 1
+    actions.user_deposit(user, vault, token, amount)
+    chain.sleep(1)
+    harvest = strategy.harvest({"from": strategist})
+
+    index = EventIndex(str(tmp_path / "events.db"))
+    indexer = Indexer(web3, index, [strategy], chunk_size=1)
+    assert indexer.sync(from_block=start) == chain.height
+    assert index.checkpoint("levaave") == chain.height
+
+    flash = [dict(r) for r in index.flash_utilization(cap=10**27, strategy=strategy)]
+    leverage = harvest.events["Leverage"]
+    assert sum(r["flash_loans"] for r in flash) == harvest.events.count("Leverage")
+    row = index.db.execute("SELECT * FROM leverage").fetchone()
+    assert int(row["amount_requested"]) == leverage[0]["amountRequested"]
+    assert int(row["required_dai"]) == leverage[0]["requiredDAI"]
+    assert row["lender"] == DSS_FLASH
+
+    harvests = [dict(r) for r in index.profit_per_harvest(strategy)]
+    assert len(harvests) == 1
+    assert harvests[0]["block"] == harvest.block_number
+    assert [dict(r) for r in index.gas_per_harvest()][0]["gas_used"] == (
+        harvest.gas_used
+    )
+
+    # a second sync resumes from the checkpoint, without duplicates
+    chain.sleep(3600)
+    second = strategy.harvest({"from": strategist})
+    indexer.sync(from_block=start)
+    assert len(list(index.profit_per_harvest())) == 2
+    rows = index.db.execute("SELECT COUNT(*) FROM leverage").fetchone()[0]
+    assert rows == harvest.events.count("Leverage") + second.events.count("Leverage")
@@ -0,0 +1,132 @@
+import asyncio
+
+import pytest
+from brownie import web3
+from levaave.keeper import Keeper, NonceManager
+from utils import actions
+
+
+@pytest.fixture
+def lens(gov, LevAaveLens):
+    yield gov.deploy(LevAaveLens)
+
+
+def push_to_liquidation_warning(strategy, token, strategist):
+    # lose collateral until the position is 90 bps away from liquidation
+    liquidation_threshold = strategy.getSnapshot().dict()["liquidationThreshold"]
+    deposits, borrows = strategy.getCurrentPosition()
+    to_lose = int(deposits - borrows * 10**18 / (liquidation_threshold - 9 * 10**15))
+    actions.generate_loss(strategy, to_lose)
+    # prevent harvestTrigger
+    strategy.setDebtThreshold(to_lose * 1.1, {"from": strategist})
+
+
+def keep_once(lens, strategies, account, Strategy, LevAaveLens):
+    async def step():
+        keeper = Keeper(
+            web3,
+            lens.address,
+            [s.address for s in strategies],
+            account.address,
+            abis={"Strategy": Strategy.abi, "LevAaveLens": LevAaveLens.abi},
+        )
+        await keeper.load()
+        work = await keeper.step()
+        await keeper.drain()
+        return keeper, work
+
+    return asyncio.run(step())
+
+
+@pytest.mark.state("levered")
+def test_tends_at_liquidation_warning(
+    token, strategy, strategist, lens, Strategy, LevAaveLens
+):
+    push_to_liquidation_warning(strategy, token, strategist)
+    assert strategy.tendTrigger(0)
+
+    keeper, work = keep_once(lens, [strategy], strategist, Strategy, LevAaveLens)
+    assert work == [(strategy.address, "tend")]
+    assert keeper.info[strategy.address].want == token.address
+    assert keeper.info[strategy.address].symbol == token.symbol()
+    assert keeper.info[strategy.address].decimals == token.decimals()
+    assert keeper.latency[strategy.address].count == 1
+
+    # the tend landed, nothing left to do
+    assert not strategy.tendTrigger(0)
+    _, work = keep_once(lens, [strategy], strategist, Strategy, LevAaveLens)
+    assert work == []
+
+
+def test_batch_of_strategies(
+    chain,
+    gov,
+    user,
+    token,
+    vault,
+    strategy,
+    strategist,
+    factory,
+    amount,
+    lens,
+    Strategy,
+    LevAaveLens,
+):
+    clones = [
+        Strategy.at(factory.cloneLevAave(vault, {"from": strategist}).return_value)
+        for _ in range(3)
+    ]
+    vault.updateStrategyDebtRatio(strategy, 2_500, {"from": gov})
+    for clone in clones:
+        vault.addStrategy(clone, 2_500, 0, 2**256 - 1, 1_000, {"from": gov})
+    actions.user_deposit(user, vault, token, amount)
+    chain.sleep(1)
+
+    # every strategy harvests, with nonces handed out locally
+    fleet = [strategy] + clones
+    keeper, work = keep_once(lens, fleet, strategist, Strategy, LevAaveLens)
+    assert sorted(work) == sorted((s.address, "harvest") for s in fleet)
+    for s in fleet:
+        assert s.estimatedTotalAssets() > 0
+        assert keeper.latency[s.address].count == 1
+
+
+@pytest.mark.no_chain
+def test_nonce_manager_reuses_failed_nonces():
+    class Node:
+        address = "keeper"
+        count = 7
+        calls = 0
+
+        def __init__(self):
+            self.web3 = self
+            self.eth = self
+
+        def get_transaction_count(self, address, block):
+            self.calls += 1
+            return self.count
+
+        async def node(self, fn, *args):
+            return fn(*args)
+
+    async def run():
+        node = Node()
+        nonces = NonceManager(node)
+        first, second = await nonces.next(), await nonces.next()
+        assert (first, second) == (7, 8)
+
+        # 8 is still outstanding, the failed nonce is handed out again
+        nonces.failed(first)
+        assert await nonces.next() == 7
+        assert node.calls == 1
+        nonces.sent(7)
+        nonces.sent(8)
+        assert await nonces.next() == 9
+
+        # nothing else outstanding, resync from the node
+        nonces.failed(9)
+        node.count = 9
+        assert await nonces.next() == 9
+        assert node.calls == 2
+
+    asyncio.run(run())
@@ -0,0 +1,97 @@
+import brownie
+import pytest
+from utils import actions
+
+NONE, HARVEST, TEND = 0, 1, 2
+
+
+@pytest.fixture
+def executor(gov, keeper, KeeperExecutor):
+    executor = gov.deploy(KeeperExecutor)
+    executor.setKeeper(keeper, True, {"from": gov})
+    yield executor
+
+
+def test_work_batch(
+    chain,
+    gov,
+    keeper,
+    strategist,
+    token,
+    vault,
+    strategy,
+    factory,
+    user,
+    amount,
+    executor,
+    Strategy,
+):
+    # a second strategy on the same vault that the executor isn't keeper of
+    other_strategy = Strategy.at(
+        factory.cloneLevAave(vault, {"from": strategist}).return_value
+    )
+    vault.updateStrategyDebtRatio(strategy, 5_000, {"from": gov})
+    vault.addStrategy(other_strategy, 5_000, 0, 2 ** 256 - 1, 1_000, {"from": gov})
+    strategy.setKeeper(executor, {"from": strategist})
+    other_strategy.setKeeper(executor, {"from": strategist})
+
+    actions.user_deposit(user, vault, token, amount)
+    chain.sleep(1)
+
+    strategies = [strategy, other_strategy]
+    assert executor.workable(strategies, 0) == [HARVEST, HARVEST]
+
+    tx = executor.work(strategies, 0, {"from": keeper})
+    print(f"Batch harvest of {len(strategies)} strategies: {tx.gas_used:,} gas")
+
+    assert len(tx.events["Worked"]) == 2
+    for event in tx.events["Worked"]:
+        assert event["action"] == HARVEST
+        assert event["success"]
+        assert event["gasUsed"] > 0
+    assert strategy.estimatedTotalAssets() > 0
+    assert other_strategy.estimatedTotalAssets() > 0
+
+    # nothing is worth doing right after harvesting
+    tx = executor.work(strategies, 10 ** 30, {"from": keeper})
+    assert "Worked" not in tx.events
+
+
+def test_failing_strategy_is_isolated(
+    chain,
+    gov,
+    keeper,
+    strategist,
+    token,
+    vault,
+    strategy,
+    factory,
+    user,
+    amount,
+    executor,
+    Strategy,
+):
+    # the executor is keeper of the first strategy only
+    other_strategy = Strategy.at(
+        factory.cloneLevAave(vault, {"from": strategist}).return_value
+    )
+    vault.updateStrategyDebtRatio(strategy, 5_000, {"from": gov})
+    vault.addStrategy(other_strategy, 5_000, 0, 2 ** 256 - 1, 1_000, {"from": gov})
+    strategy.setKeeper(executor, {"from": strategist})
+
+    actions.user_deposit(user, vault, token, amount)
+    chain.sleep(1)
+
+    tx = executor.work([other_strategy, strategy], 0, {"from": keeper})
+    events = tx.events["Worked"]
+    assert events[0]["strategy"] == other_strategy
+    assert not events[0]["success"]
+    assert events[1]["strategy"] == strategy
+    assert events[1]["success"]
+
+
+def test_only_keepers(executor, strategy, user):
+    with brownie.reverts("!keeper"):
+        executor.work([strategy], 0, {"from": user})
+    with brownie.reverts("!governance"):
+        executor.setKeeper(user, True, {"from": user})
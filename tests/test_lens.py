@@ -0,0 +1,52 @@
+import pytest
+from utils import actions
+
+
+@pytest.fixture
+def lens(gov, LevAaveLens):
+    yield gov.deploy(LevAaveLens)
+
+
+def test_fleet_health(
+    chain,
+    gov,
+    strategist,
+    user,
+    token,
+    vault,
+    strategy,
+    factory,
+    amount,
+    lens,
+    Strategy,
+):
+    other_strategy = Strategy.at(
+        factory.cloneLevAave(vault, {"from": strategist}).return_value
+    )
+    vault.updateStrategyDebtRatio(strategy, 5_000, {"from": gov})
+    vault.addStrategy(other_strategy, 5_000, 0, 2**256 - 1, 1_000, {"from": gov})
+    actions.user_deposit(user, vault, token, amount)
+    chain.sleep(1)
+    strategy.harvest({"from": strategist})
+
+    # neither the vault nor an account are strategies, they don't revert the call
+    health = lens.getHealth([strategy, other_strategy, vault, user], 0)
+    levered, idle, not_a_strategy, account = [h.dict() for h in health]
+
+    assert levered["strategy"] == strategy
+    assert levered["ok"] and levered["triggersOk"]
+    assert levered["snapshot"] == strategy.getSnapshot()
+    snapshot = levered["snapshot"].dict()
+    assert snapshot["deposits"] > 0
+    assert levered["distanceToLiquidation"] == (
+        snapshot["liquidationThreshold"] - snapshot["currentCollatRatio"]
+    )
+    assert not levered["tendTrigger"]
+
+    # debt is waiting for the clone's first harvest
+    assert idle["ok"] and idle["harvestTrigger"]
+    assert idle["snapshot"].dict()["deposits"] == 0
+
+    for h in [not_a_strategy, account]:
+        assert not h["ok"] and not h["triggersOk"]
+        assert h["distanceToLiquidation"] == 0
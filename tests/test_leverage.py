@@ -0,0 +1,78 @@
+import pytest
+from utils import actions, utils
+
+
+@pytest.mark.parametrize("size", ["amount", "big_amount"])
+def test_lever_up_gas(
+    request,
+    chain,
+    token,
+    vault,
+    strategy,
+    user,
+    strategist,
+    flashloans_active,
+    size,
+    RELATIVE_APPROX,
+):
+    deposit_amount = request.getfixturevalue(size)
+
+    # Deposit to the vault and lever up in the first harvest
+    actions.user_deposit(user, vault, token, deposit_amount)
+    chain.sleep(1)
+    tx = strategy.harvest({"from": strategist})
+
+    print(
+        f"Lever up {utils.to_units(token, deposit_amount):,.2f} {token.symbol()} "
+        f"(flashmint: {flashloans_active}): {tx.gas_used:,} gas"
+    )
+    utils.strategy_status(vault, strategy)
+
+    assert (
+        pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX)
+        == deposit_amount
+    )
+
+    if flashloans_active:
+        # the whole position is levered up in a single flash mint callback
+        assert len(tx.events["Leverage"]) == 1
+        assert token.balanceOf(strategy) == 0
+        assert (
+            pytest.approx(strategy.getCurrentCollatRatio(), rel=1e-3)
+            == strategy.targetCollatRatio()
+        )
+
+
+def test_lever_up_keeps_debt_outstanding_loose(
+    chain, token, vault, strategy, user, gov, token_whale, amount, flashloans_active
+):
+    target_collat_ratio = strategy.targetCollatRatio()
+
+    def set_target(target):
+        strategy.setCollateralTargets(
+            target,
+            strategy.maxCollatRatio(),
+            strategy.maxBorrowCollatRatio(),
+            strategy.daiBorrowCollatRatio(),
+            {"from": gov},
+        )
+
+    set_target(target_collat_ratio - 0.1 * 1e18)
+    actions.user_deposit(user, vault, token, amount)
+    chain.sleep(1)
+    strategy.harvest({"from": gov})
+
+    # the vault asks for funds back, which are already loose, while the
+    # position is below its target
+    vault.updateStrategyDebtRatio(strategy, 9_000, {"from": gov})
+    debt_outstanding = vault.debtOutstanding(strategy)
+    token.transfer(strategy, debt_outstanding, {"from": token_whale})
+    set_target(target_collat_ratio)
+
+    strategy.tend({"from": gov})
+
+    # levered up without depositing the funds owed to the vault
+    assert token.balanceOf(strategy) == debt_outstanding
+    assert (
+        pytest.approx(strategy.getCurrentCollatRatio(), rel=1e-3) == target_collat_ratio
+    )
@@ -1,6 +1,11 @@
 import pytest
 from utils import actions
 import brownie
+from brownie import interface
+
+DSS_FLASH = "0x1EB4CF3A948E7D72A198fe073cCb8C7a948cD853"
+DAI = "0x6B175474E89094C44Da98b954EedeAC495271d0F"
+DATA_PROVIDER = "0x057835Ad21a177dbdd3090bB1CAE03EaCF78Fc6d"
 
 
 def test_migration(
@@ -14,6 +19,7 @@ def test_migration(
     gov,
     user,
     weth,
+    weth_whale,
     RELATIVE_APPROX,
 ):
     # Deposit to the vault and harvest
@@ -26,20 +32,20 @@ def test_migration(
     pre_want_balance = token.balanceOf(strategy)
 
     new_strategy = strategist.deploy(Strategy, vault)
-    weth.transfer(
-        new_strategy, 1e6, {"from": "0xBA12222222228d8Ba445958a75a0704d566BF2C8"}
-    )
-
-    # mirgration with more than dust reverts, there is no way to transfer the debt position
-    with brownie.reverts():
-        vault.migrateStrategy(strategy, new_strategy, {"from": gov})
+    weth.transfer(new_strategy, 1e6, {"from": weth_whale})
 
+    # unwind the position, then migrate and lever up again
     vault.revokeStrategy(strategy, {"from": gov})
-    strategy.harvest({"from": gov})
+    unwind = strategy.harvest({"from": gov})
 
-    vault.migrateStrategy(strategy, new_strategy, {"from": gov})
+    migration = vault.migrateStrategy(strategy, new_strategy, {"from": gov})
     vault.updateStrategyDebtRatio(new_strategy, 10_000, {"from": gov})
-    new_strategy.harvest({"from": gov})
+    relever = new_strategy.harvest({"from": gov})
+    print(
+        f"unwind and relever: {unwind.gas_used + migration.gas_used + relever.gas_used:,} gas, "
+        f"out of market for {relever.block_number - unwind.block_number} blocks, "
+        f"{relever.timestamp - unwind.timestamp}s"
+    )
 
     assert (
         pytest.approx(new_strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX)
@@ -50,3 +56,100 @@ def test_migration(
 
     # check that harvest work as expected
     new_strategy.harvest({"from": gov})
+
+
+@pytest.mark.parametrize("above_ltv", [True, False])
+def test_migrate_levered_position(
+    chain,
+    token,
+    vault,
+    strategy,
+    amount,
+    Strategy,
+    strategist,
+    gov,
+    user,
+    above_ltv,
+    RELATIVE_APPROX,
+):
+    if not above_ltv:
+        # the aTokens alone can back the debt, no DAI is needed to reopen it
+        strategy.setCollateralTargets(
+            strategy.maxBorrowCollatRatio() - 0.02 * 1e18,
+            strategy.maxCollatRatio(),
+            strategy.maxBorrowCollatRatio(),
+            strategy.daiBorrowCollatRatio(),
+            {"from": gov},
+        )
+    actions.user_deposit(user, vault, token, amount)
+    chain.sleep(1)
+    strategy.harvest({"from": gov})
+    deposits, borrows = strategy.getCurrentPosition()
+    collat_ratio = strategy.getSnapshot().dict()["currentCollatRatio"]
+    assert (collat_ratio > strategy.maxBorrowCollatRatio()) == above_ltv
+
+    # let rewards accrue to the old strategy
+    chain.sleep(24 * 3600)
+    chain.mine()
+    rewards = strategy.getSnapshot().dict()["pendingRewards"]
+    assert rewards > 0
+
+    new_strategy = strategist.deploy(Strategy, vault)
+    tx = vault.migrateStrategy(strategy, new_strategy, {"from": gov})
+    print(f"position transfer: {tx.gas_used:,} gas, out of market for 0 blocks")
+
+    # its rewards moved along, claimed
+    old = strategy.getSnapshot().dict()
+    assert old["pendingRewards"] == old["stkAaveBalance"] == old["aaveBalance"] == 0
+    assert new_strategy.getSnapshot().dict()["stkAaveBalance"] >= rewards
+    assert any(c["to"] == DSS_FLASH for c in tx.subcalls) == above_ltv
+
+    # the whole position moved, still levered
+    assert strategy.getCurrentPosition() == (0, 0)
+    new_deposits, new_borrows = new_strategy.getCurrentPosition()
+    assert pytest.approx(new_deposits, rel=RELATIVE_APPROX) == deposits
+    assert pytest.approx(new_borrows, rel=RELATIVE_APPROX) == borrows
+    assert (
+        pytest.approx(
+            new_strategy.getSnapshot().dict()["currentCollatRatio"],
+            rel=RELATIVE_APPROX,
+        )
+        == collat_ratio
+    )
+    assert (
+        pytest.approx(new_strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX)
+        == amount
+    )
+
+    # the credit delegated for the migration is revoked and the DAI lent to
+    # back it went back to repay the flash mint
+    debt_token = interface.IVariableDebtToken(new_strategy.debtToken())
+    assert debt_token.borrowAllowance(new_strategy, strategy) == 0
+    if token.address != DAI:
+        a_dai = interface.IProtocolDataProvider(
+            DATA_PROVIDER
+        ).getReserveTokensAddresses(DAI)[0]
+        assert interface.IAToken(a_dai).balanceOf(new_strategy) == 0
+    new_strategy.harvest({"from": gov})
+
+
+def test_accept_migration_only_from_vault_strategies(
+    vault, strategy, Strategy, strategist, user
+):
+    new_strategy = strategist.deploy(Strategy, vault)
+    with brownie.reverts():
+        new_strategy.acceptMigration(1, 0, {"from": user})
+    with brownie.reverts():
+        new_strategy.completeMigration({"from": user})
+
+
+@pytest.mark.state("levered")
+def test_accept_migration_only_into_an_empty_strategy(
+    vault, strategy, Strategy, strategist, gov, accounts
+):
+    # even a strategy of the vault can't reopen its debt in the name of one
+    # that holds a position
+    other = strategist.deploy(Strategy, vault)
+    vault.addStrategy(other, 0, 0, 2**256 - 1, 1_000, {"from": gov})
+    with brownie.reverts():
+        strategy.acceptMigration(1, 0, {"from": accounts.at(other, force=True)})
@@ -0,0 +1,91 @@
+import brownie
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def protocol(mock_protocol):
+    if not mock_protocol:
+        pytest.skip("only with TEST_PROFILE=mocks")
+    yield mock_protocol
+
+
+def test_interest_accrues(chain, protocol, token, amount, user, MockAToken):
+    pool = protocol.pool
+    a_token = MockAToken.at(protocol.data_provider.getReserveTokensAddresses(token)[0])
+    token.approve(pool, amount, {"from": user})
+    pool.deposit(token, amount, user, 0, {"from": user})
+    assert a_token.balanceOf(user) == amount
+
+    supply_rate = pool.reserves(token).dict()["liquidityRate"]
+    chain.sleep(365 * 24 * 3600)
+    chain.mine()
+    assert pytest.approx(a_token.balanceOf(user), rel=1e-6) == amount * (
+        1 + supply_rate / 1e27
+    )
+
+    pool.withdraw(token, 2 ** 256 - 1, user, {"from": user})
+    assert a_token.balanceOf(user) == 0
+    assert token.balanceOf(user) > amount
+
+
+def test_borrow_is_capped_by_ltv(protocol, token, amount, user):
+    pool = protocol.pool
+    token.approve(pool, amount, {"from": user})
+    pool.deposit(token, amount, user, 0, {"from": user})
+
+    ltv = pool.reserves(token).dict()["ltv"]
+    with brownie.reverts("collateral cannot cover new borrow"):
+        pool.borrow(token, amount * (ltv + 1) // 10_000, 2, 0, user, {"from": user})
+    pool.borrow(token, amount * ltv // 10_000, 2, 0, user, {"from": user})
+    with brownie.reverts("health factor below 1"):
+        pool.withdraw(token, amount // 2, user, {"from": user})
+
+
+def test_atoken_transfer_keeps_health_factor(
+    protocol, token, amount, user, accounts, MockAToken
+):
+    pool = protocol.pool
+    a_token = MockAToken.at(protocol.data_provider.getReserveTokensAddresses(token)[0])
+    token.approve(pool, amount, {"from": user})
+    pool.deposit(token, amount, user, 0, {"from": user})
+    ltv = pool.reserves(token).dict()["ltv"]
+    pool.borrow(token, amount * ltv // 10_000, 2, 0, user, {"from": user})
+
+    # aTokens backing the debt can't leave, the rest can
+    with brownie.reverts("transfer not allowed"):
+        a_token.transfer(accounts[7], amount // 2, {"from": user})
+    a_token.transfer(accounts[7], amount // 100, {"from": user})
+    assert a_token.balanceOf(accounts[7]) == amount // 100
+
+    # only the requested amount moves, never more than the balance
+    with brownie.reverts("amount exceeds balance"):
+        a_token.transfer(user, amount // 100 + 1, {"from": accounts[7]})
+
+
+@pytest.mark.state("levered_with_rewards")
+def test_rewards_and_cooldown(chain, protocol, strategy, user):
+    assert strategy.estimatedRewardsInWant() > 0
+
+    # a claimed stkAave balance can only be redeemed inside the unstake window
+    stkaave = protocol.stkaave
+    stkaave.mint(user, 10 ** 18, {"from": user})
+    stkaave.cooldown({"from": user})
+    with brownie.reverts("INSUFFICIENT_COOLDOWN"):
+        stkaave.redeem(user, 10 ** 18, {"from": user})
+    chain.sleep(stkaave.COOLDOWN_SECONDS() + 1)
+    stkaave.redeem(user, 10 ** 18, {"from": user})
+    assert protocol.aave.balanceOf(user) == 10 ** 18
+
+
+def test_routers_quote_oracle_prices(protocol, user):
+    weth, dai = protocol.tokens["WETH"], protocol.tokens["DAI"]
+    oracle = protocol.oracle
+    expected = 10 ** 18 * oracle.getAssetPrice(weth) // oracle.getAssetPrice(dai)
+
+    out = protocol.routers["uniswap"].getAmountsOut(10 ** 18, [weth, dai])[-1]
+    assert pytest.approx(out, rel=1e-9) == expected * 0.997
+
+    # doubling the price doubles the quote
+    oracle.setAssetPrice(weth, 2 * oracle.getAssetPrice(weth), {"from": user})
+    out = protocol.routers["sushiswap"].getAmountsOut(10 ** 18, [weth, dai])[-1]
+    assert pytest.approx(out, rel=1e-9) == 2 * expected * 0.997
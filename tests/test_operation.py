@@ -1,19 +1,27 @@
 import brownie
-from brownie import Contract, test
+from brownie import interface, test
 import pytest
 from utils import actions, checks, utils
 
+UNI_V3, UNI_V3_ROUTE = 2, 3
+UNI_V3_ROUTER = "0xE592427A0AEce92De3Edee1F18E0157C05861564"
+LENDING_POOL = "0x7d2768dE32b0b80b7a3454c06BdAc94A69DDc7A9"
 
+
+@pytest.mark.state("levered")
 def test_operation(
-    chain, accounts, token, vault, strategy, user, strategist, amount, RELATIVE_APPROX
+    chain,
+    accounts,
+    token,
+    vault,
+    strategy,
+    user,
+    strategist,
+    amount,
+    RELATIVE_APPROX,
 ):
-    # Deposit to the vault
-    user_balance_before = token.balanceOf(user)
-    actions.user_deposit(user, vault, token, amount)
-
-    # harvest
-    chain.sleep(1)
-    strategy.harvest({"from": strategist})
+    # levered with the user's deposit
+    user_balance_before = token.balanceOf(user) + amount
     assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
 
     utils.strategy_status(vault, strategy)
@@ -33,6 +41,13 @@ def test_operation(
     )
 
 
+@pytest.mark.parametrize(
+    "flashloans_active",
+    [
+        pytest.param(True, marks=pytest.mark.state("levered")),
+        pytest.param(False, marks=pytest.mark.state("levered_no_flash")),
+    ],
+)
 def test_withdraw(
     chain,
     token,
@@ -45,13 +60,8 @@ def test_withdraw(
     gov,
     RELATIVE_APPROX,
 ):
-    # Deposit to the vault
-    user_balance_before = token.balanceOf(user)
-    actions.user_deposit(user, vault, token, amount)
-
-    # harvest
-    chain.sleep(1)
-    strategy.harvest({"from": strategist})
+    # levered with the user's deposit
+    user_balance_before = token.balanceOf(user) + amount
     assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
 
     utils.sleep(1 * 24 * 3600)
@@ -85,7 +95,38 @@ def test_withdraw(
     utils.strategy_status(vault, strategy)
 
 
-@pytest.mark.parametrize("swap_router", [0, 1, 2])
+def test_withdraw_from_idle_want_buffer(
+    chain, token, vault, strategy, user, strategist, gov, amount, RELATIVE_APPROX
+):
+    # keep 5% of the assets loose
+    strategy.setIdleWantBuffer(0, 500, {"from": gov})
+    actions.user_deposit(user, vault, token, amount)
+    chain.sleep(1)
+    strategy.harvest({"from": strategist})
+    assert pytest.approx(token.balanceOf(strategy), rel=RELATIVE_APPROX) == amount / 20
+    position = strategy.getCurrentPosition()
+
+    # small withdrawals don't touch the position
+    for _ in range(4):
+        tx = vault.withdraw(amount // 100, {"from": user})
+        assert not [
+            c for c in tx.subcalls if c["to"] == LENDING_POOL and c["op"] == "CALL"
+        ]
+    assert strategy.getCurrentPosition() == position
+
+    # past the buffer it delevers
+    vault.withdraw(amount // 10, {"from": user})
+    assert strategy.getCurrentPosition()[0] < position[0]
+
+    # and harvests refill it
+    chain.sleep(1)
+    strategy.harvest({"from": strategist})
+    assert pytest.approx(token.balanceOf(strategy), rel=RELATIVE_APPROX) == (
+        strategy.estimatedTotalAssets() / 20
+    )
+
+
+@pytest.mark.parametrize("swap_router", [0, 1, 2, 3, 4])
 def test_apr(
     chain,
     accounts,
@@ -173,6 +214,93 @@ def test_apr_with_cooldown(
     )
 
 
+@pytest.mark.state("levered_with_rewards")
+def test_sell_rewards_in_a_single_swap(snapshots, token, strategy, gov):
+    sold = {}
+    for swap_router in [UNI_V3, UNI_V3_ROUTE]:
+        # levered a week ago, with stkAave to claim
+        snapshots.revert("levered_with_rewards")
+        strategy.setRewardBehavior(
+            swap_router,
+            True,
+            strategy.cooldownStkAave(),
+            strategy.minRewardToSell(),
+            strategy.maxStkAavePriceImpactBps(),
+            strategy.stkAaveToAaveSwapFee(),
+            strategy.aaveToWethSwapFee(),
+            strategy.wethToWantSwapFee(),
+            {"from": gov},
+        )
+        loose_want = token.balanceOf(strategy)
+        tx = strategy.manualClaimAndSellRewards({"from": gov})
+        sold[swap_router] = token.balanceOf(strategy) - loose_want
+
+        snapshot = strategy.getSnapshot().dict()
+        assert snapshot["stkAaveBalance"] <= 1
+        assert snapshot["aaveBalance"] == 0
+        swaps = [
+            c for c in tx.subcalls if c["to"] == UNI_V3_ROUTER and c["op"] == "CALL"
+        ]
+        assert len(swaps) == (1 if swap_router == UNI_V3_ROUTE else 2)
+
+    # same pools, same fees
+    assert sold[UNI_V3] > 0
+    assert pytest.approx(sold[UNI_V3_ROUTE], rel=1e-6) == sold[UNI_V3]
+
+
+def set_min_reward_to_sell(strategy, gov, min_reward_to_sell):
+    strategy.setRewardBehavior(
+        strategy.swapRouter(),
+        strategy.sellStkAave(),
+        strategy.cooldownStkAave(),
+        min_reward_to_sell,
+        strategy.maxStkAavePriceImpactBps(),
+        strategy.stkAaveToAaveSwapFee(),
+        strategy.aaveToWethSwapFee(),
+        strategy.wethToWantSwapFee(),
+        {"from": gov},
+    )
+
+
+@pytest.mark.state("levered")
+def test_dust_rewards_wait_for_gas(chain, strategy, strategist, gov):
+    chain.sleep(3600)
+    chain.mine()
+    strategy.setRewardClaimGasMultiple(255, {"from": gov})
+
+    # without a gas price, rewards are claimed once there is enough to sell
+    pending = strategy.getSnapshot().dict()["pendingRewards"]
+    assert strategy.shouldClaimRewards(0)
+    set_min_reward_to_sell(strategy, gov, pending * 2)
+    assert not strategy.shouldClaimRewards(0)
+    strategy.harvest({"from": strategist, "gas_price": 0})
+    assert strategy.getSnapshot().dict()["pendingRewards"] >= pending
+    set_min_reward_to_sell(strategy, gov, 10**15)
+
+    # the lowest gas price at which an hour of rewards isn't worth claiming,
+    # within what the strategist can pay for
+    gas_limit = 5_000_000
+    max_gas_price = strategist.balance() // gas_limit
+    gas_price = 10**9
+    while strategy.shouldClaimRewards(gas_price):
+        gas_price *= 2
+        assert gas_price <= max_gas_price, "an hour of rewards outweighs the gas"
+
+    pending = strategy.getSnapshot().dict()["pendingRewards"]
+    strategy.harvest(
+        {"from": strategist, "gas_price": gas_price, "gas_limit": gas_limit}
+    )
+    snapshot = strategy.getSnapshot().dict()
+    assert snapshot["pendingRewards"] >= pending
+    assert snapshot["stkAaveBalance"] == 0
+
+    # 0 always claims
+    strategy.setRewardClaimGasMultiple(0, {"from": gov})
+    assert strategy.shouldClaimRewards(2**128)
+    strategy.harvest({"from": strategist})
+    assert strategy.getSnapshot().dict()["pendingRewards"] == 0
+
+
 def test_harvest_after_long_idle_period(
     chain, accounts, token, vault, strategy, user, strategist, amount, RELATIVE_APPROX
 ):
@@ -381,7 +509,9 @@ def test_tend(
     strategy.harvest({"from": strategist})
 
     liquidationThreshold = (
-        Contract("0x057835Ad21a177dbdd3090bB1CAE03EaCF78Fc6d")  # ProtocolDataProvider
+        interface.IProtocolDataProvider(
+            "0x057835Ad21a177dbdd3090bB1CAE03EaCF78Fc6d"
+        )
         .getReserveConfigurationData(token)
         .dict()["liquidationThreshold"]
     )
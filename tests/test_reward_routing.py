@@ -0,0 +1,103 @@
+import pytest
+
+UNI_V2, SUSHI_V2, UNI_V3, BEST = 0, 1, 2, 4
+AAVE_AMOUNT = 100 * 10**18
+
+
+@pytest.fixture(autouse=True)
+def protocol(mock_protocol):
+    if not mock_protocol:
+        pytest.skip("only with TEST_PROFILE=mocks")
+    yield mock_protocol
+
+
+def sell_aave(protocol, token, strategy, gov, swap_router, slippage_bps=500):
+    strategy.setRewardSaleSlippage(slippage_bps, {"from": gov})
+    strategy.setRewardBehavior(
+        swap_router,
+        False,
+        strategy.cooldownStkAave(),
+        strategy.minRewardToSell(),
+        strategy.maxStkAavePriceImpactBps(),
+        strategy.stkAaveToAaveSwapFee(),
+        strategy.aaveToWethSwapFee(),
+        strategy.wethToWantSwapFee(),
+        {"from": gov},
+    )
+    protocol.aave.mint(strategy, AAVE_AMOUNT, {"from": gov})
+    loose_want = token.balanceOf(strategy)
+    tx = strategy.manualClaimAndSellRewards({"from": gov})
+    return token.balanceOf(strategy) - loose_want, tx
+
+
+def set_depths(protocol, gov, depths):
+    # depth of each router, in multiples of the AAVE sold
+    value = AAVE_AMOUNT * protocol.oracle.getAssetPrice(protocol.aave) // 10**18
+    for name, depth in depths.items():
+        protocol.routers[name].setDepth(depth * value, {"from": gov})
+
+
+def assert_skipped(tx, protocol, amount_in, swap_router=None):
+    event = tx.events["RewardSaleSkipped"]
+    assert event["token"] == protocol.aave
+    assert event["amountIn"] == amount_in
+    if swap_router is not None:
+        assert event["swapRouter"] == swap_router
+    return event
+
+
+def test_best_execution(snapshots, protocol, token, strategy, gov):
+    proceeds = {}
+    for swap_router in [UNI_V2, SUSHI_V2, UNI_V3, BEST]:
+        snapshots.revert("clean")
+        # liquidity moved away from the default router to v3
+        set_depths(protocol, gov, {"uniswap": 2, "sushiswap": 10, "uniswap_v3": 100})
+        # wide enough for the thinnest pool to still sell
+        proceeds[swap_router], _ = sell_aave(
+            protocol, token, strategy, gov, swap_router, slippage_bps=5_000
+        )
+        assert protocol.aave.balanceOf(strategy) == 0
+
+    print({k: v / 10 ** token.decimals() for k, v in proceeds.items()})
+    assert proceeds[BEST] == proceeds[UNI_V3]
+    assert proceeds[BEST] > proceeds[SUSHI_V2] > proceeds[UNI_V2]
+
+
+def test_best_execution_keeps_aave_off_the_oracle_price(protocol, token, strategy, gov):
+    # every pool would sell 100 AAVE at a third of their price
+    set_depths(protocol, gov, {"uniswap": 2, "sushiswap": 2, "uniswap_v3": 2})
+    proceeds, tx = sell_aave(protocol, token, strategy, gov, BEST)
+    assert proceeds == 0
+    assert protocol.aave.balanceOf(strategy) == AAVE_AMOUNT
+    assert_skipped(tx, protocol, AAVE_AMOUNT)
+
+    # sold on the next harvest once liquidity is back
+    set_depths(protocol, gov, {"uniswap_v3": 100})
+    strategy.manualClaimAndSellRewards({"from": gov})
+    assert protocol.aave.balanceOf(strategy) == 0
+
+
+def test_fixed_router_keeps_aave_off_the_oracle_price(protocol, token, strategy, gov):
+    # the pool would sell 100 AAVE at a third of their price: the swap fails
+    # on the oracle floor, the harvest goes through
+    set_depths(protocol, gov, {"uniswap": 2})
+    proceeds, tx = sell_aave(protocol, token, strategy, gov, UNI_V2)
+    assert proceeds == 0
+    assert protocol.aave.balanceOf(strategy) == AAVE_AMOUNT
+    assert_skipped(tx, protocol, AAVE_AMOUNT, UNI_V2)
+
+    # a wide enough slippage sells it anyway, as with no floor
+    proceeds, _ = sell_aave(protocol, token, strategy, gov, UNI_V2, slippage_bps=10_000)
+    assert proceeds > 0
+    assert protocol.aave.balanceOf(strategy) == 0
+
+
+@pytest.mark.parametrize("swap_router", [UNI_V2, BEST])
+def test_no_oracle_price_keeps_aave(protocol, token, strategy, gov, swap_router):
+    # without a price there is no floor to sell against
+    protocol.oracle.setAssetPrice(protocol.aave, 0, {"from": gov})
+    proceeds, tx = sell_aave(protocol, token, strategy, gov, swap_router)
+    assert proceeds == 0
+    assert protocol.aave.balanceOf(strategy) == AAVE_AMOUNT
+    event = assert_skipped(tx, protocol, AAVE_AMOUNT, swap_router)
+    assert event["minOut"] == 0
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from levaave import risk
+from levaave.simulator import DEFAULT_COLLAT_MAX_MARGIN
+
+PATHS = 4_000
+HORIZON = 14 * 24 * 3600
+
+
+def simulate(token, **kwargs):
+    market = risk.MARKETS[token.symbol()]
+    return risk.simulate(market, paths=PATHS, horizon=HORIZON, workers=1, **kwargs)
+
+
+@pytest.mark.no_chain
+def test_slow_keeper_gets_liquidated_more(token):
+    fast = simulate(token, keeper=risk.Keeper(median_latency=60))
+    slow = simulate(token, keeper=risk.Keeper(median_latency=3 * 24 * 3600))
+
+    # only feasible cells are simulated
+    simulated = risk.feasible(fast.target_margins, fast.thresholds)
+    assert (np.isnan(fast.liquidations) == ~simulated).all()
+    assert np.nansum(slow.liquidations) > np.nansum(fast.liquidations)
+    assert np.nansum(slow.tends) < np.nansum(fast.tends)
+
+
+@pytest.mark.state("levered")
+def test_recommended_targets(chain, token, strategy, gov, strategist):
+    # tendTrigger's warning threshold is a constant on chain
+    result = simulate(token, thresholds=[risk.LIQUIDATION_WARNING_THRESHOLD])
+    recommendation = risk.recommend(result, tolerance=0.01)
+    assert recommendation["warning_threshold"] == risk.LIQUIDATION_WARNING_THRESHOLD
+
+    config = strategy.getConfig().dict()
+    liquidation_threshold = config["maxCollatRatio"] + DEFAULT_COLLAT_MAX_MARGIN
+    target, maximum = risk.collateral_targets(recommendation, liquidation_threshold)
+    assert target < maximum < liquidation_threshold
+    strategy.setCollateralTargets(
+        target,
+        maximum,
+        config["maxBorrowCollatRatio"],
+        config["daiBorrowCollatRatio"],
+        {"from": gov},
+    )
+
+    chain.sleep(1)
+    strategy.harvest({"from": strategist})
+    assert strategy.getCurrentCollatRatio() <= target + config["minRatio"]
+    assert not strategy.tendTrigger(0)
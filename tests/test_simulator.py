@@ -0,0 +1,87 @@
+import pytest
+from brownie import interface
+from levaave import Batch, Params, adjust_position, liquidate_position
+from utils import actions
+
+LENDING_POOL = "0x7d2768dE32b0b80b7a3454c06BdAc94A69DDc7A9"
+PRICE_ORACLE = "0xA50ba011c48153De246E5192C8f9258A2ba79Ca9"
+DSS_FLASH = "0x1EB4CF3A948E7D72A198fe073cCb8C7a948cD853"
+DAI = "0x6B175474E89094C44Da98b954EedeAC495271d0F"
+# aave's index rounding moves balances by a few wei
+REL = 1e-12
+
+
+def simulator_params(strategy, token):
+    config = strategy.getConfig().dict()
+    want_price, dai_price = interface.IPriceOracle(PRICE_ORACLE).getAssetsPrices(
+        [token, DAI]
+    )
+    return Params(
+        config["targetCollatRatio"],
+        config["maxCollatRatio"],
+        config["maxBorrowCollatRatio"],
+        config["daiBorrowCollatRatio"],
+        min_want=config["minWant"],
+        min_ratio=config["minRatio"],
+        max_iterations=config["maxIterations"],
+        is_flash_mint_active=config["isFlashMintActive"],
+        flash_gas_budget=config["flashGasBudget"],
+        want_unit=10 ** token.decimals(),
+        want_price=want_price,
+        dai_price=dai_price,
+        is_dai=token.address == DAI,
+        max_liquidity=interface.IERC3156FlashLender(DSS_FLASH).maxFlashLoan(DAI),
+        idle_want=strategy.idleWant(),
+        idle_want_bps=strategy.idleWantBps(),
+    )
+
+
+def pool_calls(tx):
+    # deposit, withdraw, borrow and repay, views are static calls
+    return len(
+        [c for c in tx.subcalls if c["to"] == LENDING_POOL and c["op"] == "CALL"]
+    )
+
+
+@pytest.mark.parametrize("idle_want_bps", [0, 500])
+def test_simulator_matches_strategy(
+    chain,
+    token,
+    vault,
+    strategy,
+    user,
+    strategist,
+    gov,
+    amount,
+    flashloans_active,
+    idle_want_bps,
+):
+    strategy.setIdleWantBuffer(0, idle_want_bps, {"from": gov})
+    batch = Batch(simulator_params(strategy, token), 0, 0, amount)
+
+    actions.user_deposit(user, vault, token, amount)
+    chain.sleep(1)
+    tx = strategy.harvest({"from": strategist})
+    adjust_position(batch, 0)
+
+    deposits, borrows = strategy.getCurrentPosition()
+    assert pytest.approx(deposits, rel=REL) == batch.deposits[0]
+    assert pytest.approx(borrows, rel=REL) == batch.borrows[0]
+    assert pytest.approx(token.balanceOf(strategy), rel=REL) == batch.loose[0]
+    assert pool_calls(tx) == batch.pool_calls[0]
+    assert pytest.approx(strategy.getCurrentCollatRatio(), rel=1e-9) == int(
+        batch.collat_ratio()[0]
+    )
+
+    # a withdrawal goes through liquidatePosition
+    calls_before = batch.pool_calls[0]
+    withdraw_amount = amount // 2
+    tx = vault.withdraw(withdraw_amount, user, 10_000, {"from": user})
+    liquidated, loss = liquidate_position(batch, withdraw_amount)
+
+    deposits, borrows = strategy.getCurrentPosition()
+    assert pytest.approx(deposits, rel=REL) == batch.deposits[0]
+    assert pytest.approx(borrows, rel=REL) == batch.borrows[0]
+    assert pool_calls(tx) == batch.pool_calls[0] - calls_before
+    assert pytest.approx(token.balanceOf(user), rel=REL) == liquidated[0]
+    assert loss[0] == 0
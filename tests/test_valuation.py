@@ -0,0 +1,32 @@
+import brownie
+import pytest
+
+ROUTER, ORACLE = 0, 1
+
+
+@pytest.mark.state("levered_with_rewards")
+def test_valuation_modes(strategy, management):
+    # levered a week ago, with some rewards to price
+
+    quotes = {}
+    for mode in [ROUTER, ORACLE]:
+        strategy.setValuationMode(mode, {"from": management})
+        quotes[mode] = strategy.estimatedRewardsInWant()
+        print(
+            f"valuation mode {mode}: "
+            f"estimatedTotalAssets {strategy.estimatedTotalAssets.estimate_gas():,} gas, "
+            f"estimatedRewardsInWant {strategy.estimatedRewardsInWant.estimate_gas():,} gas, "
+            f"ethToWant {strategy.ethToWant.estimate_gas(10**18):,} gas"
+        )
+
+    assert quotes[ORACLE] > 0
+    # the oracle and the pools should roughly agree on the price of aave
+    assert pytest.approx(quotes[ORACLE], rel=0.05) == quotes[ROUTER]
+
+
+def test_set_valuation_mode(strategy, management, user):
+    strategy.setValuationMode(ORACLE, {"from": management})
+    assert strategy.valuationMode() == ORACLE
+
+    with brownie.reverts("!authorized"):
+        strategy.setValuationMode(ROUTER, {"from": user})
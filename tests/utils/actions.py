@@ -17,7 +17,7 @@ def generate_profit(strategy, token_whale, amount):
             ).ADDRESSES_PROVIDER()
         ).getLendingPool()
     )
-    token = Contract(strategy.want())
+    token = interface.IERC20(strategy.want())
     token.approve(lp, 2 ** 256 - 1, {"from": token_whale})
     lp.deposit(strategy.want(), amount, strategy, 0, {"from": token_whale})
     return
@@ -0,0 +1,96 @@
+"""
+Gas benchmark results, saved as JSON (and CSV next to it) by tests/gas.
+
+Compare a run against a baseline, exiting with 1 if any operation got more
+expensive than the threshold:
+
+    python tests/utils/gas.py reports/gas-baseline.json reports/gas-benchmark.json
+"""
+
+import argparse
+import csv
+import json
+import sys
+from pathlib import Path
+
+FIELDS = ["operation", "token", "size", "flashmint", "gas"]
+DEFAULT_THRESHOLD = 0.02
+
+
+class GasReport:
+    def __init__(self):
+        self.records = []
+
+    def record(self, operation, token, size, flashmint, gas):
+        self.records.append(
+            {
+                "operation": operation,
+                "token": token,
+                "size": size,
+                "flashmint": flashmint,
+                "gas": gas,
+            }
+        )
+
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("w") as f:
+            json.dump(self.records, f, indent=2)
+        with path.with_suffix(".csv").open("w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(self.records)
+
+
+def load(path):
+    path = Path(path)
+    with path.open() as f:
+        if path.suffix == ".csv":
+            records = list(csv.DictReader(f))
+        else:
+            records = json.load(f)
+    return {_key(r): int(r["gas"]) for r in records}
+
+
+def _key(record):
+    # csv round trips everything as strings
+    return tuple(str(record[field]) for field in FIELDS[:-1])
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """Returns (key, baseline gas, current gas, relative change) of regressions"""
+    regressions = []
+    for key, gas in sorted(current.items()):
+        if key not in baseline:
+            continue
+        change = (gas - baseline[key]) / baseline[key]
+        if change > threshold:
+            regressions.append((key, baseline[key], gas, change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("baseline")
+    parser.add_argument("current", nargs="+", help="one report per xdist worker")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    baseline = load(args.baseline)
+    current = {}
+    for path in args.current:
+        current.update(load(path))
+
+    regressions = compare(baseline, current, args.threshold)
+    for key, before, after, change in regressions:
+        print(f"{'/'.join(key)}: {before:,} -> {after:,} gas ({change:+.2%})")
+    print(
+        f"{len(regressions)} regressions above {args.threshold:.2%} "
+        f"out of {len(current)} measurements"
+    )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
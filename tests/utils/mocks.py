@@ -0,0 +1,158 @@
+"""
+Local stand-ins for Aave V2, Maker's DssFlash and the swap routers, placed at
+the mainnet addresses Strategy and FlashMintLib hardcode so the suite runs on a
+plain development network, without a fork:
+
+    TEST_PROFILE=mocks brownie test --network development
+
+Rates, prices and windows below are the defaults, every mock has setters to
+change them in a test.
+"""
+
+from types import SimpleNamespace
+
+from brownie import (
+    MockAddressesProvider,
+    MockAToken,
+    MockDebtToken,
+    MockDssFlash,
+    MockERC20,
+    MockIncentivesController,
+    MockLendingPool,
+    MockPriceOracle,
+    MockProtocolDataProvider,
+    MockStakedAave,
+    MockUniswapV2Router,
+    MockUniswapV3Quoter,
+    MockUniswapV3Router,
+    web3,
+)
+from utils.tokens import token_addresses, token_prices
+
+LENDING_POOL = "0x7d2768dE32b0b80b7a3454c06BdAc94A69DDc7A9"
+PROTOCOL_DATA_PROVIDER = "0x057835Ad21a177dbdd3090bB1CAE03EaCF78Fc6d"
+PRICE_ORACLE = "0xA50ba011c48153De246E5192C8f9258A2ba79Ca9"
+INCENTIVES_CONTROLLER = "0xd784927Ff2f95ba542BfC824c8a8a98F3495f6b5"
+STKAAVE = "0x4da27a545c0c5B758a6BA100e3a049001de870f5"
+AAVE = "0x7Fc66500c84A76Ad7e9c93437bFc5Ac33E2DDaE9"
+DSS_FLASH = "0x1EB4CF3A948E7D72A198fe073cCb8C7a948cD853"
+UNI_V2_ROUTER = "0x7a250d5630B4cF539739dF2C5dAcb4c659F2488D"
+SUSHI_ROUTER = "0xd9e1cE17f2641f24aE83637ab66a2cca9C378B9F"
+UNI_V3_ROUTER = "0xE592427A0AEce92De3Edee1F18E0157C05861564"
+UNI_V3_QUOTER = "0xb27308f9F90D607463bb33eA1BeBb41C27CE5AB6"
+
+DECIMALS = {"WBTC": 8, "USDT": 6, "USDC": 6}
+AAVE_PRICE = 300  # usd
+# ltv and liquidation threshold in bps, supply and borrow apr
+RESERVES = {
+    "WBTC": (7_000, 7_500, 0.001, 0.01),
+    "YFI": (4_000, 5_500, 0.001, 0.02),
+    "WETH": (8_250, 8_500, 0.003, 0.015),
+    "LINK": (7_000, 7_500, 0.001, 0.01),
+    "USDT": (8_000, 8_500, 0.02, 0.03),
+    "DAI": (7_500, 8_000, 0.02, 0.03),
+    "USDC": (8_000, 8_500, 0.02, 0.03),
+}
+REWARDS_APR = 0.005  # paid in stkAave on both deposits and borrows
+FLASHLOAN_PREMIUM = 9  # bps
+DSS_FLASH_MAX = 500_000_000 * 10 ** 18
+COOLDOWN_SECONDS = 10 * 24 * 3600
+UNSTAKE_WINDOW = 2 * 24 * 3600
+WHALE_USD = 100_000_000
+SECONDS_PER_YEAR = 365 * 24 * 3600
+
+
+def set_code(address, code):
+    client = web3.clientVersion.lower()
+    method = "hardhat_setCode" if "hardhat" in client else "evm_setAccountCode"
+    web3.provider.make_request(method, [address, code])
+
+
+def place(container, address, deployer):
+    # storage isn't copied, so placed mocks are configured after the fact
+    deployed = container.deploy({"from": deployer})
+    set_code(address, web3.eth.get_code(deployed.address).hex())
+    return container.at(address)
+
+
+def price_in_eth(usd_price):
+    return int(usd_price * 10 ** 18 / token_prices["WETH"])
+
+
+def deploy(deployer, whale):
+    """Deploys the whole protocol and funds `whale` with every want token"""
+    tx = {"from": deployer}
+
+    tokens = {}
+    for symbol, address in token_addresses.items():
+        tokens[symbol] = place(MockERC20, address, deployer)
+        tokens[symbol].initialize(symbol, symbol, DECIMALS.get(symbol, 18), tx)
+    aave = place(MockERC20, AAVE, deployer)
+    aave.initialize("Aave Token", "AAVE", 18, tx)
+    stkaave = place(MockStakedAave, STKAAVE, deployer)
+    stkaave.initialize("Staked Aave", "stkAAVE", 18, tx)
+    stkaave.initializeStaking(aave, COOLDOWN_SECONDS, UNSTAKE_WINDOW, tx)
+
+    oracle = place(MockPriceOracle, PRICE_ORACLE, deployer)
+    for symbol, token in tokens.items():
+        oracle.setAssetPrice(token, price_in_eth(token_prices[symbol]), tx)
+    for token in [aave, stkaave]:
+        oracle.setAssetPrice(token, price_in_eth(AAVE_PRICE), tx)
+
+    pool = place(MockLendingPool, LENDING_POOL, deployer)
+    pool.setPriceOracle(oracle, tx)
+    pool.setFlashLoanPremium(FLASHLOAN_PREMIUM, tx)
+    addresses_provider = deployer.deploy(MockAddressesProvider)
+    addresses_provider.setAddresses(pool, oracle, tx)
+    data_provider = place(MockProtocolDataProvider, PROTOCOL_DATA_PROVIDER, deployer)
+    data_provider.setAddressesProvider(addresses_provider, tx)
+
+    incentives = place(MockIncentivesController, INCENTIVES_CONTROLLER, deployer)
+    incentives.initialize(stkaave, tx)
+
+    for symbol, token in tokens.items():
+        ltv, liquidation_threshold, supply_apr, borrow_apr = RESERVES[symbol]
+        a_token = deployer.deploy(MockAToken, pool, token)
+        debt_token = deployer.deploy(MockDebtToken, pool, token)
+        pool.initReserve(token, a_token, debt_token, ltv, liquidation_threshold, tx)
+        pool.setReserveRates(
+            token, int(supply_apr * 10 ** 27), int(borrow_apr * 10 ** 27), tx
+        )
+
+        # stkAave per second for each whole token held
+        yearly = REWARDS_APR * token_prices[symbol] / AAVE_PRICE * 10 ** 18
+        emission = int(yearly) // SECONDS_PER_YEAR
+        incentives.setEmissionPerSecond(a_token, emission, tx)
+        incentives.setEmissionPerSecond(debt_token, emission, tx)
+
+        whale_amount = WHALE_USD // token_prices[symbol] * 10 ** token.decimals()
+        token.mint(whale, whale_amount, tx)
+
+    dss_flash = place(MockDssFlash, DSS_FLASH, deployer)
+    dss_flash.initialize(tokens["DAI"], tx)
+    dss_flash.file(b"max".ljust(32, b"\0"), DSS_FLASH_MAX, tx)
+
+    routers = {}
+    for name, container, address in [
+        ("uniswap", MockUniswapV2Router, UNI_V2_ROUTER),
+        ("sushiswap", MockUniswapV2Router, SUSHI_ROUTER),
+        ("uniswap_v3", MockUniswapV3Router, UNI_V3_ROUTER),
+    ]:
+        routers[name] = place(container, address, deployer)
+        routers[name].initialize(oracle, tx)
+    quoter = place(MockUniswapV3Quoter, UNI_V3_QUOTER, deployer)
+    quoter.initialize(routers["uniswap_v3"], tx)
+
+    return SimpleNamespace(
+        tokens=tokens,
+        aave=aave,
+        stkaave=stkaave,
+        oracle=oracle,
+        pool=pool,
+        data_provider=data_provider,
+        incentives=incentives,
+        dss_flash=dss_flash,
+        routers=routers,
+        quoter=quoter,
+        whale=whale,
+    )
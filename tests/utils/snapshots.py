@@ -0,0 +1,55 @@
+"""
+Named chain states shared by every test of a session, so the deployments and
+the first deposit + harvest run once instead of once per test.
+
+Each xdist worker runs its own chain and session, so it gets its own pool.
+"""
+
+from brownie.network import rpc
+
+
+class SnapshotPool:
+    """
+    Nodes only keep a stack of snapshots: reverting to one drops it along with
+    every snapshot taken after it. Dropped states are rebuilt from their
+    parent the next time they are needed, so tests asking for the same state
+    should run next to each other.
+    """
+
+    def __init__(self, chain):
+        self._chain = chain
+        self._builders = {}
+        self._snapshots = {}
+        self._taken = 0
+        self.take("genesis")
+
+    def register(self, name, build, parent):
+        """`build()` moves the chain from state `parent` to state `name`"""
+        self._builders[name] = (parent, build)
+        self._snapshots.pop(name, None)
+
+    def take(self, name):
+        """Saves the current chain as state `name`"""
+        self._taken += 1
+        self._snapshots[name] = (self._taken, rpc.Rpc().snapshot())
+
+    def revert(self, name):
+        """Moves the chain to state `name`, building it if it isn't saved"""
+        if name not in self._snapshots:
+            if name not in self._builders:
+                raise KeyError(f"state '{name}' is neither saved nor buildable")
+            parent, build = self._builders[name]
+            self.revert(parent)
+            build()
+            self.take(name)
+            return
+
+        order, snapshot_id = self._snapshots[name]
+        self._snapshots = {
+            state: snapshot
+            for state, snapshot in self._snapshots.items()
+            if snapshot[0] < order
+        }
+        # same as chain.revert(), which only tracks a single snapshot
+        self._taken += 1
+        self._snapshots[name] = (self._taken, self._chain._revert(snapshot_id))
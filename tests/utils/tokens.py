@@ -0,0 +1,31 @@
+# Want tokens the suite can run against, with a whale to fund them and a
+# rough usd price to size deposits
+token_addresses = {
+    "WBTC": "0x2260FAC5E5542a773Aa44fBCfeDf7C193bc2C599",  # WBTC
+    "YFI": "0x0bc529c00C6401aEF6D220BE8C6Ea1667F6Ad93e",  # YFI
+    "WETH": "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2",  # WETH
+    "LINK": "0x514910771AF9Ca656af840dff83E8264EcF986CA",  # LINK
+    "USDT": "0xdAC17F958D2ee523a2206206994597C13D831ec7",  # USDT
+    "DAI": "0x6B175474E89094C44Da98b954EedeAC495271d0F",  # DAI
+    "USDC": "0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48",  # USDC
+}
+
+whale_addresses = {
+    "WBTC": "0x28c6c06298d514db089934071355e5743bf21d60",
+    "WETH": "0x28c6c06298d514db089934071355e5743bf21d60",
+    "LINK": "0x28c6c06298d514db089934071355e5743bf21d60",
+    "YFI": "0x28c6c06298d514db089934071355e5743bf21d60",
+    "USDT": "0x47ac0Fb4F2D84898e4D9E7b4DaB3C24507a6D503",
+    "USDC": "0x47ac0Fb4F2D84898e4D9E7b4DaB3C24507a6D503",
+    "DAI": "0x47ac0Fb4F2D84898e4D9E7b4DaB3C24507a6D503",
+}
+
+token_prices = {
+    "WBTC": 60_000,
+    "WETH": 4_000,
+    "LINK": 20,
+    "YFI": 35_000,
+    "USDT": 1,
+    "USDC": 1,
+    "DAI": 1,
+}
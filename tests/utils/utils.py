@@ -1,6 +1,9 @@
 import brownie
 from brownie import interface, chain, Contract
 
+# Strategy.CooldownStatus
+COOLDOWN_STATUS = ["none", "claim", "initiated"]
+
 
 def vault_status(vault):
     print(f"--- Vault {vault.name()} ---")
@@ -11,28 +14,31 @@ def vault_status(vault):
 
 
 def strategy_status(vault, strategy):
-    status = vault.strategies(strategy).dict()
-    (lend, borrow) = strategy.getCurrentPosition()
-    ratio = strategy.getCurrentCollatRatio()
+    snapshot = strategy.getSnapshot().dict()
+    status = snapshot["params"].dict()
     print(f"--- Strategy {strategy.name()} ---")
     print(f"Performance fee {status['performanceFee']}")
     print(f"Debt Ratio {status['debtRatio']}")
     print(f"Total Debt {to_units(vault, status['totalDebt'])}")
     print(f"Total Gain {to_units(vault, status['totalGain'])}")
     print(f"Total Loss {to_units(vault, status['totalLoss'])}")
-    print(f"Estimated Total Assets {to_units(vault, strategy.estimatedTotalAssets())}")
-    print(
-        f"Estimated Total Rewards {to_units(vault, strategy.estimatedRewardsInWant())}"
-    )
+    print(f"Estimated Total Assets {to_units(vault, snapshot['estimatedTotalAssets'])}")
     print(
-        f"Loose Want {to_units(vault, Contract(strategy.want()).balanceOf(strategy))}"
+        f"Estimated Total Rewards {to_units(vault, snapshot['estimatedRewardsInWant'])}"
     )
-    print(f"Current Lend {to_units(vault, lend)}")
-    print(f"Current Borrow {to_units(vault, borrow)}")
-    print(f"Current LTV Ratio {ratio/1e18:.4f}")
-    print(f"Target LTV Ratio {strategy.targetCollatRatio()/1e18:.4f}")
-    print(f"Max LTV Ratio {strategy.maxCollatRatio()/1e18:.4f}")
-    print(f"Max Borrow LTV Ratio {strategy.maxBorrowCollatRatio()/1e18:.4f}")
+    print(f"Pending stkAave {snapshot['pendingRewards']/1e18:.4f}")
+    print(f"stkAave {snapshot['stkAaveBalance']/1e18:.4f}")
+    print(f"Aave {snapshot['aaveBalance']/1e18:.4f}")
+    print(f"Cooldown {COOLDOWN_STATUS[snapshot['cooldownStatus']]}")
+    print(f"Loose Want {to_units(vault, snapshot['looseWant'])}")
+    print(f"Current Lend {to_units(vault, snapshot['deposits'])}")
+    print(f"Current Borrow {to_units(vault, snapshot['borrows'])}")
+    print(f"Current LTV Ratio {snapshot['currentCollatRatio']/1e18:.4f}")
+    print(f"Target LTV Ratio {snapshot['targetCollatRatio']/1e18:.4f}")
+    print(f"Max LTV Ratio {snapshot['maxCollatRatio']/1e18:.4f}")
+    print(f"Max Borrow LTV Ratio {snapshot['maxBorrowCollatRatio']/1e18:.4f}")
+    print(f"Liquidation Threshold {snapshot['liquidationThreshold']/1e18:.4f}")
+    print(f"Flash Liquidity {snapshot['flashLiquidity']/1e18:,.0f} DAI")
 
 
 def to_units(token, amount):